@@ -7,6 +7,8 @@ Receives images from the camera and sends them to Liveview and ScopeOp.
 import logging
 import numpy as np
 
+from typing import Optional
+
 from PyQt5.QtCore import (
     QObject,
     QTimer,
@@ -18,13 +20,32 @@ from PyQt5.QtCore import (
 from py_cameras import PyCamerasError
 
 from ulc_mm_package.hardware.scope import MalariaScope
+from ulc_mm_package.hardware.hardware_constants import CAMERA_FRAME_POOL_SIZE
 from ulc_mm_package.scope_constants import ACQUISITION_PERIOD
+from ulc_mm_package.utilities.buffer_pool import BufferPool
+
+
+class FrameReleaser(QObject):
+    """Gives back leases on the camera's frames, in the thread it lives in
+
+    Queued signals to a thread are delivered in the order they're sent, so a release
+    sent right after a frame is only handled once every slot in that thread the frame
+    was sent to is done with it - or right away if none were connected.
+    """
+
+    @pyqtSlot(object, int)
+    def release(self, pool: BufferPool, idx: int) -> None:
+        pool.release(idx)
 
 
 class Acquisition(QObject):
     update_liveview = pyqtSignal(np.ndarray)
     update_infopanel = pyqtSignal()
     update_scopeop = pyqtSignal(np.ndarray, float)
+    # (pool, index) of a frame sent with update_scopeop or update_liveview, sent right
+    # after it to a FrameReleaser in ScopeOp's or the liveview's thread
+    release_scopeop_frame = pyqtSignal(object, int)
+    release_liveview_frame = pyqtSignal(object, int)
 
     def __init__(self):
         super().__init__()
@@ -34,6 +55,10 @@ class Acquisition(QObject):
         self.img = None
         self.img_timestamp = None
         self.mscope = None
+        # the camera's frame pool, if it's enabled, and the index of `self.img` in it
+        # if it's one of its frames (this holds a lease on it until the next image)
+        self.frame_pool: Optional[BufferPool] = None
+        self._img_idx: Optional[int] = None
 
         self.period = ACQUISITION_PERIOD
 
@@ -84,13 +109,51 @@ class Acquisition(QObject):
         self.mscope = mscope
         self.img_gen = self.mscope.camera.yieldImages()
 
+        # Pooled frames are opt-in (MS_CAMERA_FRAME_POOL_SIZE). Every frame sent to
+        # ScopeOp and the liveview is given back by the FrameReleasers oracle.py puts
+        # in their threads, and the Zarr writer takes its own leases on the frames
+        # it's waiting to write
+        if CAMERA_FRAME_POOL_SIZE > 0:
+            self.mscope.camera.enable_frame_pool(CAMERA_FRAME_POOL_SIZE)
+        self.frame_pool = self.mscope.camera.frame_pool
+        if self.mscope.data_storage_enabled:
+            self.mscope.data_storage.zw.frame_pool = self.frame_pool
+
     def get_img(self):
         try:
-            self.img, self.img_timestamp = next(self.img_gen)
+            img, self.img_timestamp = next(self.img_gen)
+            self._take_img(img)
+            idx = self._retain_img()
             self.update_scopeop.emit(self.img, self.img_timestamp)
+            if idx is not None:
+                self.release_scopeop_frame.emit(self.frame_pool, idx)
         except PyCamerasError as e:
             self.logger.error(f"Failed to grab image: {e}.")
 
+    def _take_img(self, img: np.ndarray) -> None:
+        """Make `img` the current image, taking over the camera's lease on it (if it's
+        one of its frames) and giving back the one on the last image
+        """
+        if self._img_idx is not None:
+            assert self.frame_pool is not None
+            self.frame_pool.release(self._img_idx)
+        self.img = img
+        self._img_idx = (
+            None if self.frame_pool is None else self.frame_pool.index_of(img)
+        )
+
+    def _retain_img(self) -> Optional[int]:
+        """Another lease on the current image, if it's one of the camera's frames, for
+        a signal it's sent with (released by a FrameReleaser)
+        """
+        if self._img_idx is not None:
+            assert self.frame_pool is not None
+            self.frame_pool.retain(self._img_idx)
+        return self._img_idx
+
     def send_img(self):
+        idx = self._retain_img()
         self.update_liveview.emit(self.img)
+        if idx is not None:
+            self.release_liveview_frame.emit(self.frame_pool, idx)
         self.update_infopanel.emit()
@@ -71,8 +71,10 @@ from ulc_mm_package.neural_nets.neural_network_constants import (
     AUTOFOCUS_MODEL_DIR,
     YOGO_MODEL_DIR,
 )
+from ulc_mm_package.neural_nets.utils import PRED_TENSORS_FORMAT
 
 from ulc_mm_package.QtGUI.scope_op import ScopeOp
+from ulc_mm_package.QtGUI.acquisition import FrameReleaser
 from ulc_mm_package.QtGUI.form_gui import FormGUI
 from ulc_mm_package.QtGUI.liveview_gui import LiveviewGUI
 
@@ -226,6 +228,10 @@ class Oracle(Machine):
         self.acquisition_thread = QThread()
         self.acquisition.moveToThread(self.acquisition_thread)
 
+        self.scopeop_frame_releaser = FrameReleaser()
+        self.scopeop_frame_releaser.moveToThread(self.scopeop_thread)
+        self.liveview_frame_releaser = FrameReleaser()
+
         self.scopeop_thread.started.connect(self.scopeop.setup)
 
     def _init_states(self):
@@ -317,6 +323,14 @@ class Oracle(Machine):
 
         # Connect acquisition signals and slots
         self.acquisition.update_liveview.connect(self.liveview_window.update_img)
+        # frames from the camera's pool are given back once ScopeOp / the liveview are
+        # done with them, by releasers in their threads (see FrameReleaser)
+        self.acquisition.release_scopeop_frame.connect(
+            self.scopeop_frame_releaser.release
+        )
+        self.acquisition.release_liveview_frame.connect(
+            self.liveview_frame_releaser.release
+        )
         self.acquisition.update_infopanel.connect(self.scopeop.update_infopanel)
 
     def _init_ssd(self):
@@ -647,6 +661,7 @@ class Oracle(Machine):
             AUTOFOCUS_MODEL_DIR
         ).parent.stem
         self.experiment_metadata["yogo_model"] = Path(YOGO_MODEL_DIR).parent.stem
+        self.experiment_metadata["prediction_tensors_format"] = PRED_TENSORS_FORMAT
         self.experiment_metadata["ambient_pressure"] = self.ambient_pressure
 
         # TODO try a cleaner solution than nested try-excepts?
@@ -884,8 +899,10 @@ class Oracle(Machine):
 
             # Close data storage if it's not already closed
             if self.scopeop.mscope.data_storage.zw.writable:
+                predictions_handler = self.scopeop.mscope.predictions_handler
                 self.scopeop.mscope.data_storage.close(
-                    self.scopeop.mscope.predictions_handler.get_prediction_tensors()
+                    predictions_handler.get_prediction_tensors(),
+                    pred_tensors_file=predictions_handler.stop_spill(),
                 )
             else:
                 self.logger.info(
@@ -44,7 +44,6 @@ from ulc_mm_package.neural_nets.neural_network_constants import (
     YOGO_CLASS_LIST,
     AF_BATCH_SIZE,
 )
-import ulc_mm_package.neural_nets.utils as nn_utils
 
 from ulc_mm_package.QtGUI.acquisition import Acquisition
 from ulc_mm_package.QtGUI.gui_constants import (
@@ -511,6 +510,10 @@ class ScopeOp(QObject, NamedMachine):
 
         self.density_routine = self.routines.cell_density_routine()
 
+        self.mscope.predictions_handler.start_spill(
+            self.mscope.data_storage.get_prediction_spill_path()
+        )
+
         self.set_period.emit(LIVEVIEW_PERIOD)
 
         self.start_time = perf_counter()
@@ -532,12 +535,15 @@ class ScopeOp(QObject, NamedMachine):
 
         self.finishing_experiment.emit(10)
 
-        # the ThreadPoolExecutor work queue may be really big - so as the NCS
+        # the submission queue may still hold up to YOGO_QSIZE frames - so as the NCS
         # is chugging along, lets do some work by adding it's results to the
         # prediction handler
-        num_images_leftover = self.mscope.cell_diagnosis_model.work_queue_size()
+        yogo_queue_stats = self.mscope.cell_diagnosis_model.queue_stats()
+        num_images_leftover = yogo_queue_stats.depth
         self.logger.info(
-            f"Waiting for {num_images_leftover} images to be processed by the NCS"
+            f"Waiting for {num_images_leftover} images to be processed by the NCS. "
+            f"{yogo_queue_stats.accepted} images were queued for YOGO, "
+            f"{yogo_queue_stats.dropped} were dropped because the queue was full."
         )
 
         t0 = perf_counter()
@@ -548,6 +554,7 @@ class ScopeOp(QObject, NamedMachine):
 
         for result in final_yogo_results:
             self.mscope.predictions_handler.add_yogo_pred(result)
+            self.mscope.cell_diagnosis_model.release_result(result)
 
         t1 = perf_counter()
 
@@ -604,7 +611,8 @@ class ScopeOp(QObject, NamedMachine):
             self.logger.info(
                 f"Autobrightness ✅. Mean pixel val = {self.autobrightness_result:.1f}."
             )
-            self.last_img = img
+            # a copy, since the camera's frame is reused
+            self.last_img = img.copy()
             if self.state in {
                 "autobrightness_precells",
                 "autobrightness_preflow",
@@ -756,7 +764,7 @@ class ScopeOp(QObject, NamedMachine):
                         QR.NONE.value,
                     )
         else:
-            self.last_img = img
+            self.last_img = img.copy()
             self.autofocus_done = False
             if self.state in {"autofocus_preflow", "autofocus_postflow"}:
                 if self._oof_error:
@@ -885,10 +893,9 @@ class ScopeOp(QObject, NamedMachine):
 
         self._update_metadata_if_verbose("count_parasitemia", t1 - t0)
 
-        self._update_metadata_if_verbose(
-            "yogo_qsize",
-            self.mscope.cell_diagnosis_model.work_queue_size(),
-        )
+        yogo_queue_stats = self.mscope.cell_diagnosis_model.queue_stats()
+        self._update_metadata_if_verbose("yogo_qsize", yogo_queue_stats.depth)
+        self._update_metadata_if_verbose("yogo_dropped", yogo_queue_stats.dropped)
 
         # ------------------------------------
         # Get and process YOGO results
@@ -897,10 +904,10 @@ class ScopeOp(QObject, NamedMachine):
         for result in prev_yogo_results:
             self.mscope.predictions_handler.add_yogo_pred(result)
             self.mscope.predictions_handler.add_raw_pred_to_heatmap(result)
+            # the raw prediction is no longer needed; give its buffer back to YOGO
+            self.mscope.cell_diagnosis_model.release_result(result)
 
-            class_counts = nn_utils.get_class_counts(
-                self.mscope.predictions_handler.parsed_tensor
-            )
+            class_counts = self.mscope.predictions_handler.frame_class_counts
 
             self.raw_cell_count += class_counts
 
@@ -920,6 +927,10 @@ class ScopeOp(QObject, NamedMachine):
 
         t1 = perf_counter()
         self._update_metadata_if_verbose("yogo_result_mgmt", t1 - t0)
+        # asyn-to-result time of the most recent YOGO frame
+        self._update_metadata_if_verbose(
+            "yogo_latency", self.mscope.cell_diagnosis_model.last_latency
+        )
 
         # ------------------------------------
         # Run periodic singleshot autofocus routine
@@ -1059,8 +1070,9 @@ class ScopeOp(QObject, NamedMachine):
             self.img_metadata["humidity"] = None
             self.img_metadata["temperature"] = None
 
-        zarr_qsize = self.mscope.data_storage.zw.executor._work_queue.qsize()
-        self.img_metadata["zarrwriter_qsize"] = zarr_qsize
+        zarr_queue_stats = self.mscope.data_storage.zw.queue_stats()
+        self.img_metadata["zarrwriter_qsize"] = zarr_queue_stats.depth
+        self._update_metadata_if_verbose("zarrwriter_dropped", zarr_queue_stats.dropped)
 
         ssaf_qsize = self.mscope.autofocus_model.work_queue_size()
         self._update_metadata_if_verbose("ssaf_qsize", ssaf_qsize)
@@ -5,8 +5,12 @@ See camera module under hardware/real/ for more info.
 """
 
 from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+
+import numpy as np
 
 from ulc_mm_package.hardware.hardware_wrapper import hardware
+from ulc_mm_package.utilities.buffer_pool import BufferPool
 
 
 class CameraError(Exception):
@@ -17,10 +21,50 @@ class CameraError(Exception):
 
 
 class CameraBase(ABC):
+    # Frames that images are copied into, once `enable_frame_pool` has been called.
+    # Each frame yielded by `yieldImages` that's from the pool comes with a lease on
+    # it, which whoever takes it is responsible for releasing.
+    frame_pool: Optional[BufferPool] = None
+    # Shape of the camera's images, for cameras that can copy them into a pool
+    frame_shape: Optional[Tuple[int, int]] = None
+    # Number of images that were copied into new arrays since no frame was free
+    pool_empty_count = 0
+
     @abstractmethod
     def yieldImages(self):
         pass
 
+    def enable_frame_pool(self, size: int) -> None:
+        """Copy images into `size` frames from `frame_pool` from now on, rather than into
+        new arrays. Only for callers of `yieldImages` that release every frame they're given;
+        any other caller would use the pool up.
+        """
+        if self.frame_pool is None and self.frame_shape is not None:
+            self.frame_pool = BufferPool(self.frame_shape, np.uint8, size)
+
+    def _lease_frame(self, shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+        """A free frame from `frame_pool` of the given shape, or None if there isn't one"""
+        if self.frame_pool is None:
+            return None
+
+        idx = self.frame_pool.acquire(timeout=0)
+        if idx is None:
+            self.pool_empty_count += 1
+            return None
+        if self.frame_pool.buffers[idx].shape != shape:
+            self.frame_pool.release(idx)
+            return None
+        return self.frame_pool.buffers[idx]
+
+    def _release_frame(self, img: np.ndarray) -> None:
+        """Give back the lease on `img`, if it's one of `frame_pool`'s frames"""
+        if self.frame_pool is None:
+            return
+
+        idx = self.frame_pool.index_of(img)
+        if idx is not None:
+            self.frame_pool.release(idx)
+
 
 @hardware
 class BaslerCamera(CameraBase):
@@ -1,3 +1,5 @@
+import os
+
 from ulc_mm_package.scope_constants import ACQUISITION_FPS
 
 
@@ -14,6 +16,13 @@ DEVICELINK_THROUGHPUT = 200000000
 
 CAMERA_FPS = 53
 
+# Number of frames the camera copies images into, rather than into a new array each
+# time (0, the default, for none). Frames are leased until ScopeOp, the liveview and
+# the Zarr writer are done with them, so 96 leaves room for a full Zarr write queue
+# (ZARR_QUEUE_CAPACITY) plus the frames in flight. If they're all in use, images are
+# copied into new arrays.
+CAMERA_FRAME_POOL_SIZE = int(os.environ.get("MS_CAMERA_FRAME_POOL_SIZE", 0))
+
 # ================ Motor controller constants ================ #
 FULL_STEP_TO_TRAVEL_DIST_UM = 0.56
 DEFAULT_FULL_STEP_HOMING_TIMEOUT = 15
@@ -24,6 +24,7 @@ from vimba import Vimba
 
 from py_cameras import Basler, GrabStrategy
 
+from ulc_mm_package.scope_constants import CameraOptions
 from ulc_mm_package.hardware.camera import CameraError, CameraBase
 from ulc_mm_package.hardware.hardware_constants import (
     DEFAULT_EXPOSURE_MS,
@@ -97,6 +98,10 @@ class AVTCamera(CameraBase):
         self.dropped_count = 0
         self.full_count = 0
 
+        # frames can be copied out of Vimba's buffers into a pool of these, rather than
+        # into a new array each time (see CameraBase.enable_frame_pool)
+        self.frame_shape = (CameraOptions.AVT.IMG_HEIGHT, CameraOptions.AVT.IMG_WIDTH)
+
         self._isActivated = False
         self.vimba = Vimba.get_instance().__enter__()
         self.queue: queue.Queue[Tuple[np.ndarray, float]] = queue.Queue(maxsize=1)
@@ -142,7 +147,8 @@ class AVTCamera(CameraBase):
         """Deactivate the camera, manually exit the context manager using __exit__"""
         self.logger.info(
             f"CAMERA status: all={self.all_count} | full={self.full_count} | "
-            f"incomplete={self.incomplete_count} | dropped={self.dropped_count}"
+            f"incomplete={self.incomplete_count} | dropped={self.dropped_count} | "
+            f"pool_empty={self.pool_empty_count}"
         )
         self.stopAcquisition()
         self.vimba.__exit__(*sys.exc_info())
@@ -155,20 +161,29 @@ class AVTCamera(CameraBase):
         If the queue is empty, it'll ignore the exception that is raised.
 
         Then it will place the current image into the queue (as a tuple of image and current timestamp).
+        The image is copied into a frame from `frame_pool`, if one is free.
         """
 
         try:
-            self.queue.get_nowait()
+            stale_img, _ = self.queue.get_nowait()
+            self._release_frame(stale_img)
         except queue.Empty:
             pass
 
         self.all_count += 1
         if frame.get_status() == vimba.FrameStatus.Complete:
+            img = None
             try:
-                self.queue.put_nowait(
-                    (frame.as_numpy_ndarray()[:, :, 0].copy(), perf_counter())
-                )
+                vimba_img = frame.as_numpy_ndarray()[:, :, 0]
+                img = self._lease_frame(vimba_img.shape)
+                if img is None:
+                    img = vimba_img.copy()
+                else:
+                    np.copyto(img, vimba_img)
+                self.queue.put_nowait((img, perf_counter()))
             except queue.Full:
+                if img is not None:
+                    self._release_frame(img)
                 self.full_count += 1
                 self.logger.warning(
                     f"Queue full in _frame_handler. Full_count = {self.full_count} frames."
@@ -190,6 +205,8 @@ class AVTCamera(CameraBase):
         """Clear the queue of images."""
 
         with self.queue.mutex:
+            for img, _ in self.queue.queue:
+                self._release_frame(img)
             self.queue.queue.clear()
 
     def startAcquisition(self) -> None:
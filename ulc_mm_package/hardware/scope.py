@@ -15,8 +15,9 @@ Components
 
 import logging
 from enum import Enum, auto
-from time import sleep
-from typing import Dict, Optional, Callable
+from time import sleep, perf_counter
+from typing import Dict, List, Optional, Callable, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
 import pigpio
 
@@ -91,20 +92,67 @@ class MalariaScope:
         self.gpu_enabled = False
         self.predictions_handler_enabled = False
 
+        # seconds each component took to initialize
+        self.init_times: Dict[str, float] = {}
+
         # Initialize Components
-        self._init_motor()
-        self._init_camera()
-        self._init_pneumatic_module()
-        self._init_led()
-        self._init_fan()
-        self._init_humidity_temp_sensor()
-        self._init_data_storage()
-        self._init_flow_controller()
-        self._init_GPU()
-        self._init_predictions_handler()
+        self._init_components()
 
         self.logger.info("Initialized scope hardware.")
 
+    def _init_components(self) -> None:
+        """Run the _init_* methods, overlapping the slow ones that don't share anything
+
+        Everything on the pigpio daemon or the I2C bus (the motor, which is slow to
+        home, and the quick GPIO / I2C peripherals) is initialized in one chain, one
+        after the other and in the original order. Compiling the neural nets, opening
+        the data storage, and allocating (and JIT-compiling) the PredictionsHandler
+        each run alongside that chain. The camera is set up on this thread meanwhile,
+        as it was before, since Vimba is entered (and later exited) from here.
+        """
+        # each chain runs its inits in order, on a thread of its own
+        chains: List[List[Tuple[str, Callable[[], None]]]] = [
+            [
+                ("motor", self._init_motor),
+                ("pneumatic_module", self._init_pneumatic_module),
+                ("led", self._init_led),
+                ("fan", self._init_fan),
+                ("humidity_temp_sensor", self._init_humidity_temp_sensor),
+                ("flow_controller", self._init_flow_controller),
+            ],
+            [("data_storage", self._init_data_storage)],
+            [("GPU", self._init_GPU)],
+            [("predictions_handler", self._init_predictions_handler)],
+        ]
+
+        def run_step(name: str, init_fn: Callable[[], None]) -> None:
+            t0 = perf_counter()
+            init_fn()
+            self.init_times[name] = perf_counter() - t0
+
+        def run_chain(chain: List[Tuple[str, Callable[[], None]]]) -> None:
+            for name, init_fn in chain:
+                run_step(name, init_fn)
+
+        t0 = perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=len(chains), thread_name_prefix="scope_init"
+        ) as executor:
+            futures = [executor.submit(run_chain, chain) for chain in chains]
+            run_step("camera", self._init_camera)
+        total = perf_counter() - t0
+
+        slowest_first = sorted(self.init_times.items(), key=lambda kv: -kv[1])
+        self.logger.info(
+            f"Scope initialization took {total:.1f} s: "
+            + ", ".join(f"{name} {t:.1f} s" for name, t in slowest_first)
+        )
+
+        # an init that raised something it didn't handle itself is raised here,
+        # as it would have been if they ran one after another
+        for future in futures:
+            future.result()
+
     def reset_pneumatic_and_led_and_flow_control(self) -> None:
         """Set the syringe to its top most position, turn the LED off, reset flow control variables."""
         self.logger.info(
@@ -140,6 +188,8 @@ class MalariaScope:
         closing_file_future = self.data_storage.close(
             self.predictions_handler.get_prediction_tensors(),
             self.predictions_handler.heatmaps,
+            self.predictions_handler.class_counts,
+            self.predictions_handler.stop_spill(),
         )
         if closing_file_future is not None:
             while not closing_file_future.done():
@@ -150,7 +200,9 @@ class MalariaScope:
         # resets their threadpool executor; it does not drop their
         # references to the NCS (which would then require reconnecting)
         self.autofocus_model.reset(wait_for_jobs=False)
-        self.cell_diagnosis_model.reset(wait_for_jobs=False)
+        self.cell_diagnosis_model.release_results(
+            self.cell_diagnosis_model.reset(wait_for_jobs=False)
+        )
 
         # Reset predictions handler
         self.predictions_handler.reset()
@@ -162,7 +214,9 @@ class MalariaScope:
         self.ht_sensor.stop()
         self.flow_controller.stop()
         self.autofocus_model.reset(wait_for_jobs=False)
-        self.cell_diagnosis_model.reset(wait_for_jobs=False)
+        self.cell_diagnosis_model.release_results(
+            self.cell_diagnosis_model.reset(wait_for_jobs=False)
+        )
 
         if self.camera._isActivated:
             self.camera.deactivateCamera()
@@ -139,11 +139,8 @@ class Routines:
                 img = yield steps_from_focus, filtered_error, adjusted
                 adjusted = False
 
-                # if mscope.autofocus_model._executor._work_queue.full(), this will block
-                # until an element is removed from the queue
-                # TODO watch performance, if blocking a lot then we must subclass ThreadPoolExecutor and change
-                # https://github.com/python/cpython/blob/a712c5f42d5904e1a1cdaf11bd1f05852cfdd830/Lib/concurrent/futures/thread.py#L175
-                # to `put_nowait`
+                # if the autofocus submission queue is full, the oldest queued frame
+                # is dropped (AF_QUEUE_POLICY) rather than blocking here
                 mscope.autofocus_model.asyn(img, img_counter)
                 results = mscope.autofocus_model.get_asyn_results(timeout=0.005) or []
 
@@ -343,7 +340,8 @@ class Routines:
         # First set the LED off and acquire an image
         mscope.led.turnOff()
         sleep(0.25)
-        img_off = yield
+        # a copy, since it's kept after the frame is given back to the camera
+        img_off = (yield).copy()
 
         # Turn the led on to max and acquire an image
         mscope.led.turnOn()
@@ -29,6 +29,10 @@ class SimCamera(CameraBase):
             self.video = cv2.VideoCapture(str(VIDEO_PATH))
             self.frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
             self.fps = self.video.get(cv2.CAP_PROP_FPS)
+            self.frame_shape = (
+                int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            )
 
         except Exception as e:
             print(e)
@@ -47,7 +51,9 @@ class SimCamera(CameraBase):
             if not success:
                 self.video = cv2.VideoCapture(str(VIDEO_PATH))
                 success, frame = self.video.read()
-            yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), perf_counter()
+            # converted straight into a frame from the pool, if one is free
+            img = self._lease_frame(frame.shape[:2])
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=img), perf_counter()
             sleep(1 / self.fps)
 
     def snapImage(self):
@@ -2,7 +2,7 @@ import io
 import csv
 import shutil
 import logging
-from os import remove
+from os import remove, replace
 from pathlib import Path
 from time import perf_counter
 from datetime import datetime
@@ -230,6 +230,8 @@ class DataStorage:
         self,
         pred_tensors: Optional[npt.NDArray] = None,
         heatmap: Optional[npt.NDArray] = None,
+        class_counts: Optional[npt.NDArray] = None,
+        pred_tensors_file: Optional[Path] = None,
     ) -> Optional[Future]:
         """Close the per-image metadata .csv file and Zarr image store
 
@@ -239,6 +241,13 @@ class DataStorage:
             Parsed predictions tensors from PredictionsHandler()
         heatmap: Optional[npt.NDArray]
             Heatmap from PredictionsHandler()
+        class_counts: Optional[npt.NDArray]
+            Per-class counts of `pred_tensors` (PredictionsHandler().class_counts),
+            counted from `pred_tensors` if not given
+        pred_tensors_file: Optional[Path]
+            .npy file `pred_tensors` were already streamed to (from
+            get_prediction_spill_path()), which is then moved into place rather
+            than saving them again
 
         Returns
         -------
@@ -249,6 +258,9 @@ class DataStorage:
 
         self.logger.info(f"{'='*10}Closing data storage.{'='*10}")
 
+        # so the images below are read back from the store in full
+        self.zw.flush()
+
         self.logger.info("> Saving subsample images...")
         self.save_uniform_sample()
 
@@ -257,9 +269,16 @@ class DataStorage:
             self.metadata_file.close()
             self.metadata_file = None
 
-        if pred_tensors is not None and pred_tensors.size > 0:
+        # moved into place even if there are no predictions, so the partial file
+        # isn't left behind
+        if pred_tensors_file is not None:
             self.logger.info("> Saving prediction tensors...")
-            self.save_npy_arr("parsed_prediction_tensors", pred_tensors)
+            self.move_npy_file(pred_tensors_file, "parsed_prediction_tensors")
+
+        if pred_tensors is not None and pred_tensors.size > 0:
+            if pred_tensors_file is None:
+                self.logger.info("> Saving prediction tensors...")
+                self.save_npy_arr("parsed_prediction_tensors", pred_tensors)
 
             if heatmap is not None:
                 self.logger.info("> Saving heatmap array...")
@@ -323,7 +342,10 @@ class DataStorage:
                     self.logger.error(f"Failed to make yogo objectness plots - {e}")
 
             # Get cell counts
-            raw_cell_counts = np.asarray(get_class_counts(pred_tensors))
+            if class_counts is not None:
+                raw_cell_counts = np.asarray(class_counts)
+            else:
+                raw_cell_counts = np.asarray(get_class_counts(pred_tensors))
             # Associate class with counts
             class_name_to_cell_count = {
                 x.capitalize(): y for (x, y) in zip(YOGO_CLASS_LIST, raw_cell_counts)
@@ -440,16 +462,46 @@ class DataStorage:
         ----------
         filename: str
         arr: npt.NDArray
-            The numpy array to save
+            The numpy array to save (as float32, unless it's a structured array,
+            e.g. prediction records, which are saved as they are)
         """
 
         assert self.main_dir is not None, "DataStorage has not been initialized"
         try:
             filename = self.main_dir / self.experiment_folder / f"{self.time_str}_{fn}"
-            np.save(filename, arr.astype(np.float32))
+            np.save(
+                filename, arr if arr.dtype.names is not None else arr.astype(np.float32)
+            )
         except Exception as e:
             self.logger.error(f"Error saving {filename}: {e}")
 
+    def get_prediction_spill_path(self) -> Path:
+        """Where PredictionsHandler streams the predictions to during the run (and where
+        they can be recovered from if the run never finishes)
+        """
+        return (
+            self.get_experiment_path()
+            / f"{self.time_str}_parsed_prediction_tensors_partial.npy"
+        )
+
+    def move_npy_file(self, src: Path, fn: str) -> None:
+        """Move an .npy file to where `save_npy_arr` would have saved it as `fn`
+
+        Parameters
+        ----------
+        src: Path
+        fn: str
+        """
+
+        assert self.main_dir is not None, "DataStorage has not been initialized"
+        try:
+            filename = (
+                self.main_dir / self.experiment_folder / f"{self.time_str}_{fn}.npy"
+            )
+            replace(src, filename)
+        except Exception as e:
+            self.logger.error(f"Error moving {src} to {filename}: {e}")
+
     def save_uniform_sample(self) -> None:
         """Extract and save a uniform random sample of images from the currently active Zarr store.
 
@@ -457,7 +509,7 @@ class DataStorage:
         A new subfolder is created in the same folder as the experiment and images are saved as .pngs.
         """
 
-        num_files = self.zw.array.nchunks_initialized
+        num_files = self.zw.num_frames_written()
         try:
             indices = self._unif_subsequence_distribution(
                 max_val=num_files,
@@ -1,8 +1,10 @@
+import os
 import enum
 
 from pathlib import Path
 
 from ulc_mm_package.scope_constants import SIMULATION
+from ulc_mm_package.utilities.queue_policy import QueuePolicy
 
 
 # ================ Flowrate options ================ #
@@ -55,6 +57,41 @@ else:
 NUM_SUBSEQUENCES = 10
 SUBSEQUENCE_LENGTH = 10
 
+# Lossless codec the Zarr store's frames are compressed with (see ZARR_CODECS in
+# zarrwriter.py): "none" (raw), "blosc-lz4", "zstd" or "bitshuffle-lz4". Frames are
+# compressed by ZARR_NUM_WORKERS threads (raw frames are written by one).
+ZARR_CODEC = os.environ.get("MS_ZARR_CODEC", "none")
+ZARR_NUM_WORKERS = int(os.environ.get("MS_ZARR_NUM_WORKERS", 3))
+# Number of consecutive frames stored together as one chunk of the Zarr array. Fewer,
+# bigger chunks mean fewer entries in the zip (faster to close, and to read through
+# time), at the cost of staging a chunk's worth of frames in memory.
+ZARR_FRAMES_PER_CHUNK = int(os.environ.get("MS_ZARR_FRAMES_PER_CHUNK", 1))
+
+
+class ZarrStoreType(enum.Enum):
+    """Where the Zarr array's chunks are written to during the run"""
+
+    ZIP = "zip"  # straight into the .zip, one chunk at a time
+    DIRECTORY = "directory"  # one file per chunk, written by ZARR_NUM_WORKERS threads
+
+
+ZARR_STORE_TYPE = ZarrStoreType(
+    os.environ.get("MS_ZARR_STORE_TYPE", ZarrStoreType.ZIP.value)
+)
+# Whether a directory store is packed into a .zip (what the analysis tools read) in
+# the background once the run is closed
+ZARR_PACK_TO_ZIP = bool(int(os.environ.get("MS_ZARR_PACK_TO_ZIP", 1)))
+# Most frames that can be waiting to be written (about 2 s of acquisition), so a
+# stalled SSD can't fill up RAM. When it's full, new writes are handled according to
+# ZARR_QUEUE_POLICY - by default the acquisition loop waits, so no frames are lost.
+ZARR_QUEUE_CAPACITY = int(os.environ.get("MS_ZARR_QUEUE_CAPACITY", 64))
+ZARR_QUEUE_POLICY = QueuePolicy(
+    os.environ.get("MS_ZARR_QUEUE_POLICY", QueuePolicy.BLOCK.value)
+)
+# With BLOCK, a write that waits at least this long (s) for room is logged as a warning
+# (as is the first one that waits at all)
+ZARR_BLOCK_WARN_S = 0.1
+
 # ================ Cell detection constants ================ #
 _RBC_THUMBNAIL_PATH = Path(__file__).parent.resolve() / "thumbnail.png"
 if not _RBC_THUMBNAIL_PATH.exists():
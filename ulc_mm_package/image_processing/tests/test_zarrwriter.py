@@ -0,0 +1,152 @@
+import time
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+import zarr
+
+from ulc_mm_package.scope_constants import CameraOptions
+from ulc_mm_package.utilities.buffer_pool import BufferPool
+from ulc_mm_package.utilities.queue_policy import QueuePolicy
+from ulc_mm_package.image_processing.zarrwriter import ZarrWriter, get_num_frames
+
+
+class TestZarrWriter(unittest.TestCase):
+    """Frames 0, 4, 8, ... each start a chunk of 4, so every chunk is partly filled and
+    the staging pool (3 chunks for a queue of 8 frames) runs out before the queue does
+    """
+
+    num_frames = 6
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.gate = threading.Event()
+        # in case a write blocks when it shouldn't
+        self.timer = threading.Timer(5, self.gate.set)
+        self.timer.start()
+
+    def tearDown(self):
+        self.gate.set()
+        self.timer.cancel()
+        self.tmp_dir.cleanup()
+
+    def _writer(self, policy: QueuePolicy) -> ZarrWriter:
+        zw = ZarrWriter(
+            CameraOptions.AVT,
+            codec="none",
+            frames_per_chunk=4,
+            queue_capacity=8,
+            queue_policy=policy,
+        )
+        zw.createNewFile(f"{self.tmp_dir.name}/run")
+        # hold each staged chunk (and its buffer) until the gate opens
+        write_staged = zw._write_staged
+
+        def gated_write_staged(*args):
+            self.gate.wait()
+            write_staged(*args)
+
+        zw._write_staged = gated_write_staged
+        return zw
+
+    def _write(self, zw: ZarrWriter) -> None:
+        shape = (CameraOptions.AVT.IMG_HEIGHT, CameraOptions.AVT.IMG_WIDTH)
+        for i in range(self.num_frames):
+            zw.threadedWriteSingleArray(np.full(shape, i + 1, dtype=np.uint8), 4 * i)
+
+    def _frames_written(self, zw: ZarrWriter):
+        self.gate.set()
+        zw.flush()
+        zw.closeFile()
+        data = zarr.open(f"{self.tmp_dir.name}/run.zip", mode="r")
+        self.assertEqual(get_num_frames(data), 4 * self.num_frames - 3)
+        return [i for i in range(self.num_frames) if (data[:, :, 4 * i] == i + 1).all()]
+
+    def _assert_doesnt_block(self, zw: ZarrWriter) -> None:
+        t0 = time.perf_counter()
+        self._write(zw)
+        self.assertLess(time.perf_counter() - t0, 1)
+
+    def test_block(self):
+        zw = self._writer(QueuePolicy.BLOCK)
+        writer = threading.Thread(target=self._write, args=(zw,))
+        with self.assertLogs(zw.logger, "WARNING") as logs:
+            writer.start()
+            writer.join(timeout=0.2)
+            self.assertTrue(writer.is_alive())
+
+            self.gate.set()
+            writer.join()
+        self.assertIn("waited", logs.output[0])
+        self.assertEqual(self._frames_written(zw), list(range(self.num_frames)))
+        self.assertEqual(zw.queue_stats().dropped, 0)
+
+    def test_drop_newest(self):
+        zw = self._writer(QueuePolicy.DROP_NEWEST)
+        self._assert_doesnt_block(zw)
+        self.assertEqual(self._frames_written(zw), [0, 1, 2])
+        self.assertEqual(zw.queue_stats().dropped, 3)
+
+    def test_drop_oldest(self):
+        zw = self._writer(QueuePolicy.DROP_OLDEST)
+        self._assert_doesnt_block(zw)
+        # the first chunk's write has started, so it can't be dropped
+        self.assertEqual(self._frames_written(zw), [0, 4, 5])
+        self.assertEqual(zw.queue_stats().dropped, 3)
+
+    def test_keep_every_nth(self):
+        zw = self._writer(QueuePolicy.KEEP_EVERY_NTH)
+        self._assert_doesnt_block(zw)
+        self.assertEqual(self._frames_written(zw), [0, 2, 4])
+        self.assertEqual(zw.queue_stats(), (0, 3, 0, 3))
+
+    def test_write_single_array_stages(self):
+        zw = ZarrWriter(CameraOptions.AVT, codec="none", frames_per_chunk=4)
+        zw.createNewFile(f"{self.tmp_dir.name}/run")
+        shape = (CameraOptions.AVT.IMG_HEIGHT, CameraOptions.AVT.IMG_WIDTH)
+        for i in range(6):
+            zw.writeSingleArray(np.full(shape, i + 1, dtype=np.uint8), i)
+        # the first chunk was written once it filled up, the second is still staged
+        self.assertEqual(zw.num_frames_written(), 4)
+        self.assertEqual(zw.queue_depth(), 2)
+
+        zw.closeFile()
+        data = zarr.open(f"{self.tmp_dir.name}/run.zip", mode="r")
+        self.assertEqual(get_num_frames(data), 6)
+        for i in range(6):
+            self.assertTrue((data[:, :, i] == i + 1).all())
+
+    def test_frame_leases(self):
+        zw = ZarrWriter(CameraOptions.AVT, codec="none", frames_per_chunk=1)
+        zw.createNewFile(f"{self.tmp_dir.name}/run")
+        zw.frame_pool = BufferPool(
+            (CameraOptions.AVT.IMG_HEIGHT, CameraOptions.AVT.IMG_WIDTH),
+            np.uint8,
+            size=2,
+        )
+        write_single_array = zw.writeSingleArray
+
+        def gated_write_single_array(*args):
+            self.gate.wait()
+            write_single_array(*args)
+
+        zw.writeSingleArray = gated_write_single_array
+
+        idx = zw.frame_pool.acquire()
+        zw.frame_pool.buffers[idx][:] = 1
+        zw.threadedWriteSingleArray(zw.frame_pool.buffers[idx], 0)
+        zw.frame_pool.release(idx)
+        # the writer's lease keeps it out of the pool until it's been written
+        self.assertEqual(zw.frame_pool.refcount(idx), 1)
+
+        self.gate.set()
+        zw.flush()
+        self.assertEqual(zw.frame_pool.refcount(idx), 0)
+        zw.closeFile()
+        data = zarr.open(f"{self.tmp_dir.name}/run.zip", mode="r")
+        self.assertTrue((data[:, :, 0] == 1).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,13 +6,61 @@ Library Documentation:
 
 """
 
+import os
 import zarr
+import shutil
 import logging
+import zipfile
+import threading
 
-from typing import List
+import numpy as np
+
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 from concurrent.futures import ALL_COMPLETED, ThreadPoolExecutor, Future, wait
+from numcodecs import Blosc, Zstd
+from numcodecs.abc import Codec
 
 from ulc_mm_package.scope_constants import CameraOptions, CAMERA_SELECTION, MAX_FRAMES
+from ulc_mm_package.image_processing.processing_constants import (
+    ZARR_CODEC,
+    ZARR_FRAMES_PER_CHUNK,
+    ZARR_NUM_WORKERS,
+    ZARR_PACK_TO_ZIP,
+    ZARR_QUEUE_CAPACITY,
+    ZARR_QUEUE_POLICY,
+    ZARR_BLOCK_WARN_S,
+    ZARR_STORE_TYPE,
+    ZarrStoreType,
+)
+from ulc_mm_package.utilities.queue_policy import QUEUE_KEEP_EVERY_N, QueuePolicy
+from ulc_mm_package.utilities.buffer_pool import BufferPool
+
+# Lossless codecs for the frames. Most of a frame is flat background, which all of
+# these shrink a lot; bit-shuffling first can do better on the noisier parts.
+ZARR_CODECS: Dict[str, Callable[[], Optional[Codec]]] = {
+    "none": lambda: None,
+    "blosc-lz4": lambda: Blosc(cname="lz4", clevel=5, shuffle=Blosc.NOSHUFFLE),
+    "zstd": lambda: Zstd(level=1),
+    "bitshuffle-lz4": lambda: Blosc(cname="lz4", clevel=5, shuffle=Blosc.BITSHUFFLE),
+}
+
+
+# Array attribute the number of frames is recorded in when the file is closed. With
+# multi-frame chunks, the number of initialized chunks isn't the number of frames.
+NUM_FRAMES_ATTR = "num_frames"
+
+
+def get_num_frames(array: zarr.Array) -> int:
+    """Number of frames in a zarr array written by ZarrWriter
+
+    Files closed before NUM_FRAMES_ATTR was recorded are assumed to have every
+    initialized chunk full (exact for single-frame chunks).
+    """
+    if NUM_FRAMES_ATTR in array.attrs:
+        return int(array.attrs[NUM_FRAMES_ATTR])
+    return min(array.nchunks_initialized * array.chunks[2], array.shape[2])
 
 
 class AttemptingWriteWithoutFile(Exception):
@@ -29,15 +77,176 @@ class WriteInProgress(Exception):
         return "Write in progress."
 
 
+class CompressionStats(NamedTuple):
+    num_frames: int
+    raw_bytes: int
+    encoded_bytes: int
+    encode_s: float  # total, over all the threads
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / self.encoded_bytes if self.encoded_bytes > 0 else 1.0
+
+
+class WriteQueueStats(NamedTuple):
+    depth: int  # frames given, but not written yet
+    written: int  # frames written to the store
+    failed: int  # frames whose write raised
+    dropped: int  # frames never written because the queue was full
+
+
+def pack_directory_store(src: Path, dst: Path, remove_src: bool = True) -> None:
+    """Pack a zarr.DirectoryStore into a .zip that zarr.ZipStore can read
+
+    The zip is written next to `dst` and only renamed to `dst` once it's complete,
+    so `dst` is never a partial zip, and `src` is only removed after that.
+
+    Parameters
+    ----------
+    src : Path
+        The directory store
+    dst : Path
+        The .zip to write
+    remove_src : bool
+        Whether to remove `src` once it's packed
+    """
+    src, dst = Path(src), Path(dst)
+    partial = dst.with_name(dst.name + ".partial")
+    # stored uncompressed, like ZipStore writes them - chunks are compressed already
+    with zipfile.ZipFile(partial, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for path in sorted(src.rglob("*")):
+            if path.is_file():
+                zf.write(path, arcname=path.relative_to(src).as_posix())
+    os.replace(partial, dst)
+
+    if remove_src:
+        shutil.rmtree(src)
+
+
 class ZarrWriter:
-    def __init__(self, camera_selection: CameraOptions = CAMERA_SELECTION):
+    def __init__(
+        self,
+        camera_selection: CameraOptions = CAMERA_SELECTION,
+        codec: str = ZARR_CODEC,
+        num_workers: int = ZARR_NUM_WORKERS,
+        frames_per_chunk: int = ZARR_FRAMES_PER_CHUNK,
+        store_type: ZarrStoreType = ZARR_STORE_TYPE,
+        pack_to_zip: bool = ZARR_PACK_TO_ZIP,
+        queue_capacity: Optional[int] = ZARR_QUEUE_CAPACITY,
+        queue_policy: QueuePolicy = ZARR_QUEUE_POLICY,
+    ):
+        """
+        Parameters
+        ----------
+        camera_selection : CameraOptions
+        codec : str
+            Key of ZARR_CODECS to compress the frames with
+        num_workers : int
+            Number of threads frames are compressed in (raw frames are written by one)
+        frames_per_chunk : int
+            Number of consecutive frames in a chunk. If more than 1, frames given to
+            `threadedWriteSingleArray` are staged in memory until their chunk is full
+            (or `flush`/`closeFile` is called), and then written as one.
+        store_type : ZarrStoreType
+            ZIP writes straight into the .zip, which only takes one write at a time.
+            DIRECTORY writes each chunk to its own file in a .zarr directory, with up
+            to `num_workers` threads writing at once (even if frames are raw).
+        pack_to_zip : bool
+            For a DIRECTORY store, whether to pack it into a .zip (and remove the
+            directory) in the background once the file is closed
+        queue_capacity : Optional[int]
+            Most frames that can be waiting to be written (None for no limit). With
+            multi-frame chunks, it also bounds the memory used to stage them, so it
+            must be at least `frames_per_chunk`.
+        queue_policy : QueuePolicy
+            What happens to a write when the queue is full: BLOCK waits for room,
+            DROP_NEWEST drops it, DROP_OLDEST drops the oldest writes that haven't
+            started, and KEEP_EVERY_NTH admits every QUEUE_KEEP_EVERY_Nth (like
+            DROP_OLDEST) and drops the rest
+        """
+        if codec not in ZARR_CODECS:
+            raise ValueError(
+                f"unknown codec {codec!r}, should be one of {list(ZARR_CODECS)}"
+            )
+        if frames_per_chunk < 1:
+            raise ValueError(
+                f"frames_per_chunk must be at least 1, got {frames_per_chunk}"
+            )
+        if queue_capacity is not None and queue_capacity < frames_per_chunk:
+            raise ValueError(
+                f"queue_capacity ({queue_capacity}) must be at least "
+                f"frames_per_chunk ({frames_per_chunk})"
+            )
+
         self.writable = False
-        self.futures: List[Future] = []
+        self.queue_capacity = queue_capacity
+        self.queue_policy = queue_policy
+        # writes that haven't finished (oldest first), each with the number of frames
+        # in it, and the staging buffer and the frame from `frame_pool` it holds (if any)
+        self._pending: Dict[Future, Tuple[int, Optional[int], Optional[int]]] = {}
+        # Pool that frames given to `threadedWriteSingleArray` may be from (e.g. the
+        # camera's). Frames from it that are written in the background are leased until
+        # they've been written, so whoever gave them can release theirs right away.
+        self.frame_pool: Optional[BufferPool] = None
+        self._queue_cv = threading.Condition()
+        self._num_queued = 0  # frames in _pending
+        self._num_failed = 0
+        self._num_dropped = 0
+        self._num_while_full = 0  # writes seen while full, for KEEP_EVERY_NTH
+        # writes that had to wait for room (BLOCK), and how long they waited in all
+        self._num_blocked = 0
+        self._blocked_s = 0.0
+        self._errors: List[BaseException] = []
         self.logger = logging.getLogger(__name__)
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.codec = codec
+        self.compressor: Optional[Codec] = None
+        self.store_type = store_type
+        self.pack_to_zip = pack_to_zip
+        # a ZipStore writes one chunk at a time, so with nothing to compress, more
+        # threads would only wait on each other
+        max_workers = (
+            1 if codec == "none" and store_type == ZarrStoreType.ZIP else num_workers
+        )
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # packing is IO-bound and can wait, so it gets its own low-priority thread
+        # (see _pack) rather than competing with the writes
+        self._pack_executor = ThreadPoolExecutor(max_workers=1)
+        # closing waits for the writes to finish, so it can't run in `executor`
+        self._close_executor = ThreadPoolExecutor(max_workers=1)
+        self.pack_future: Optional[Future] = None
+        self._stats_lock = threading.Lock()
+        self._stats = CompressionStats(0, 0, 0, 0.0)
+        self._num_frames = 0  # see _count_frame
 
         self.camera_selection: CameraOptions = camera_selection
 
+        # chunks being filled are staged in the array's (H, W, K) layout, so they're
+        # encoded (or stored) straight from the staging buffer when written.
+        # One is being filled while the others wait for (or are in) the executor.
+        # There are enough of them for a queue of full chunks; partly filled ones can
+        # still use them up first, which is handled like a full queue (see
+        # _acquire_staging)
+        self.frames_per_chunk = frames_per_chunk
+        self._staging: Optional[BufferPool] = None
+        if frames_per_chunk > 1:
+            self._staging = BufferPool(
+                (
+                    camera_selection.IMG_HEIGHT,
+                    camera_selection.IMG_WIDTH,
+                    frames_per_chunk,
+                ),
+                np.uint8,
+                size=(
+                    max_workers + 2
+                    if queue_capacity is None
+                    else queue_capacity // frames_per_chunk + 1
+                ),
+            )
+        self._staging_lock = threading.Lock()
+        self._staged_idx: Optional[int] = None
+        self._staged_chunk = 0
+        self._staged = np.zeros(frames_per_chunk, dtype=bool)
+
     def createNewFile(self, filename: str, overwrite: bool = True):
         """Create a new zarr file.
 
@@ -45,14 +254,34 @@ class ZarrWriter:
         ----------
         filename : str
             Filename, don't include the extension (i.e pass "new_file" not "new_file.zip").
+            A DIRECTORY store is made at "new_file.zarr" (and packed to "new_file.zip").
         overwrite : bool
             Will overwrite a file with the existing filename if it exists, otherwise will append.
         """
         try:
-            self.store = zarr.ZipStore(
-                f"{filename}.zip",
-                mode="w" if overwrite else "x",
-            )
+            self.compressor = ZARR_CODECS[self.codec]()
+            with self._stats_lock:
+                self._stats = CompressionStats(0, 0, 0, 0.0)
+            with self._queue_cv:
+                self._num_failed = 0
+                self._num_dropped = 0
+                self._num_blocked = 0
+                self._blocked_s = 0.0
+                self._errors = []
+            self._num_frames = 0
+            self.filename = filename
+            if self.store_type == ZarrStoreType.ZIP:
+                self.store = zarr.ZipStore(
+                    f"{filename}.zip",
+                    mode="w" if overwrite else "x",
+                )
+            else:
+                store_dir = Path(f"{filename}.zarr")
+                if store_dir.exists():
+                    if not overwrite:
+                        raise IOError(f"{store_dir} already exists")
+                    shutil.rmtree(store_dir)
+                self.store = zarr.DirectoryStore(str(store_dir))
             self.array = zarr.zeros(
                 shape=(
                     self.camera_selection.IMG_HEIGHT,
@@ -62,9 +291,9 @@ class ZarrWriter:
                 chunks=(
                     self.camera_selection.IMG_HEIGHT,
                     self.camera_selection.IMG_WIDTH,
-                    1,
+                    self.frames_per_chunk,
                 ),
-                compressor=None,
+                compressor=self.compressor,
                 store=self.store,
                 dtype="u1",
             )
@@ -83,48 +312,382 @@ class ZarrWriter:
         data : np.ndarray - the image to write
         pos: int - the index of the zarr array to write to
 
-        Since each `pos` is a different chunk, it is threadsafe - see
+        If each chunk is a single frame, each `pos` is a different chunk, so it is
+        threadsafe - see
         https://zarr.readthedocs.io/en/stable/tutorial.html#parallel-computing-and-synchronization
+        Otherwise the frame is staged like `threadedWriteSingleArray`'s, and its chunk
+        is written here once it's full (or by `flush` / `closeFile`), rather than
+        read back and rewritten for every frame.
         """
         if not self.writable:
             return
+        self._count_frame(pos)
+
+        if self._staging is not None:
+            self._stage(data, pos, wait=True)
+            return
 
+        if self.compressor is None:
+            try:
+                self.array[:, :, pos] = data
+            except Exception as e:
+                self.logger.error(
+                    f"zarrwriter.py : writeSingleArray : Exception encountered - {e}"
+                )
+                # FIXME is this the only exception? we should make it a general "ZarrWriterMessedUp" error
+                raise AttemptingWriteWithoutFile()
+            self._add_stats(1, data.nbytes, data.nbytes, 0.0)
+        else:
+            self._write_chunk(pos, data, 1)
+
+    def _write_chunk(self, chunk_idx: int, chunk: np.ndarray, num_frames: int) -> None:
+        """Write `chunk` (the whole chunk, with `num_frames` frames in it) as the
+        `chunk_idx`th chunk along time, compressing it first if there's a compressor
+        """
         try:
-            self.array[:, :, pos] = data
+            if chunk_idx >= self.array.nchunks:
+                raise IndexError(
+                    f"chunk {chunk_idx} is out of bounds of the array's "
+                    f"{self.array.nchunks} chunks"
+                )
+            if self.compressor is None:
+                encoded = np.ascontiguousarray(chunk, dtype=np.uint8)
+                encode_s, encoded_bytes = 0.0, encoded.nbytes
+            else:
+                # compressed here rather than by zarr, to time it
+                t0 = perf_counter()
+                encoded = self.compressor.encode(
+                    np.ascontiguousarray(chunk, dtype=np.uint8)
+                )
+                encode_s, encoded_bytes = perf_counter() - t0, len(encoded)
+            # chunks span whole frames, so this is chunk (0, 0, chunk_idx). Each chunk is
+            # its own key, so writing them from several threads is safe with either store
+            self.store[f"0.0.{chunk_idx}"] = encoded
         except Exception as e:
             self.logger.error(
-                f"zarrwriter.py : writeSingleArray : Exception encountered - {e}"
+                f"zarrwriter.py : _write_chunk : Exception encountered - {e}"
             )
             # FIXME is this the only exception? we should make it a general "ZarrWriterMessedUp" error
             raise AttemptingWriteWithoutFile()
 
+        raw_bytes = chunk.nbytes * num_frames // self.frames_per_chunk
+        self._add_stats(num_frames, raw_bytes, encoded_bytes, encode_s)
+
+    def _add_stats(
+        self, num_frames: int, raw_bytes: int, encoded_bytes: int, encode_s: float
+    ) -> None:
+        with self._stats_lock:
+            s = self._stats
+            self._stats = CompressionStats(
+                s.num_frames + num_frames,
+                s.raw_bytes + raw_bytes,
+                s.encoded_bytes + encoded_bytes,
+                s.encode_s + encode_s,
+            )
+
+    def _stage(self, data, pos: int, wait: bool = False) -> None:
+        """Copy frame `pos` into the chunk being filled, and send the chunk off to be
+        written (or write it now, if `wait`) once it's full. Frames are expected in increasing order of `pos`; if
+        `pos` is in another chunk, the current one is sent off as it is.
+        """
+        assert self._staging is not None
+        chunk_idx, offset = divmod(pos, self.frames_per_chunk)
+        with self._staging_lock:
+            if self._staged_idx is not None and chunk_idx != self._staged_chunk:
+                self._submit_staged(wait)
+            if self._staged_idx is None:
+                self._staged_idx = self._acquire_staging()
+                if self._staged_idx is None:
+                    with self._queue_cv:
+                        self._num_dropped += 1
+                    return
+                self._staged_chunk = chunk_idx
+                self._staged[:] = False
+
+            self._staging.buffers[self._staged_idx][:, :, offset] = data
+            self._staged[offset] = True
+            if self._staged.all():
+                self._submit_staged(wait)
+
+    def _acquire_staging(self) -> Optional[int]:
+        """A free staging buffer for a new chunk, or None if its first frame is to be
+        dropped. If they're all in use, `queue_policy` decides as it does for a full
+        queue, evicting the oldest staged writes that haven't started to free one.
+        Call with `_staging_lock` held.
+        """
+        assert self._staging is not None
+        if self.queue_policy == QueuePolicy.BLOCK:
+            idx = self._staging.acquire(timeout=0)
+            if idx is None:
+                t0 = perf_counter()
+                idx = self._staging.acquire()
+                with self._queue_cv:
+                    self._count_block(perf_counter() - t0)
+            return idx
+
+        idx = self._staging.acquire(timeout=0)
+        if idx is not None or self.queue_policy == QueuePolicy.DROP_NEWEST:
+            return idx
+
+        with self._queue_cv:
+            if self.queue_policy == QueuePolicy.KEEP_EVERY_NTH:
+                self._num_while_full += 1
+                if self._num_while_full % QUEUE_KEEP_EVERY_N != 0:
+                    return None
+            # cancelling releases the buffer (see _on_write_done). Writes that have
+            # started release theirs once they're written
+            for f, (_, staging_idx, _) in list(self._pending.items()):
+                if staging_idx is not None and f.cancel():
+                    break
+        return self._staging.acquire(timeout=0)
+
+    def _submit_staged(self, wait: bool = False) -> None:
+        """Send the chunk being filled off to be written (or write it now, if `wait`),
+        zeroing the frames that were never staged. Call with `_staging_lock` held.
+        """
+        assert self._staging is not None and self._staged_idx is not None
+        idx, chunk_idx = self._staged_idx, self._staged_chunk
+        num_frames = int(self._staged.sum())
+        self._staging.buffers[idx][:, :, ~self._staged] = 0
+        self._staged_idx = None
+
+        if wait:
+            self._write_staged(self._staging, idx, chunk_idx, num_frames)
+        else:
+            self._submit(
+                num_frames,
+                idx,
+                None,
+                self._write_staged,
+                self._staging,
+                idx,
+                chunk_idx,
+                num_frames,
+            )
+
+    def _write_staged(
+        self, staging: BufferPool, idx: int, chunk_idx: int, num_frames: int
+    ) -> None:
+        try:
+            self._write_chunk(chunk_idx, staging.buffers[idx], num_frames)
+        finally:
+            staging.release(idx)
+
+    def compression_stats(self) -> CompressionStats:
+        """How well the frames written to the current (or last) file compressed"""
+        with self._stats_lock:
+            return self._stats
+
+    def num_frames_written(self) -> int:
+        """Number of frames written to the current (or last) file so far"""
+        return self.compression_stats().num_frames
+
+    def queue_depth(self) -> int:
+        """Number of frames given to `threadedWriteSingleArray` that haven't been
+        written yet (queued, being written, or staged in a chunk that isn't full)
+        """
+        with self._queue_cv:
+            depth = self._num_queued
+        with self._staging_lock:
+            if self._staged_idx is not None:
+                depth += int(self._staged.sum())
+        return depth
+
+    def queue_stats(self) -> WriteQueueStats:
+        """Write counts for the current (or last) file"""
+        depth = self.queue_depth()
+        with self._queue_cv:
+            return WriteQueueStats(
+                depth, self.num_frames_written(), self._num_failed, self._num_dropped
+            )
+
+    def _submit(
+        self,
+        num_frames: int,
+        staging_idx: Optional[int],
+        frame: Optional[np.ndarray],
+        fn,
+        *args,
+    ) -> None:
+        """Submit a write of `num_frames` frames to the executor, once there's room for
+        it in the queue (see `queue_policy`). If it's dropped instead, so is the
+        staging buffer it holds. If `frame` (the write's data) is from `frame_pool`,
+        it's leased until the write is done or dropped.
+        """
+        # before waiting for room, since whoever gave the frame may give it back
+        # meanwhile
+        frame_idx = self._retain_frame(frame)
+        with self._queue_cv:
+            if not self._make_room(num_frames):
+                self._num_dropped += num_frames
+                if staging_idx is not None:
+                    assert self._staging is not None
+                    self._staging.release(staging_idx)
+                self._release_frame(frame_idx)
+                return
+
+            f = self.executor.submit(fn, *args)
+            self._pending[f] = (num_frames, staging_idx, frame_idx)
+            self._num_queued += num_frames
+        # outside the lock, since it's called right away if `f` is already done
+        f.add_done_callback(self._on_write_done)
+
+    def _full(self, num_frames: int) -> bool:
+        return (
+            self.queue_capacity is not None
+            and self._num_queued + num_frames > self.queue_capacity
+        )
+
+    def _make_room(self, num_frames: int) -> bool:
+        """Whether a write of `num_frames` can be queued, after waiting or evicting
+        older writes as `queue_policy` says. Call with `_queue_cv` held.
+        """
+        if not self._full(num_frames):
+            self._num_while_full = 0
+            return True
+
+        if self.queue_policy == QueuePolicy.BLOCK:
+            t0 = perf_counter()
+            self._queue_cv.wait_for(lambda: not self._full(num_frames))
+            self._count_block(perf_counter() - t0)
+            return True
+        if self.queue_policy == QueuePolicy.DROP_NEWEST:
+            return False
+        if self.queue_policy == QueuePolicy.KEEP_EVERY_NTH:
+            self._num_while_full += 1
+            if self._num_while_full % QUEUE_KEEP_EVERY_N != 0:
+                return False
+
+        # evict the oldest writes that haven't started yet. Cancelling runs
+        # _on_write_done right here (the lock is reentrant), which counts them as
+        # dropped and takes them out of _pending
+        for f in list(self._pending):
+            if not self._full(num_frames):
+                break
+            f.cancel()
+        return not self._full(num_frames)
+
+    def _retain_frame(self, frame: Optional[np.ndarray]) -> Optional[int]:
+        """Take a lease on `frame` if it's from `frame_pool`, and return its index"""
+        if self.frame_pool is None or frame is None:
+            return None
+        idx = self.frame_pool.index_of(frame)
+        if idx is not None:
+            self.frame_pool.retain(idx)
+        return idx
+
+    def _release_frame(self, frame_idx: Optional[int]) -> None:
+        if frame_idx is not None:
+            assert self.frame_pool is not None
+            self.frame_pool.release(frame_idx)
+
+    def _count_block(self, waited_s: float) -> None:
+        """Count a write that waited `waited_s` for room, warning about the first one
+        (per file) and any long wait. Call with `_queue_cv` held.
+        """
+        self._num_blocked += 1
+        self._blocked_s += waited_s
+        if self._num_blocked == 1 or waited_s >= ZARR_BLOCK_WARN_S:
+            self.logger.warning(
+                f"Zarr write queue is full, so a write waited {waited_s * 1e3:.0f} ms "
+                f"for room ({self._num_blocked} writes have waited so far). Is the SSD "
+                "keeping up?"
+            )
+
+    def _on_write_done(self, f: Future) -> None:
+        with self._queue_cv:
+            num_frames, staging_idx, frame_idx = self._pending.pop(f)
+            self._num_queued -= num_frames
+            self._release_frame(frame_idx)
+            if f.cancelled():
+                self._num_dropped += num_frames
+                if staging_idx is not None:
+                    assert self._staging is not None
+                    self._staging.release(staging_idx)
+            elif f.exception() is not None:
+                self._num_failed += num_frames
+                if len(self._errors) < 10:
+                    self._errors.append(f.exception())
+            self._queue_cv.notify_all()
+
+    def _count_frame(self, pos: int) -> None:
+        """Frames are given by position, and some may be skipped, so the file holds as
+        many frames as the furthest position given
+        """
+        with self._stats_lock:
+            self._num_frames = max(self._num_frames, pos + 1)
+
     def threadedWriteSingleArray(self, data, pos: int):
-        f = self.executor.submit(self.writeSingleArray, data, pos)
-        self.futures.append(f)
+        if not self.writable:
+            return
+        self._count_frame(pos)
+        if self._staging is not None:
+            self._stage(data, pos)
+        else:
+            self._submit(1, None, data, self.writeSingleArray, data, pos)
 
     def wait_all(self):
-        wait(self.futures, return_when=ALL_COMPLETED)
+        with self._queue_cv:
+            pending = list(self._pending)
+        wait(pending, return_when=ALL_COMPLETED)
+
+    def flush(self):
+        """Send off the partly filled chunk (if there is one), and wait for all the
+        frames given so far to be written
+        """
+        with self._staging_lock:
+            if self._staged_idx is not None:
+                self._submit_staged()
+        self.wait_all()
 
     def closeFile(self):
         """Close the Zarr store."""
         self.writable = False
+        # written here rather than submitted, since new writes are no longer accepted
+        with self._staging_lock:
+            if self._staged_idx is not None:
+                try:
+                    self._submit_staged(wait=True)
+                except AttemptingWriteWithoutFile:
+                    pass  # already logged
         self.wait_all()
 
-        exceptions = []
-        for f in self.futures:
-            if f.exception() is not None:
-                exceptions.append(f.exception())
-
-        for i, exc in enumerate(exceptions):
+        queue_stats = self.queue_stats()
+        for exc in self._errors:
             self.logger.error(f"exception in zarrwriter: {exc}")
-            if i > 10:
-                self.logger.error(
-                    f"{len(exceptions) - i} exceptions left; {len(exceptions)} total"
-                )
-                break
+        with self._queue_cv:
+            num_blocked, blocked_s = self._num_blocked, self._blocked_s
+        if num_blocked > 0:
+            self.logger.warning(
+                f"{num_blocked} writes waited for room in the write queue, "
+                f"{blocked_s:.1f} s in all"
+            )
+        if queue_stats.failed > 0 or queue_stats.dropped > 0:
+            self.logger.error(
+                f"{queue_stats.failed} frames failed to be written, and "
+                f"{queue_stats.dropped} were dropped because the write queue was full"
+            )
 
-        self.futures = []
+        try:
+            with self._stats_lock:
+                self.array.attrs[NUM_FRAMES_ATTR] = self._num_frames
+        except Exception as e:
+            self.logger.error(
+                f"zarrwriter.py : closeFile : couldn't record the number of frames - {e}"
+            )
         self.store.close()
+        if self.store_type == ZarrStoreType.DIRECTORY and self.pack_to_zip:
+            self.pack_future = self._pack_executor.submit(
+                self._pack, Path(self.store.path), Path(f"{self.filename}.zip")
+            )
+
+        stats = self.compression_stats()
+        if stats.num_frames > 0:
+            self.logger.info(
+                f"Wrote {stats.num_frames} frames with codec {self.codec!r}: "
+                f"{stats.encoded_bytes / 1e9:.2f} GB, {stats.ratio:.2f}x smaller than raw, "
+                f"{stats.encode_s / stats.num_frames * 1e3:.2f} ms to encode a frame"
+            )
 
     def threadedCloseFile(self):
         """Close the file in a separate thread.
@@ -136,4 +699,23 @@ class ZarrWriter:
         -------
         future: An object that can be polled to check if closing the file has completed
         """
-        return self.executor.submit(self.closeFile)
+        return self._close_executor.submit(self.closeFile)
+
+    def _pack(self, src: Path, dst: Path) -> None:
+        # on Linux a nice value is per-thread, so this only deprioritizes the (packing
+        # only) thread this runs in
+        try:
+            os.nice(19)
+        except (AttributeError, OSError):
+            pass
+
+        t0 = perf_counter()
+        try:
+            pack_directory_store(src, dst)
+        except Exception as e:
+            self.logger.error(
+                f"zarrwriter.py : _pack : couldn't pack {src} into {dst} - {e}. "
+                f"The frames are still in {src}."
+            )
+            raise
+        self.logger.info(f"Packed {src} into {dst} in {perf_counter() - t0:.1f} s")
@@ -1,11 +1,14 @@
 #! /usr/bin/env python3
 
-import queue
+from typing import Sequence, Union
 
 from ulc_mm_package.neural_nets.NCSModel import NCSModel
 from ulc_mm_package.neural_nets.neural_network_constants import (
     AUTOFOCUS_MODEL_DIR,
     AF_QSIZE,
+    AF_QUEUE_POLICY,
+    AF_SYN_BATCH_SIZE,
+    INFERENCE_DEVICE,
 )
 
 
@@ -23,11 +26,14 @@ class AutoFocus(NCSModel):
     def __init__(
         self,
         model_path: str = AUTOFOCUS_MODEL_DIR,
+        device_name: Union[str, Sequence[str]] = INFERENCE_DEVICE,
     ):
-        super().__init__(model_path=model_path)
-
-        # Bypass mypy because it dislikes changing the queue type
-        self._executor._work_queue = queue.Queue(maxsize=AF_QSIZE)  # type:ignore
+        super().__init__(
+            model_path=model_path,
+            device_name=device_name,
+            queue_capacity=AF_QSIZE,
+            queue_policy=AF_QUEUE_POLICY,
+        )
 
     def __call__(self, input_img):
-        return self.syn(input_img)
+        return self.syn(input_img, batch_size=AF_SYN_BATCH_SIZE)
@@ -1,34 +1,57 @@
 #! /usr/bin/env python3
 
 import time
-import queue
+import logging
 import threading
 import numpy as np
 import operator as op
 import numpy.typing as npt
 
+from abc import ABC, abstractmethod
 from copy import copy
+from pathlib import Path
+from time import perf_counter
 from concurrent.futures import ThreadPoolExecutor
 
 from functools import partial
-from collections import namedtuple
+from collections import deque, namedtuple
 from typing import (
     Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
     List,
     Sequence,
     Optional,
+    Tuple,
     Union,
     TypeVar,
 )
 
 from ulc_mm_package.utilities.lock_utils import lock_timeout
-
+from ulc_mm_package.utilities.buffer_pool import BufferPool
+from ulc_mm_package.neural_nets.neural_network_constants import (
+    HOST_DEVICES,
+    INFERENCE_DEVICE,
+    MODEL_CACHE_DIR,
+    MOCK_DEVICE,
+    MYRIAD_DEVICE,
+    ONNX_DEVICE,
+    ONNX_NUM_JOBS,
+    device_kind,
+    parse_device_names,
+)
+from ulc_mm_package.utilities.queue_policy import QUEUE_KEEP_EVERY_N, QueuePolicy
 
 from openvino.preprocess import PrePostProcessor
 from openvino.runtime import (
     Core,
     Layout,
     Type,
+    PartialShape,
+    Tensor,
     InferRequest,
     AsyncInferQueue,
 )
@@ -42,6 +65,293 @@ class GPUError(Exception):
 
 
 AsyncInferenceResult = namedtuple("AsyncInferenceResult", ["id", "result"])
+QueueStats = namedtuple("QueueStats", ["depth", "accepted", "dropped"])
+
+
+class InferenceHandle:
+    """Handle on one asyn frame, returned by `NCSModel.asyn(..., return_handle=True)`
+
+    Timestamps are time.perf_counter() values, and None until they happen:
+        submitted: when asyn was called
+        started: when the frame was handed to the device
+        completed: when the result came back, or the frame was dropped
+
+    `result` is the frame's AsyncInferenceResult once it's done, and stays None if
+    the frame was dropped (then `dropped` is True) or inference failed.
+    """
+
+    __slots__ = (
+        "id",
+        "submitted",
+        "started",
+        "completed",
+        "result",
+        "dropped",
+        "_in_stream",
+        "_cv",
+    )
+
+    def __init__(self, id: Any, cv: threading.Condition, in_stream: bool):
+        self.id = id
+        self.submitted = time.perf_counter()
+        self.started: Optional[float] = None
+        self.completed: Optional[float] = None
+        self.result: Optional[AsyncInferenceResult] = None
+        self.dropped = False
+        # whether the result also goes to get_asyn_results
+        self._in_stream = in_stream
+        self._cv = cv
+
+    def done(self) -> bool:
+        return self.completed is not None
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[AsyncInferenceResult]:
+        """Block until the frame is done (or `timeout` seconds pass) and return its result"""
+        with self._cv:
+            self._cv.wait_for(self.done, timeout=timeout)
+        return self.result
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from asyn to the result, or None if there's no result (yet)"""
+        if self.result is None or self.completed is None:
+            return None
+        return self.completed - self.submitted
+
+
+class SubmissionQueue:
+    """Bounded queue of jobs waiting to be submitted to the inference device
+
+    `put` applies the admission policy when the queue is full (see QueuePolicy), and
+    returns whichever job was dropped (the new one, or an evicted old one) so the
+    caller can clean up after it. `get` blocks until there is a job; `task_done` and
+    `join` work like they do for queue.Queue.
+
+    capacity=None means unbounded (the policy is then never used).
+
+    `accepted` + `dropped` is the number of jobs that have been put; a job that is
+    evicted after being accepted moves from `accepted` to `dropped`.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        policy: QueuePolicy = QueuePolicy.BLOCK,
+        keep_every_n: int = QUEUE_KEEP_EVERY_N,
+    ):
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        if keep_every_n < 1:
+            raise ValueError(f"keep_every_n must be at least 1, got {keep_every_n}")
+
+        self.capacity = capacity
+        self.policy = policy
+        self.keep_every_n = keep_every_n
+
+        self._jobs: Deque[Any] = deque()
+        self._cv = threading.Condition()
+        self._unfinished = 0
+        # submissions seen while full, for KEEP_EVERY_NTH
+        self._num_while_full = 0
+
+        self.accepted = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        with self._cv:
+            return len(self._jobs)
+
+    def _full(self) -> bool:
+        return self.capacity is not None and len(self._jobs) >= self.capacity
+
+    def put(self, job: Any) -> Optional[Any]:
+        with self._cv:
+            dropped = None
+
+            if self._full():
+                if self.policy == QueuePolicy.BLOCK:
+                    self._cv.wait_for(lambda: not self._full())
+                elif self.policy == QueuePolicy.DROP_NEWEST:
+                    self.dropped += 1
+                    return job
+                elif self.policy == QueuePolicy.DROP_OLDEST:
+                    dropped = self._evict_oldest()
+                elif self.policy == QueuePolicy.KEEP_EVERY_NTH:
+                    self._num_while_full += 1
+                    if self._num_while_full % self.keep_every_n != 0:
+                        self.dropped += 1
+                        return job
+                    dropped = self._evict_oldest()
+            else:
+                self._num_while_full = 0
+
+            self._jobs.append(job)
+            self._unfinished += 1
+            self.accepted += 1
+            self._cv.notify_all()
+            return dropped
+
+    def _evict_oldest(self) -> Any:
+        self.accepted -= 1
+        self.dropped += 1
+        self._unfinished -= 1
+        return self._jobs.popleft()
+
+    def get(self) -> Any:
+        with self._cv:
+            self._cv.wait_for(lambda: len(self._jobs) > 0)
+            job = self._jobs.popleft()
+            self._cv.notify_all()
+            return job
+
+    def task_done(self) -> None:
+        with self._cv:
+            self._unfinished -= 1
+            self._cv.notify_all()
+
+    def join(self) -> None:
+        """Block until every job that was put has been gotten and marked as done"""
+        with self._cv:
+            self._cv.wait_for(lambda: self._unfinished == 0)
+
+    def clear(self) -> List[Any]:
+        """Drop all queued jobs (they are counted as dropped), and return them"""
+        with self._cv:
+            jobs = list(self._jobs)
+            self._jobs.clear()
+            self._unfinished -= len(jobs)
+            self.accepted -= len(jobs)
+            self.dropped += len(jobs)
+            self._cv.notify_all()
+            return jobs
+
+    def reset_counts(self) -> None:
+        with self._cv:
+            self.accepted = 0
+            self.dropped = 0
+            self._num_while_full = 0
+
+
+class _HostTensor:
+    """Minimal stand-in for openvino's Tensor - just holds `data`"""
+
+    def __init__(self, data: npt.NDArray):
+        self.data = data
+
+
+class _HostInferRequest:
+    """Minimal stand-in for openvino's InferRequest, as seen by an AsyncInferQueue callback
+
+    If inference failed, the callback is still called, and reading `output_tensors`
+    raises the error.
+    """
+
+    def __init__(
+        self,
+        outputs: Optional[List[npt.NDArray]],
+        error: Optional[Exception] = None,
+    ):
+        self._outputs = outputs
+        self._error = error
+
+    @property
+    def output_tensors(self) -> List[_HostTensor]:
+        if self._outputs is None:
+            raise GPUError(f"inference failed: {self._error}")
+        return [_HostTensor(o) for o in self._outputs]
+
+
+class HostInferQueue(ABC):
+    """Thread pool version of openvino's AsyncInferQueue, for backends that aren't openvino
+
+    Exposes the subset of the AsyncInferQueue API that NCSModel uses (`set_callback`,
+    `start_async`, `wait_all`, `__len__`), so the rest of NCSModel doesn't need to know
+    which backend it is running on. Like openvino, `start_async` blocks when all `jobs`
+    are busy, and the callback is called from the worker thread.
+
+    Subclasses implement `_infer`, which gets the input as NCSModel sends it to openvino
+    (uint8, NHWC) and returns the outputs as the openvino PrePostProcessor would (float16).
+    """
+
+    def __init__(self, jobs: int):
+        self.logger = logging.getLogger(__name__)
+        self.jobs = jobs
+
+        self._callback: Optional[Callable[[Any, Any], None]] = None
+        self._slots = threading.Semaphore(jobs)
+        self._in_flight = 0
+        self._num_started = 0
+        self._in_flight_cv = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=jobs)
+
+    def __len__(self) -> int:
+        return self.jobs
+
+    def set_callback(self, callback: Callable[[Any, Any], None]) -> None:
+        self._callback = callback
+
+    def start_async(self, inputs: dict, userdata: Any = None) -> None:
+        self._slots.acquire()
+        with self._in_flight_cv:
+            self._in_flight += 1
+            job_idx = self._num_started
+            self._num_started += 1
+        self._executor.submit(self._run, inputs[0], job_idx, userdata)
+
+    def wait_all(self) -> None:
+        with self._in_flight_cv:
+            self._in_flight_cv.wait_for(lambda: self._in_flight == 0)
+
+    @abstractmethod
+    def _infer(self, input_tensor: npt.NDArray, job_idx: int) -> List[npt.NDArray]:
+        """`job_idx` counts up from 0 with each start_async"""
+        pass
+
+    def _run(self, input_tensor: npt.NDArray, job_idx: int, userdata: Any) -> None:
+        try:
+            try:
+                request = _HostInferRequest(self._infer(input_tensor, job_idx))
+            except Exception as e:
+                request = _HostInferRequest(None, error=e)
+            if self._callback is not None:
+                self._callback(request, userdata)
+        except Exception:
+            self.logger.exception(f"Inference callback failed for job {job_idx}")
+        finally:
+            with self._in_flight_cv:
+                self._in_flight -= 1
+                self._in_flight_cv.notify_all()
+            self._slots.release()
+
+
+class ONNXInferQueue(HostInferQueue):
+    """ONNX Runtime version of openvino's AsyncInferQueue
+
+    Inputs are converted to what the exported onnx model expects (NCHW, in the model's
+    input dtype), and outputs are cast to float16.
+    """
+
+    ONNX_TYPES = {
+        "tensor(float)": np.float32,
+        "tensor(float16)": np.float16,
+        "tensor(double)": np.float64,
+        "tensor(int64)": np.int64,
+        "tensor(int32)": np.int32,
+        "tensor(uint8)": np.uint8,
+    }
+
+    def __init__(self, session, jobs: int = ONNX_NUM_JOBS):
+        super().__init__(jobs)
+        self.session = session
+
+        session_input = session.get_inputs()[0]
+        self._input_name = session_input.name
+        self._input_dtype = self.ONNX_TYPES[session_input.type]
+
+    def _infer(self, input_tensor: npt.NDArray, job_idx: int) -> List[npt.NDArray]:
+        model_input = np.transpose(input_tensor, (0, 3, 1, 2)).astype(self._input_dtype)
+        outputs = self.session.run(None, {self._input_name: model_input})
+        return [o.astype(np.float16) for o in outputs]
 
 
 class NCSModel:
@@ -51,6 +361,14 @@ class NCSModel:
     Allows you to run a model (defined by an intel intermediate representation of your
     model, e.g. model.xml & model.bin) on the neural compute stick
 
+    The same model can also be run off-scope, on the OpenVINO CPU plugin (device_name="CPU")
+    or on ONNX Runtime (device_name="ONNX", which uses the `best.onnx` file next to the xml).
+    The default device is set by the MS_INFERENCE_DEVICE environment variable.
+
+    Given several devices (e.g. two sticks), the model is compiled once per device and
+    each asyn job goes to the least loaded one. Results still come back from
+    get_asyn_results in the order they were submitted. syn only uses the first device.
+
     Best docs
     https://docs.openvino.ai/latest/api/ie_python_api/api.html
     https://docs.openvino.ai/latest/openvino_docs_OV_UG_Python_API_exclusives.html
@@ -66,40 +384,156 @@ class NCSModel:
     def __init__(
         self,
         model_path: str,
+        device_name: Union[str, Sequence[str]] = INFERENCE_DEVICE,
+        queue_capacity: Optional[int] = None,
+        queue_policy: QueuePolicy = QueuePolicy.BLOCK,
     ):
         """
         params:
             model_path: path to the 'xml' file
+            device_name: "MYRIAD", "CPU", or "ONNX", or several devices of one kind
+                (a list, or a comma-separated string)
+            queue_capacity: max number of asyn frames waiting for the device (None is unbounded)
+            queue_policy: what asyn does with a new frame when the queue is full
         """
+        self.logger = logging.getLogger(__name__)
+
         self.connected = False
-        self.device_name = "MYRIAD"
-        self.model = self._compile_model(model_path)
+        self.device_names = parse_device_names(device_name)
+        self.device_name = device_kind(self.device_names[0])
+        self._model_path = model_path
+        self._cache_dir = self._get_cache_dir()
+
+        # seconds spent loading the model, by stage (summed over devices)
+        self.load_times: Dict[str, float] = {}
+        self._loaded_from_cache: List[Optional[bool]] = []
+
+        t0 = perf_counter()
+        self.models = [
+            self._compile_model(model_path, device) for device in self.device_names
+        ]
+        self.model = self.models[0]
+        self.connected = True
+        self._log_load_times(perf_counter() - t0)
+
+        # used for batched syn, keyed by batch dimension (-1 for dynamic)
+        self._batched_infer_queues: Dict[int, AsyncInferQueue] = {}
 
         self.asyn_result_lock = threading.Lock()
+        # notified whenever an asyn frame finishes or is dropped
+        self._results_cv = threading.Condition(self.asyn_result_lock)
 
         # used for syn
-        self._temp_infer_queue = AsyncInferQueue(self.model)
+        self._temp_infer_queue = self._make_infer_queue()
 
-        # used for asyn
-        self.asyn_infer_queue = AsyncInferQueue(self.model)
-        self.asyn_infer_queue.set_callback(self._default_callback)
+        # used for asyn, one per device
+        self.asyn_infer_queues = [
+            self._make_infer_queue(model) for model in self.models
+        ]
+        for infer_queue in self.asyn_infer_queues:
+            infer_queue.set_callback(self._asyn_callback)
         self._asyn_results: List[AsyncInferenceResult] = []
 
-        self._executor = ThreadPoolExecutor(max_workers=1)
+        # jobs running on each device, for picking the least loaded one
+        self._in_flight_lock = threading.Lock()
+        self._in_flight = [0] * len(self.models)
+        self._jobs_per_device = [0] * len(self.models)
+        self._next_device = 0
 
-    def _compile_model(
-        self,
-        model_path: str,
-    ):
+        # jobs are numbered as they're submitted, and results that finish ahead of an
+        # earlier job (on another device, or another InferRequest) wait here for it
+        self._next_submit_seq = 0
+        self._next_result_seq = 0
+        self._finished_jobs: Dict[int, InferenceHandle] = {}
+
+        # number of frames per id that are queued or running, for wait_for_id
+        self._outstanding_ids: Dict[Any, int] = {}
+        # seconds from asyn to result, for the most recently finished frame
+        self.last_latency: Optional[float] = None
+
+        # asyn puts jobs here, and the submitter thread feeds them to the device
+        self._submission_queue = SubmissionQueue(queue_capacity, queue_policy)
+
+        # asyn copies each frame into one of these preallocated input buffers, which the
+        # device reads directly, and which is recycled once the frame's callback fires.
+        # Every queued, submitting, and in-flight frame holds a buffer, so with a bounded
+        # queue there are always enough. An unbounded queue allocates per frame instead.
+        self._input_ring: Optional[BufferPool] = None
+        self._input_ring_tensors: List[Any] = []
+        if queue_capacity is not None:
+            self._input_ring = BufferPool(
+                self._input_shape(),
+                np.uint8,
+                queue_capacity + sum(len(q) for q in self.asyn_infer_queues) + 2,
+            )
+            self._input_ring_tensors = [
+                buf
+                if self.device_name in HOST_DEVICES
+                else Tensor(buf, shared_memory=True)
+                for buf in self._input_ring.buffers
+            ]
+        self._submitter = threading.Thread(target=self._submit_jobs, daemon=True)
+        self._submitter.start()
+
+    def _compile_model(self, model_path: str, device: str):
         if self.connected:
             raise RuntimeError(f"model {self} already compiled")
 
+        if self.device_name == ONNX_DEVICE:
+            return self._compile_onnx_model(model_path)
+        if self.device_name == MOCK_DEVICE:
+            return self._compile_mock_model(model_path)
+
         # when the first subclass is initialized, core will be given a value
         assert (
             self.core is not None
         ), "initialize a subclass of NCSModel, not NCSModel itself"
 
+        compiled_model = self._compile_ov_model(self._read_model(model_path), device)
+        self._loaded_from_cache.append(self._is_loaded_from_cache(compiled_model))
+        return compiled_model
+
+    def _get_cache_dir(self) -> Optional[str]:
+        if MODEL_CACHE_DIR == "" or self.device_name in HOST_DEVICES:
+            return None
+
+        try:
+            Path(MODEL_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            self.logger.warning(
+                f"Not caching compiled models in {MODEL_CACHE_DIR}: {e}"
+            )
+            return None
+        return MODEL_CACHE_DIR
+
+    def _add_load_time(self, stage: str, t: float) -> None:
+        self.load_times[stage] = self.load_times.get(stage, 0) + t
+
+    @staticmethod
+    def _is_loaded_from_cache(compiled_model) -> Optional[bool]:
+        try:
+            return bool(compiled_model.get_property("LOADED_FROM_CACHE"))
+        except Exception:
+            # older OpenVINO versions don't report it
+            return None
+
+    def _log_load_times(self, total: float) -> None:
+        stages = ", ".join(f"{k} {v:.2f} s" for k, v in self.load_times.items())
+        self.load_times["total"] = total
+
+        msg = (
+            f"{type(self).__name__} ready on {','.join(self.device_names)} "
+            f"in {total:.2f} s ({stages})"
+        )
+        if self._cache_dir is not None:
+            num_cached = sum(hit is True for hit in self._loaded_from_cache)
+            msg += f"; {num_cached}/{len(self.models)} loaded from {self._cache_dir}"
+        self.logger.info(msg)
+
+    def _read_model(self, model_path: str):
+        t0 = perf_counter()
         model = self.core.read_model(model_path)
+        t1 = perf_counter()
 
         ppp = PrePostProcessor(model)
         ppp.input().tensor().set_element_type(Type.u8).set_layout(Layout("NHWC"))
@@ -107,33 +541,136 @@ class NCSModel:
         ppp.output().tensor().set_element_type(Type.f16)
         model = ppp.build()
 
+        self._add_load_time("read", t1 - t0)
+        self._add_load_time("preprocessing", perf_counter() - t1)
+        return model
+
+    def _compile_ov_model(self, model, device: str):
+        # only the NCS needs time to (re)connect; any other device either works or it doesn't
+        max_connection_attempts = 4 if self.device_name == MYRIAD_DEVICE else 1
+
+        # the NCS keeps the throughput hint it has always been compiled with; other
+        # devices get openvino's defaults
+        config = (
+            {"PERFORMANCE_HINT": "THROUGHPUT"}
+            if self.device_name == MYRIAD_DEVICE
+            else {}
+        )
+        if self._cache_dir is not None:
+            config["CACHE_DIR"] = self._cache_dir
+
+        t0 = perf_counter()
         err_msg = ""
         connection_attempts = 0
-        while connection_attempts < 4:
+        while connection_attempts < max_connection_attempts:
             # sleep 0, then 1, then 3, then 7
             time.sleep(2**connection_attempts - 1)
             try:
-                compiled_model = self.core.compile_model(
-                    model,
-                    self.device_name,
-                    config={
-                        "PERFORMANCE_HINT": "THROUGHPUT",
-                    },
-                )
-                self.connected = True
+                compiled_model = self.core.compile_model(model, device, config=config)
+                self._add_load_time("compile", perf_counter() - t0)
                 return compiled_model
             except Exception as e:
                 connection_attempts += 1
-                if connection_attempts < 4:
-                    print(
-                        f"Failed to connect NCS: {e}.\nRemaining connection "
-                        f"attempts: {4 - connection_attempts}. Retrying..."
+                if connection_attempts < max_connection_attempts:
+                    self.logger.warning(
+                        f"Failed to connect to {device}: {e}. Remaining connection "
+                        f"attempts: {max_connection_attempts - connection_attempts}. "
+                        "Retrying..."
                     )
                 err_msg = str(e)
-        raise GPUError(f"Failed to connect to NCS: {err_msg}")
+        raise GPUError(f"Failed to connect to {device}: {err_msg}")
+
+    def _get_batched_infer_queue(self, batch_size: int) -> AsyncInferQueue:
+        """Compile (once) a version of the model that takes N x H x W x 1 input
+
+        The NCS can only run static shapes, so it gets one compiled model per batch
+        size. Other devices get a single model with a dynamic batch dimension.
+        """
+        batch_dim = batch_size if self.device_name == MYRIAD_DEVICE else -1
+
+        if batch_dim not in self._batched_infer_queues:
+            model = self._read_model(self._model_path)
+            _, h, w, c = [d.get_length() for d in model.input().get_partial_shape()]
+            model.reshape(
+                {model.input().get_any_name(): PartialShape([batch_dim, h, w, c])}
+            )
+            self._batched_infer_queues[batch_dim] = AsyncInferQueue(
+                self._compile_ov_model(model, self.device_names[0])
+            )
+
+        return self._batched_infer_queues[batch_dim]
+
+    def _compile_onnx_model(self, model_path: str):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise GPUError(f"onnxruntime is required for the ONNX device: {e}")
+
+        onnx_path = Path(model_path)
+        if onnx_path.suffix != ".onnx":
+            onnx_path = onnx_path.with_suffix(".onnx")
+        if not onnx_path.exists():
+            raise GPUError(f"onnx model not found at {onnx_path}")
+
+        t0 = perf_counter()
+        try:
+            session = ort.InferenceSession(
+                str(onnx_path), providers=["CPUExecutionProvider"]
+            )
+        except Exception as e:
+            raise GPUError(f"Failed to load {onnx_path} in onnxruntime: {e}")
+        self._add_load_time("session", perf_counter() - t0)
+
+        return session
+
+    def _compile_mock_model(self, model_path: str):
+        # mock_backend subclasses HostInferQueue from here, so it is imported lazily
+        from ulc_mm_package.neural_nets.mock_backend import MockModel, load_recording
+
+        assert (
+            self.core is not None
+        ), "initialize a subclass of NCSModel, not NCSModel itself"
+
+        # the real model is only read for its input and output shapes
+        model = self._read_model(model_path)
+        return MockModel(
+            tuple(model.input().get_shape()),
+            tuple(model.output().get_shape()),
+            recording=load_recording(type(self).__name__),
+        )
+
+    def _input_shape(self) -> Tuple[int, ...]:
+        """Shape of the (uint8, NHWC) tensor that the model takes"""
+        if self.device_name == ONNX_DEVICE:
+            n, c, h, w = self.model.get_inputs()[0].shape
+            return (n, h, w, c)
+        if self.device_name == MOCK_DEVICE:
+            return self.model.input_shape
+        return tuple(self.model.inputs[0].shape)
+
+    def _output_shape(self) -> Tuple[int, ...]:
+        """Shape of the (float16) tensor that the model gives for one image"""
+        if self.device_name == ONNX_DEVICE:
+            return tuple(self.model.get_outputs()[0].shape)
+        if self.device_name == MOCK_DEVICE:
+            return self.model.output_shape
+        return tuple(self.model.outputs[0].shape)
+
+    def _make_infer_queue(self, model=None):
+        model = self.model if model is None else model
+        if self.device_name == ONNX_DEVICE:
+            return ONNXInferQueue(model)
+        if self.device_name == MOCK_DEVICE:
+            from ulc_mm_package.neural_nets.mock_backend import MockInferQueue
+
+            return MockInferQueue(model)
+        return AsyncInferQueue(model)
 
     def syn(
-        self, input_imgs: Union[npt.NDArray, List[npt.NDArray]], sort: bool = False
+        self,
+        input_imgs: Union[npt.NDArray, List[npt.NDArray]],
+        sort: bool = False,
+        batch_size: Optional[int] = None,
     ) -> List[npt.NDArray]:
         """'Synchronously' infers images on the NCS
 
@@ -147,7 +684,12 @@ class NCSModel:
         params:
             input_imgs: the image/images to be inferred.
             sort: sort the outputs
+            batch_size: if given, images are packed into batches of (up to) `batch_size`
+                and each batch is a single InferRequest. Outputs are always in input order.
         """
+        if batch_size is not None:
+            return self._syn_batched(self._as_sequence(input_imgs), batch_size)
+
         res: List[AsyncInferenceResult] = []
 
         self._temp_infer_queue.set_callback(partial(self._cb, res))
@@ -162,35 +704,227 @@ class NCSModel:
             return [r.result for r in sorted(res, key=op.attrgetter("id"))]
         return [r.result for r in res]
 
+    def _syn_batched(
+        self, input_imgs: Sequence[npt.NDArray], batch_size: int
+    ) -> List[npt.NDArray]:
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+
+        if self.device_name in HOST_DEVICES:
+            # the exported onnx models (and so the mock ones) have a fixed batch size of 1.
+            # NCSModel's own syn, since subclasses' post-process what this returns
+            return NCSModel.syn(self, input_imgs, sort=True)
+
+        infer_queue = self._get_batched_infer_queue(batch_size)
+        # static batch (NCS) means the last batch gets zero-padded
+        static_batch = self.device_name == MYRIAD_DEVICE
+
+        tensors = [self._format_image_to_tensor(img) for img in input_imgs]
+        res: List[Optional[npt.NDArray]] = [None] * len(tensors)
+
+        infer_queue.set_callback(partial(self._batch_cb, res))
+
+        for start in range(0, len(tensors), batch_size):
+            chunk = tensors[start : start + batch_size]
+            batch = np.zeros(
+                (batch_size if static_batch else len(chunk), *chunk[0].shape[1:]),
+                dtype=np.uint8,
+            )
+            np.concatenate(chunk, axis=0, out=batch[: len(chunk)])
+            infer_queue.start_async({0: batch}, userdata=(start, len(chunk)))
+
+        infer_queue.wait_all()
+
+        return res  # type: ignore
+
     def asyn(
         self,
         input_img: npt.NDArray,
         id: Optional[int] = None,
-    ) -> None:
+        return_handle: bool = False,
+    ) -> Optional[InferenceHandle]:
         """Asynchronously submits inference jobs to the NCS
 
         params:
             input_imgs: the image/images to be inferred.
             ids: the ids that are passed through the asynchronous inference,
                  used for associating the predicted tensor with the input image.
+            return_handle: return an InferenceHandle for the frame. Its result is then
+                 only given to the handle, and not by 'get_asyn_results'.
+
+        The image goes into a bounded submission queue; if the queue is full, the
+        queue policy decides whether this blocks, or which frame is dropped (see
+        `queue_stats`).
 
-        To get results, call 'get_asyn_results'
+        To get results, call 'get_asyn_results' (or 'wait_for_id'), or use the handle
         """
+        handle = InferenceHandle(id, self._results_cv, in_stream=not return_handle)
         input_tensor = self._format_image_to_tensor(input_img)
 
-        self._executor.submit(
-            self.asyn_infer_queue.start_async,
-            inputs={0: input_tensor},
-            userdata=id,
-        )
+        slot = None
+        if self._input_ring is not None:
+            slot = self._input_ring.acquire()
+            # the one copy per frame, straight from e.g. a non-contiguous crop view
+            np.copyto(self._input_ring.buffers[slot], input_tensor)
+            input_tensor = self._input_ring_tensors[slot]
+
+        with self._results_cv:
+            self._outstanding_ids[id] = self._outstanding_ids.get(id, 0) + 1
+
+        dropped = self._submission_queue.put((slot, input_tensor, handle))
+        if dropped is not None:
+            self._drop_job(dropped)
+
+        return handle if return_handle else None
+
+    def _drop_job(self, job: Tuple[Optional[int], Any, InferenceHandle]) -> None:
+        slot, _, handle = job
+        self._release_input_slot(slot)
+        with self._results_cv:
+            handle.completed = time.perf_counter()
+            handle.dropped = True
+            self._forget_id(handle.id)
+            self._results_cv.notify_all()
+
+    def _forget_id(self, id: Any) -> None:
+        """call with self._results_cv held"""
+        n = self._outstanding_ids[id] - 1
+        if n == 0:
+            del self._outstanding_ids[id]
+        else:
+            self._outstanding_ids[id] = n
+
+    def _release_input_slot(self, slot: Optional[int]) -> None:
+        if slot is not None and self._input_ring is not None:
+            self._input_ring.release(slot)
+
+    def _least_loaded_device(self) -> int:
+        """Index of the device with the smallest share of its InferRequests busy
+
+        Ties go round-robin, so that idle devices are used in turn.
+        """
+        num_devices = len(self.asyn_infer_queues)
+        with self._in_flight_lock:
+            device = min(
+                ((self._next_device + i) % num_devices for i in range(num_devices)),
+                key=lambda d: self._in_flight[d] / len(self.asyn_infer_queues[d]),
+            )
+            self._next_device = (device + 1) % num_devices
+            self._in_flight[device] += 1
+            self._jobs_per_device[device] += 1
+        return device
+
+    def _submit_jobs(self) -> None:
+        """Submitter thread - start_async blocks while every InferRequest is busy"""
+        while True:
+            slot, input_tensor, handle = self._submission_queue.get()
+            device = self._least_loaded_device()
+            seq = self._next_submit_seq
+            self._next_submit_seq += 1
+            handle.started = time.perf_counter()
+            try:
+                self.asyn_infer_queues[device].start_async(
+                    inputs={0: input_tensor},
+                    userdata=(slot, seq, device, handle),
+                )
+            except Exception:
+                self.logger.exception(
+                    f"Failed to submit job {handle.id} to {self.device_names[device]}"
+                )
+                self._release_input_slot(slot)
+                self._finish_job(seq, device, handle, None)
+            finally:
+                self._submission_queue.task_done()
+
+    def _asyn_callback(self, infer_request: InferRequest, userdata: Any) -> None:
+        slot, seq, device, handle = userdata
+        result = None
+        try:
+            result = self._make_asyn_result(infer_request, handle.id)
+        finally:
+            self._release_input_slot(slot)
+            self._finish_job(seq, device, handle, result)
+
+    def _finish_job(
+        self,
+        seq: int,
+        device: int,
+        handle: InferenceHandle,
+        result: Optional[AsyncInferenceResult],
+    ) -> None:
+        """Complete the job's handle, then hand on the results of every job up to the
+        earliest one that's still running
+        """
+        completed = time.perf_counter()
+        with self._in_flight_lock:
+            self._in_flight[device] -= 1
+
+        with self._results_cv:
+            handle.completed = completed
+            handle.result = result
+            if result is not None:
+                self.last_latency = handle.latency
+
+            self._finished_jobs[seq] = handle
+            while self._next_result_seq in self._finished_jobs:
+                h = self._finished_jobs.pop(self._next_result_seq)
+                self._next_result_seq += 1
+                self._forget_id(h.id)
+                if h.result is not None and h._in_stream:
+                    self._asyn_results.append(h.result)
+
+            self._results_cv.notify_all()
+
+    def wait_for_id(
+        self, id: Any, timeout: Optional[float] = None
+    ) -> Optional[AsyncInferenceResult]:
+        """Wait until the frame(s) submitted with `id` are done, and take the result for `id`
+        out of the results that get_asyn_results will return.
+
+        Returns None on timeout, or if there is no result for `id` (the frame was dropped,
+        or its result was already collected).
+        """
+        with self._results_cv:
+            self._results_cv.wait_for(
+                lambda: id not in self._outstanding_ids, timeout=timeout
+            )
+            for i, r in enumerate(self._asyn_results):
+                if r.id == id:
+                    return self._asyn_results.pop(i)
+        return None
+
+    def as_completed(
+        self, handles: Iterable[InferenceHandle], timeout: Optional[float] = None
+    ) -> Iterator[InferenceHandle]:
+        """Yield `handles` in the order that their frames finish (or are dropped)
+
+        Stops early, leaving the rest, if they aren't all done within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        pending = list(handles)
+        while len(pending) > 0:
+            with self._results_cv:
+                remaining = (
+                    None if deadline is None else max(deadline - time.perf_counter(), 0)
+                )
+                if not self._results_cv.wait_for(
+                    lambda: any(h.done() for h in pending), timeout=remaining
+                ):
+                    return
+                # in completion order, for the ones that finished since the last wait
+                done = sorted(
+                    (h for h in pending if h.done()), key=op.attrgetter("completed")
+                )
+                pending = [h for h in pending if not h.done()]
+            yield from done
 
     def get_asyn_results(
         self, timeout: Optional[float] = 0.01
     ) -> List[AsyncInferenceResult]:
         """
-        Maybe return some asyn_results. Will return an empty list if it can not get the lock
-        on results within `timeout`. To disable timeout (i.e. just block indefinitely),
-        set `timeout` to None
+        Maybe return some asyn_results, in the order they were submitted. Will return an empty
+        list if it can not get the lock on results within `timeout`. To disable timeout
+        (i.e. just block indefinitely), set `timeout` to None
         """
         # openvino sets timeout to indefinite on timeout < 0, not timeout == None
         if timeout is None:
@@ -205,14 +939,22 @@ class NCSModel:
         return res
 
     def work_queue_size(self) -> int:
-        return self._executor._work_queue.qsize()
+        return len(self._submission_queue)
 
-    def _default_callback(self, infer_request: InferRequest, userdata: Any) -> None:
-        r = AsyncInferenceResult(
-            id=userdata, result=infer_request.output_tensors[0].data.copy()
+    def queue_stats(self) -> QueueStats:
+        """Current queue depth, and frames accepted/dropped since the last reset"""
+        return QueueStats(
+            depth=len(self._submission_queue),
+            accepted=self._submission_queue.accepted,
+            dropped=self._submission_queue.dropped,
+        )
+
+    def _make_asyn_result(
+        self, infer_request: InferRequest, id: Any
+    ) -> AsyncInferenceResult:
+        return AsyncInferenceResult(
+            id=id, result=infer_request.output_tensors[0].data.copy()
         )
-        with lock_timeout(self.asyn_result_lock):
-            self._asyn_results.append(r)
 
     def _cb(
         self, result_list: List, infer_request: InferRequest, userdata: Any
@@ -223,6 +965,18 @@ class NCSModel:
             )
         )
 
+    def _batch_cb(
+        self,
+        result_list: List[Optional[npt.NDArray]],
+        infer_request: InferRequest,
+        userdata: Any,
+    ) -> None:
+        # split the batched output back into (1, ...) results, one per input image
+        start, num_imgs = userdata
+        output = infer_request.output_tensors[0].data
+        for i in range(num_imgs):
+            result_list[start + i] = output[i : i + 1].copy()
+
     def _as_sequence(self, maybe_list: Union[T, List[T]]) -> Sequence[T]:
         if isinstance(maybe_list, Sequence):
             return maybe_list
@@ -246,19 +1000,18 @@ class NCSModel:
 
     def wait_all(self) -> None:
         """wait for all pending InferRequests to finish"""
-        # very rough wait for rest of the ThreadPoolExecutor to finish
-        # if the executor shutdown, it's queue size will be 1!
-        # https://github.com/python/cpython/blob/ae460d450ab854ca66d509ef6971cfe1b6312405/Lib/concurrent/futures/thread.py#L108
-        while (not self._executor._shutdown) and self.work_queue_size() > 1:
-            time.sleep(0.01)
+        self._submission_queue.join()
 
-        self.asyn_infer_queue.wait_all()
+        for infer_queue in self.asyn_infer_queues:
+            infer_queue.wait_all()
         self._temp_infer_queue.wait_all()
+        for infer_queue in self._batched_infer_queues.values():
+            infer_queue.wait_all()
 
     def reset(self, wait_for_jobs: bool = True) -> List[AsyncInferenceResult]:
         """
-        wait for the NCS's AsyncInferQueue to finish, then reset the
-        ThreadPoolExecutor. Note that this will not drop the reference to the NCS.
+        wait for the NCS's AsyncInferQueue to finish, then reset the submission queue's
+        accepted/dropped counts. Note that this will not drop the reference to the NCS.
 
         If wait_for_jobs is True, this will wait until every image in the queue is finished
         and then will return the results. Otherwise, it purges the queues and returns
@@ -267,23 +1020,12 @@ class NCSModel:
         be reset after this call.
         """
         if wait_for_jobs is False:
-            # this code is copied from ThreadPoolExecutor.shutdown()
-            # https://github.com/python/cpython/blob/e74fa294c9b0c67bfcbefdda5a069f0a7648f524/Lib/concurrent/futures/thread.py#L219-L239
-            # The option to cancel futures was added in python 3.9, but we roll 3.7
-            while True:
-                try:
-                    work_item = self._executor._work_queue.get_nowait()
-                except queue.Empty:
-                    break
-                if work_item is not None:
-                    work_item.future.cancel()
-
-        self._executor.shutdown(wait=wait_for_jobs)
+            for job in self._submission_queue.clear():
+                self._drop_job(job)
 
         self.wait_all()
 
-        # this is the official way of restarting a ThreadPoolExecutor
-        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._submission_queue.reset_counts()
 
         # resets self._asyn_results and returns a list of AsyncInferenceResults
         return self.get_asyn_results()
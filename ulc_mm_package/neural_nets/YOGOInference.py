@@ -1,12 +1,12 @@
 #! /usr/bin/env python3
 
-from typing import Any, List, Union
+from typing import Any, List, Optional, Sequence, Union
 from typing_extensions import TypeAlias
 
 import numpy as np
 import numpy.typing as npt
 
-from ulc_mm_package.utilities.lock_utils import lock_timeout
+from ulc_mm_package.utilities.buffer_pool import BufferPool
 from ulc_mm_package.neural_nets.NCSModel import (
     NCSModel,
     AsyncInferenceResult,
@@ -16,6 +16,10 @@ from ulc_mm_package.neural_nets.neural_network_constants import (
     YOGO_AREA_FILTER_NORMED,
     YOGO_PRED_THRESHOLD,
     YOGO_CROP_HEIGHT_PX,
+    INFERENCE_DEVICE,
+    YOGO_QSIZE,
+    YOGO_QUEUE_POLICY,
+    YOGO_RESULT_POOL_SIZE,
 )
 
 
@@ -40,13 +44,32 @@ class YOGO(NCSModel):
          the second dimension (12) is the most important - it is [xc, yc, w, h, to, p_healthy, p_ring, p_schitzont, p_troph, p_gametocyte, p_wbc, p_misc],
          with each number normalized to [0,1] (and the class probabilities summing to 1)
         >
+        >>> # ... and once you're done with each result ...
+        >>> Y.release_result(res)
+
+    Results from `asyn` are written into a fixed pool of preallocated buffers, which
+    are lent out until they're given back with `release_result`. If every buffer is
+    still lent out, the result is allocated instead, so forgetting to release only
+    costs memory (counted in `result_pool_misses`) and never stalls inference.
     """
 
     def __init__(
         self,
         model_path: str = YOGO_MODEL_DIR,
+        device_name: Union[str, Sequence[str]] = INFERENCE_DEVICE,
     ):
-        super().__init__(model_path)
+        super().__init__(
+            model_path,
+            device_name=device_name,
+            queue_capacity=YOGO_QSIZE,
+            queue_policy=YOGO_QUEUE_POLICY,
+        )
+
+        bs, pred_dim, Sy, Sx = self._output_shape()
+        self._result_pool = BufferPool(
+            (1, pred_dim, Sy * Sx), np.float16, YOGO_RESULT_POOL_SIZE
+        )
+        self.result_pool_misses = 0
 
     @staticmethod
     def crop_img(img: npt.NDArray) -> npt.NDArray:
@@ -74,13 +97,39 @@ class YOGO(NCSModel):
         return self.asyn(input_img, idxs)
 
     def syn(
-        self, input_imgs: Union[npt.NDArray, List[npt.NDArray]], sort: bool = False
+        self,
+        input_imgs: Union[npt.NDArray, List[npt.NDArray]],
+        sort: bool = False,
+        batch_size: Optional[int] = None,
     ):
-        return [YOGO._format_res(r) for r in super().syn(input_imgs, sort)]
-
-    def _default_callback(self, infer_request, userdata: Any):
-        res = infer_request.output_tensors[0].data[:]
-        res = YOGO._format_res(res)
+        return [
+            YOGO._format_res(r)
+            for r in super().syn(input_imgs, sort, batch_size=batch_size)
+        ]
+
+    def _make_asyn_result(self, infer_request, id: Any) -> AsyncInferenceResult:
+        # the output tensor is reused by the infer request's next job, so it has to be copied
+        output = infer_request.output_tensors[0].data
+        slot = self._result_pool.acquire(timeout=0)
+        if slot is None:
+            self.result_pool_misses += 1
+            res = YOGO._format_res(output.copy())
+        else:
+            res = self._result_pool.buffers[slot]
+            np.copyto(res, output.reshape(res.shape))
+
+        return AsyncInferenceResult(id=id, result=res)
+
+    def release_result(self, res: AsyncInferenceResult) -> None:
+        """
+        Give `res`'s buffer back to the result pool, once nothing needs `res.result` anymore
+        (e.g. after PredictionsHandler.add_yogo_pred). Results that didn't come from the
+        pool are left to the garbage collector.
+        """
+        slot = self._result_pool.index_of(res.result)
+        if slot is not None:
+            self._result_pool.release(slot)
 
-        with lock_timeout(self.asyn_result_lock):
-            self._asyn_results.append(AsyncInferenceResult(id=userdata, result=res))
+    def release_results(self, results: List[AsyncInferenceResult]) -> None:
+        for res in results:
+            self.release_result(res)
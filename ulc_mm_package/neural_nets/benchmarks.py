@@ -0,0 +1,236 @@
+#! /usr/bin/env python3
+
+"""
+Throughput benchmarks for the inference pipeline.
+
+Run from anywhere without a compute stick by picking an off-scope device, e.g.
+
+    python3 benchmarks.py batched-syn --model yogo --device CPU
+    python3 benchmarks.py parse --device MOCK
+    python3 benchmarks.py postprocess --device MOCK
+    python3 benchmarks.py nms
+"""
+
+import argparse
+
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+
+import ulc_mm_package.neural_nets.utils as nn_utils
+
+from ulc_mm_package.neural_nets.YOGOInference import YOGO
+from ulc_mm_package.neural_nets.AutofocusInference import AutoFocus
+from ulc_mm_package.neural_nets.neural_network_constants import (
+    INFERENCE_DEVICE,
+    IOU_THRESH,
+    YOGO_CLASS_LIST,
+    YOGO_CROP_HEIGHT_PX,
+    parse_device_names,
+)
+
+
+def time_it(fn: Callable[[], object], n_repeats: int) -> float:
+    """Best wall-clock time (s) of `n_repeats` calls to `fn`, after one warm-up call"""
+    fn()
+    times = []
+    for _ in range(n_repeats):
+        t0 = perf_counter()
+        fn()
+        times.append(perf_counter() - t0)
+    return min(times)
+
+
+def benchmark_batched_syn(args) -> None:
+    model_class = YOGO if args.model == "yogo" else AutoFocus
+    model = model_class(device_name=args.device)
+
+    _, h, w, _ = model._input_shape()
+    rng = np.random.default_rng(0)
+    imgs = [
+        rng.integers(0, 256, (h, w), dtype=np.uint8) for _ in range(args.num_images)
+    ]
+
+    devices = ",".join(model.device_names)
+    print(f"{args.model} on {devices}, {args.num_images} images of {h}x{w}")
+    print(f"{'batch size':>12} {'images/s':>12}")
+
+    t = time_it(lambda: model.syn(imgs, sort=True), args.repeats)
+    print(f"{'unbatched':>12} {args.num_images / t:>12.1f}")
+
+    for batch_size in args.batch_sizes:
+        t = time_it(lambda: model.syn(imgs, batch_size=batch_size), args.repeats)
+        print(f"{batch_size:>12} {args.num_images / t:>12.1f}")
+
+
+def benchmark_parse(args) -> None:
+    model = YOGO(device_name=args.device)
+    _, h, w, _ = model._input_shape()
+    rng = np.random.default_rng(0)
+    imgs = [rng.integers(0, 256, (h, w), dtype=np.uint8) for _ in range(4)]
+    frames = model.syn(imgs, sort=True)
+
+    devices = ",".join(model.device_names)
+    print(f"parsing bursts of YOGO outputs from {devices}")
+    print(f"{'burst size':>12} {'per-frame us':>14} {'batched us':>12} {'speedup':>9}")
+
+    for burst_size in args.burst_sizes:
+        burst = [frames[i % len(frames)] for i in range(burst_size)]
+        ids = list(range(burst_size))
+
+        def per_frame():
+            return np.hstack(
+                [
+                    nn_utils.parse_prediction_tensor(i, pred, h, w)
+                    for i, pred in zip(ids, burst)
+                ]
+            )
+
+        t_per_frame = time_it(per_frame, args.repeats)
+        t_batched = time_it(
+            lambda: nn_utils.parse_prediction_tensors(ids, burst, h, w), args.repeats
+        )
+        print(
+            f"{burst_size:>12} {t_per_frame / burst_size * 1e6:>14.1f} "
+            f"{t_batched / burst_size * 1e6:>12.1f} {t_per_frame / t_batched:>9.2f}"
+        )
+
+
+def benchmark_postprocess(args) -> None:
+    model = YOGO(device_name=args.device)
+    _, h, w, _ = model._input_shape()
+    rng = np.random.default_rng(0)
+    imgs = [rng.integers(0, 256, (h, w), dtype=np.uint8) for _ in range(4)]
+    frames = model.syn(imgs, sort=True)
+    store = np.zeros((frames[0].shape[1] + 3, frames[0].shape[2]), dtype=np.float32)
+
+    def separate_passes():
+        for i, pred in enumerate(frames):
+            parsed = nn_utils.parse_prediction_tensor(i, pred, h, w)
+            parsed = parsed[:, nn_utils.nms(parsed, IOU_THRESH)]
+            nn_utils.scale_bbox_vals(parsed, scale_h=1, scale_w=1)
+            store[:, : parsed.shape[1]] = parsed
+
+    def fused():
+        for i, pred in enumerate(frames):
+            nn_utils.parse_prediction_tensor_into(store, 0, i, pred, h, w, IOU_THRESH)
+
+    t_separate = time_it(separate_passes, args.repeats) / len(frames)
+    t_fused = time_it(fused, args.repeats) / len(frames)
+    devices = ",".join(model.device_names)
+    print(f"parse -> nms -> scale -> store of YOGO outputs from {devices}")
+    print(f"{'separate passes':>16} {t_separate * 1e6:>8.1f} us/frame")
+    print(f"{'fused':>16} {t_fused * 1e6:>8.1f} us/frame")
+
+
+def benchmark_nms(args) -> None:
+    rng = np.random.default_rng(0)
+    num_rows = 8 + len(YOGO_CLASS_LIST)
+
+    print(f"NMS of RBC-sized boxes on a {args.width}x{args.height} frame")
+    # "greedy" is `nms`; "compiled greedy" is the same algorithm compiled like the grid
+    # one is, to tell the algorithm's gain apart from compiling it
+    print(
+        f"{'boxes':>8} {'kept':>8} {'greedy us':>12} {'compiled greedy us':>20} "
+        f"{'grid us':>12}"
+    )
+    for num_boxes in args.num_boxes:
+        preds = np.zeros((num_rows, num_boxes), dtype=np.float32)
+        size = rng.normal(args.cell_size, args.cell_size / 5, num_boxes).clip(1)
+        xc = rng.uniform(0, args.width, num_boxes)
+        yc = rng.uniform(0, args.height, num_boxes)
+        preds[1], preds[3] = np.rint(xc - size / 2), np.rint(xc + size / 2)
+        preds[2], preds[4] = np.rint(yc - size / 2), np.rint(yc + size / 2)
+        preds[8] = rng.random(num_boxes)
+
+        bboxes = np.ascontiguousarray(preds[1:5].T)
+        confs = np.ascontiguousarray(preds[8])
+
+        kept = nn_utils.nms(preds, IOU_THRESH)
+        assert list(nn_utils.nms_grid(preds, IOU_THRESH)) == list(kept)
+
+        t_greedy = time_it(lambda: nn_utils.nms(preds, IOU_THRESH), args.repeats)
+        t_compiled = time_it(
+            lambda: nn_utils._greedy_nms(bboxes, confs, IOU_THRESH), args.repeats
+        )
+        t_grid = time_it(lambda: nn_utils.nms_grid(preds, IOU_THRESH), args.repeats)
+        print(
+            f"{num_boxes:>8} {len(kept):>8} {t_greedy * 1e6:>12.1f} "
+            f"{t_compiled * 1e6:>20.1f} {t_grid * 1e6:>12.1f}"
+        )
+
+
+def benchmark_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="inference pipeline benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    batched_syn = subparsers.add_parser(
+        "batched-syn", help="images/sec of NCSModel.syn at several batch sizes"
+    )
+    batched_syn.add_argument(
+        "--model",
+        default="yogo",
+        choices=["autofocus", "yogo"],
+    )
+    batched_syn.add_argument(
+        "--device",
+        help="device(s) to run on, comma-separated",
+        type=parse_device_names,
+        default=INFERENCE_DEVICE,
+    )
+    batched_syn.add_argument("--num-images", type=int, default=64)
+    batched_syn.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16]
+    )
+    batched_syn.add_argument("--repeats", type=int, default=3)
+    batched_syn.set_defaults(func=benchmark_batched_syn)
+
+    parse = subparsers.add_parser(
+        "parse",
+        help="per-frame vs batched parsing of bursts of YOGO outputs",
+    )
+    parse.add_argument(
+        "--device",
+        help="device(s) the outputs come from, comma-separated",
+        type=parse_device_names,
+        default=INFERENCE_DEVICE,
+    )
+    parse.add_argument("--burst-sizes", type=int, nargs="+", default=[1, 8, 20, 50])
+    parse.add_argument("--repeats", type=int, default=20)
+    parse.set_defaults(func=benchmark_parse)
+
+    postprocess = subparsers.add_parser(
+        "postprocess",
+        help="per-frame post-processing, as separate passes vs the fused kernel",
+    )
+    postprocess.add_argument(
+        "--device",
+        help="device(s) the outputs come from, comma-separated",
+        type=parse_device_names,
+        default=INFERENCE_DEVICE,
+    )
+    postprocess.add_argument("--repeats", type=int, default=20)
+    postprocess.set_defaults(func=benchmark_postprocess)
+
+    nms = subparsers.add_parser(
+        "nms", help="greedy vs grid NMS, at several numbers of boxes per frame"
+    )
+    nms.add_argument(
+        "--num-boxes", type=int, nargs="+", default=[50, 200, 1000, 3000, 10000]
+    )
+    nms.add_argument("--width", type=int, default=1032)
+    nms.add_argument("--height", type=int, default=YOGO_CROP_HEIGHT_PX)
+    nms.add_argument(
+        "--cell-size", type=float, default=45, help="mean box width/height (px)"
+    )
+    nms.add_argument("--repeats", type=int, default=10)
+    nms.set_defaults(func=benchmark_nms)
+
+    return parser
+
+
+if __name__ == "__main__":
+    parser = benchmark_parser()
+    args = parser.parse_args()
+    args.func(args)
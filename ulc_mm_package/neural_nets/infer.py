@@ -1,4 +1,6 @@
+import os
 import cv2
+import csv
 import sys
 import zarr
 import signal
@@ -10,11 +12,26 @@ import matplotlib.pyplot as plt
 
 from PIL import Image, ImageDraw
 from pathlib import Path
+from time import perf_counter
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
+from ulc_mm_package.image_processing.zarrwriter import get_num_frames
 from ulc_mm_package.neural_nets.YOGOInference import YOGO
 from ulc_mm_package.neural_nets.AutofocusInference import AutoFocus
+from ulc_mm_package.neural_nets.predictions_handler import parse_yogo_prediction
+from ulc_mm_package.neural_nets.utils import (
+    PRED_RECORD_DTYPE,
+    get_class_counts,
+    to_pred_records,
+)
+from ulc_mm_package.neural_nets.neural_network_constants import (
+    INFERENCE_DEVICE,
+    YOGO_CLASS_LIST,
+    parse_device_names,
+)
 
-from typing import Any, List, Generator, Iterable
+from typing import Any, Deque, List, Generator, Iterable, Tuple
 
 
 signal.signal(signal.SIGINT, signal.SIG_DFL)
@@ -63,12 +80,12 @@ class ImageLoader:
     def load_zarr_data(cls, path_to_zarr: str):
         data = zarr.open(path_to_zarr)
 
+        _num_els = get_num_frames(data)
+
         def _iter():
-            for i in range(data.initialized):
+            for i in range(_num_els):
                 yield data[:, :, i]
 
-        _num_els = data.initialized
-
         return cls(_iter, _num_els)
 
     @classmethod
@@ -112,6 +129,125 @@ def asyn_infer(model, image_loader: ImageLoader):
         yield model.get_asyn_results(timeout=0.00005)
 
 
+def _save_npy_atomic(path: Path, arr: np.ndarray) -> None:
+    # write to a temporary file first, so an interrupted run never leaves a partial file
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp_path, path)
+
+
+def _concat_preds(parsed: List[np.ndarray]) -> np.ndarray:
+    """N PRED_RECORD_DTYPE records of all the parsed predictions (N may be 0), which
+    may each be records or (8+NUM_CLASSES) x n parsed tensors
+    """
+    empty = np.empty(0, dtype=PRED_RECORD_DTYPE)
+    return np.concatenate([empty] + [to_pred_records(p) for p in parsed])
+
+
+def reprocess_zarr(
+    model: YOGO,
+    zarr_path: str,
+    output_dir: Path,
+    batch_size: int = 8,
+    checkpoint_every: int = 1000,
+    num_readers: int = 2,
+    num_workers: int = 4,
+    progress=_tqdm,
+) -> int:
+    """Run `model` over every frame of a recorded zarr store, and save the results the
+    way DataStorage.close does: `<name>_parsed_prediction_tensors.npy` and
+    `<name>_cell_counts.csv` in `output_dir`, where `<name>` is the store's file name.
+
+    Frames are read ahead in `num_readers` threads, inferred `batch_size` at a time,
+    and parsed (+ NMS) in `num_workers` threads. Every `checkpoint_every` frames the
+    parsed predictions so far are saved, so an interrupted run picks up where it left
+    off; a store whose results already exist is skipped.
+
+    Returns the number of frames that were inferred.
+    """
+    name = Path(zarr_path).stem
+    pred_tensors_path = output_dir / f"{name}_parsed_prediction_tensors.npy"
+    cell_counts_path = output_dir / f"{name}_cell_counts.csv"
+    if pred_tensors_path.exists() and cell_counts_path.exists():
+        print(f"{name}: already reprocessed, skipping")
+        return 0
+
+    # each checkpoint is one file with the parsed predictions for frames [start, end)
+    checkpoint_dir = output_dir / f"{name}_reprocess_checkpoints"
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    checkpoints = sorted(checkpoint_dir.glob("frames_*.npy"))
+    start_frame = int(checkpoints[-1].stem.split("-")[-1]) if checkpoints else 0
+
+    data = zarr.open(zarr_path, mode="r")
+    num_frames = get_num_frames(data)
+    if start_frame > 0:
+        print(f"{name}: resuming from frame {start_frame} of {num_frames}")
+
+    def read_frames(start: int, end: int) -> List[np.ndarray]:
+        block = data[:, :, start:end]
+        return [YOGO.crop_img(block[:, :, i]) for i in range(end - start)]
+
+    # batches never straddle a checkpoint, so each checkpoint is a whole number of batches
+    batches: List[Tuple[int, int]] = []
+    for seg_start in range(start_frame, num_frames, checkpoint_every):
+        seg_end = min(seg_start + checkpoint_every, num_frames)
+        for start in range(seg_start, seg_end, batch_size):
+            batches.append((start, min(start + batch_size, seg_end)))
+
+    t0 = perf_counter()
+    with ThreadPoolExecutor(num_readers) as readers, ThreadPoolExecutor(
+        num_workers
+    ) as workers:
+        prefetched: Deque[Tuple[int, int, Future]] = deque()
+        next_batch = 0
+        segment_start = start_frame
+        segment: List[Future] = []
+
+        for batch_idx in progress(range(len(batches)), desc=name):
+            while next_batch < min(len(batches), batch_idx + 2 * num_readers):
+                start, end = batches[next_batch]
+                prefetched.append((start, end, readers.submit(read_frames, start, end)))
+                next_batch += 1
+
+            start, end, frames = prefetched.popleft()
+            preds = model.syn(frames.result(), batch_size=batch_size)
+            segment.extend(
+                workers.submit(parse_yogo_prediction, start + i, pred)
+                for i, pred in enumerate(preds)
+            )
+
+            if end == num_frames or (end - start_frame) % checkpoint_every == 0:
+                _save_npy_atomic(
+                    checkpoint_dir / f"frames_{segment_start:06d}-{end:06d}.npy",
+                    _concat_preds([f.result() for f in segment]),
+                )
+                segment_start, segment = end, []
+    dt = perf_counter() - t0
+
+    pred_tensors = _concat_preds(
+        [np.load(p) for p in sorted(checkpoint_dir.glob("frames_*.npy"))]
+    )
+    _save_npy_atomic(pred_tensors_path, pred_tensors)
+
+    raw_cell_counts = get_class_counts(pred_tensors)
+    with open(cell_counts_path, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow([x.capitalize() for x in YOGO_CLASS_LIST])
+        writer.writerow(raw_cell_counts)
+
+    for p in checkpoint_dir.glob("frames_*.npy"):
+        p.unlink()
+    checkpoint_dir.rmdir()
+
+    num_inferred = num_frames - start_frame
+    print(
+        f"{name}: {num_inferred} frames in {dt:.1f} s "
+        f"({num_inferred / max(dt, 1e-9):.1f} frames/s), {len(pred_tensors)} cells"
+    )
+    return num_inferred
+
+
 def calculate_allan_dev(data, fname):
     ds = at.Dataset(data=data)
     ds.compute("tdev")
@@ -162,6 +298,40 @@ def infer_parser():
 
     parser.add_argument("--images", type=str, help="path to image or images")
     parser.add_argument("--zarr", type=str, help="path to zarr store")
+    parser.add_argument(
+        "--reprocess",
+        type=str,
+        nargs="+",
+        metavar="ZARR",
+        help=(
+            "run YOGO over recorded zarr stores, and save parsed prediction tensors "
+            "and cell counts for each (to --output, a directory, or next to the store)"
+        ),
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="frames per inference request for --reprocess",
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="threads parsing predictions for --reprocess",
+    )
+    parser.add_argument(
+        "--num-readers",
+        type=int,
+        default=2,
+        help="threads reading frames ahead for --reprocess",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=1000,
+        help="frames between checkpoints that --reprocess can resume from",
+    )
     parser.add_argument(
         "--model",
         help="choose the model to use for inference",
@@ -170,6 +340,14 @@ def infer_parser():
         nargs="?",
         choices=["autofocus", "yogo"],
     )
+    parser.add_argument(
+        "--device",
+        help=(
+            "device(s) to run inference on, comma-separated (defaults to MS_INFERENCE_DEVICE)"
+        ),
+        type=parse_device_names,
+        default=INFERENCE_DEVICE,
+    )
     parser.add_argument(
         "--output",
         type=str,
@@ -208,12 +386,6 @@ if __name__ == "__main__":
     parser = infer_parser()
     args = parser.parse_args()
 
-    no_imgs = args.images is None
-    no_zarr = args.zarr is None
-    if (no_imgs and no_zarr) or (not no_imgs and not no_zarr):
-        print("you must supply a value for only one of --images or --zarr")
-        sys.exit(1)
-
     if not args.verbose:
         tqdm = _tqdm
     else:
@@ -223,6 +395,36 @@ if __name__ == "__main__":
             print("install tqdm for progress bars")
             tqdm = _tqdm
 
+    if args.reprocess is not None:
+        yogo = YOGO(device_name=args.device)
+        total_frames, t0 = 0, perf_counter()
+        for zarr_path in args.reprocess:
+            output_dir = (
+                Path(args.output) if args.output is not None else Path(zarr_path).parent
+            )
+            total_frames += reprocess_zarr(
+                yogo,
+                zarr_path,
+                output_dir,
+                batch_size=args.batch_size,
+                checkpoint_every=args.checkpoint_every,
+                num_readers=args.num_readers,
+                num_workers=args.num_workers,
+                progress=tqdm,
+            )
+        dt = perf_counter() - t0
+        print(
+            f"reprocessed {total_frames} frames in {dt:.1f} s "
+            f"({total_frames / max(dt, 1e-9):.1f} frames/s)"
+        )
+        sys.exit(0)
+
+    no_imgs = args.images is None
+    no_zarr = args.zarr is None
+    if (no_imgs and no_zarr) or (not no_imgs and not no_zarr):
+        print("you must supply a value for only one of --images or --zarr")
+        sys.exit(1)
+
     # hacky way to get dimension of first image
     im = next(
         iter(
@@ -251,7 +453,7 @@ if __name__ == "__main__":
         print("warning: no model provided, defaulting to AutoFocus")
         model_classes = [AutoFocus]
 
-    models = [m() for m in model_classes]
+    models = [m(device_name=args.device) for m in model_classes]
 
     if args.asyn and not args.view_img:
         infer_func = asyn_infer
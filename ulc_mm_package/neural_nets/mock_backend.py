@@ -0,0 +1,173 @@
+#! /usr/bin/env python3
+
+"""
+Mock inference backend (device_name="MOCK", or MS_INFERENCE_DEVICE=MOCK)
+
+Nothing is inferred - each request just waits out a (configurable) latency and gives
+back either a recorded output tensor or a synthesized one. That is enough to run
+everything downstream of the neural nets (ScopeOp.run_experiment, PredictionsHandler,
+DataStorage.close) at a realistic load, and to reproduce an NCS falling behind, on any
+machine.
+
+Outputs only depend on the order requests are started in and on MOCK_SEED, so a run
+can be reproduced exactly. The input is only checked for its shape.
+
+Recordings are .npy files of stacked model outputs, e.g. the `result`s from
+YOGO.get_asyn_results, of shape (N, *output shape[1:]) or (N, *output shape). They are
+replayed in order, looping back to the start.
+"""
+
+import time
+
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from ulc_mm_package.neural_nets.NCSModel import HostInferQueue
+from ulc_mm_package.neural_nets.neural_network_constants import (
+    MOCK_JITTER_S,
+    MOCK_LATENCY_S,
+    MOCK_NUM_JOBS,
+    MOCK_NUM_OBJECTS,
+    MOCK_REPLAY_DIR,
+    MOCK_SEED,
+)
+
+# size of a synthesized cell's bounding box, in pixels of the model input
+MOCK_CELL_SIZE_PX = 45
+
+
+class MockModel:
+    """Stands in for a compiled model - its input/output shapes, and how to make outputs
+
+    params:
+        input_shape: shape of the (uint8, NHWC) input the real model takes
+        output_shape: shape of the real model's output
+        recording: outputs to replay (see the module docstring); synthesized if None
+        num_objects: number of cells in each synthesized YOGO output
+        class_weights: relative frequency of each class for synthesized cells
+            (defaults to 90% the first class, i.e. healthy, and the rest split evenly)
+    """
+
+    def __init__(
+        self,
+        input_shape: Tuple[int, ...],
+        output_shape: Tuple[int, ...],
+        recording: Optional[npt.NDArray] = None,
+        latency_s: float = MOCK_LATENCY_S,
+        jitter_s: float = MOCK_JITTER_S,
+        num_jobs: int = MOCK_NUM_JOBS,
+        num_objects: int = MOCK_NUM_OBJECTS,
+        class_weights: Optional[Sequence[float]] = None,
+        seed: int = MOCK_SEED,
+    ):
+        self.input_shape = tuple(input_shape)
+        self.output_shape = tuple(output_shape)
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.num_jobs = num_jobs
+        self.num_objects = num_objects
+        self.seed = seed
+
+        self.recording: Optional[npt.NDArray] = None
+        if recording is not None:
+            frame_size = int(np.prod(self.output_shape))
+            if recording.size == 0 or recording.size % frame_size != 0:
+                raise ValueError(
+                    f"recording of shape {recording.shape} can't be split into "
+                    f"outputs of shape {self.output_shape}"
+                )
+            self.recording = recording.astype(np.float16).reshape(
+                -1, *self.output_shape
+            )
+
+        # YOGO's output is (1, 5 + num classes, Sy, Sx); anything else (AutoFocus) is
+        # synthesized as plain noise
+        self._is_yogo_like = len(self.output_shape) == 4 and self.output_shape[1] > 5
+        if self._is_yogo_like:
+            num_classes = self.output_shape[1] - 5
+            if class_weights is None:
+                class_weights = [0.9] + [0.1 / (num_classes - 1)] * (num_classes - 1)
+            weights = np.asarray(class_weights, dtype=np.float64)
+            self._class_probs = weights / weights.sum()
+
+    def output(self, job_idx: int) -> npt.NDArray:
+        """The output for the `job_idx`th request"""
+        if self.recording is not None:
+            return self.recording[job_idx % len(self.recording)]
+
+        rng = np.random.default_rng((self.seed, job_idx))
+        if not self._is_yogo_like:
+            return rng.normal(0, 1, self.output_shape).astype(np.float16)
+        return self._synthesize_yogo(rng)
+
+    def _synthesize_yogo(self, rng: np.random.Generator) -> npt.NDArray:
+        """`num_objects` cells (at most one per non-overlapping slot) with confident
+        predictions, and every other grid cell empty
+        """
+        _, pred_dim, Sy, Sx = self.output_shape
+        _, h, w, _ = self.input_shape
+        out = np.zeros(self.output_shape, dtype=np.float16)
+
+        # slots a cell's width apart (in grid cells), so boxes don't overlap and
+        # survive NMS, i.e. each synthesized cell is counted once
+        stride_y = int(np.ceil(MOCK_CELL_SIZE_PX / (h / Sy))) + 1
+        stride_x = int(np.ceil(MOCK_CELL_SIZE_PX / (w / Sx))) + 1
+        slots_y = np.arange(stride_y // 2, Sy, stride_y)
+        slots_x = np.arange(stride_x // 2, Sx, stride_x)
+        num_slots = len(slots_y) * len(slots_x)
+
+        chosen = rng.choice(
+            num_slots, size=min(self.num_objects, num_slots), replace=False
+        )
+        rows = slots_y[chosen // len(slots_x)]
+        cols = slots_x[chosen % len(slots_x)]
+        labels = rng.choice(
+            len(self._class_probs), size=len(chosen), p=self._class_probs
+        )
+
+        out[0, 0, rows, cols] = (cols + 0.5) / Sx
+        out[0, 1, rows, cols] = (rows + 0.5) / Sy
+        out[0, 2, rows, cols] = MOCK_CELL_SIZE_PX / w
+        out[0, 3, rows, cols] = MOCK_CELL_SIZE_PX / h
+        out[0, 4, rows, cols] = 0.99
+        out[0, 5:, rows, cols] = 0.01 / (pred_dim - 6)
+        out[0, 5 + labels, rows, cols] = 0.99
+        return out
+
+
+class MockInferQueue(HostInferQueue):
+    """AsyncInferQueue stand-in whose requests take `model.latency_s` (+ jitter), with up to
+    `model.num_jobs` running at a time, like the InferRequests of a real device
+    """
+
+    def __init__(self, model: MockModel):
+        super().__init__(model.num_jobs)
+        self.model = model
+
+    def _infer(self, input_tensor: npt.NDArray, job_idx: int) -> List[npt.NDArray]:
+        t0 = time.perf_counter()
+        if input_tensor.shape[1:] != self.model.input_shape[1:]:
+            raise ValueError(
+                f"input of shape {input_tensor.shape} doesn't fit the model's "
+                f"input shape {self.model.input_shape}"
+            )
+        output = self.model.output(job_idx)
+
+        jitter_rng = np.random.default_rng((self.model.seed, job_idx, 1))
+        latency = self.model.latency_s + self.model.jitter_s * jitter_rng.normal()
+        time.sleep(max(latency - (time.perf_counter() - t0), 0))
+        return [output]
+
+
+def load_recording(model_name: str) -> Optional[npt.NDArray]:
+    """The recording for `model_name` (e.g. "YOGO") in MOCK_REPLAY_DIR, if there is one"""
+    if MOCK_REPLAY_DIR == "":
+        return None
+
+    path = Path(MOCK_REPLAY_DIR) / f"{model_name}.npy"
+    if not path.exists():
+        return None
+    return np.load(path)
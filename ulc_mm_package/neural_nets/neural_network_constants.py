@@ -1,20 +1,101 @@
+import os
+import enum
+
 from pathlib import Path
-from typing import Tuple, Dict, List
+from typing import Tuple, Dict, List, Optional, Sequence, Union
 
 from ulc_mm_package.scope_constants import ACQUISITION_FPS, CAMERA_SELECTION
+from ulc_mm_package.utilities.queue_policy import QueuePolicy
 
 curr_dir = Path(__file__).parent.resolve()  # Get full path
 
 
+# ================ Inference device constants ================ #
+# "MYRIAD" - Neural Compute Stick 2 (default, what the scope runs on)
+# "CPU"    - OpenVINO CPU plugin, for running off-scope
+# "ONNX"   - ONNX Runtime on the CPU, using the `best.onnx` next to the model's xml file
+# "MOCK"   - no inference; outputs are replayed or synthesized (see mock_backend.py)
+#
+# Several devices of one kind can be given as a comma-separated list, and asyn jobs are
+# then spread across them, e.g. two sticks: "MYRIAD.1.1-ma2480,MYRIAD.1.3-ma2480"
+# (see `Core().available_devices`), or "CPU,CPU" to stand in for them off-scope.
+MYRIAD_DEVICE = "MYRIAD"
+CPU_DEVICE = "CPU"
+ONNX_DEVICE = "ONNX"
+MOCK_DEVICE = "MOCK"
+INFERENCE_DEVICES = (MYRIAD_DEVICE, CPU_DEVICE, ONNX_DEVICE, MOCK_DEVICE)
+# devices whose requests are run by a HostInferQueue rather than by OpenVINO
+HOST_DEVICES = (ONNX_DEVICE, MOCK_DEVICE)
+
+
+def device_kind(device_name: str) -> str:
+    """e.g. "MYRIAD.1.1-ma2480" -> "MYRIAD" """
+    return device_name.split(".", 1)[0].upper()
+
+
+def parse_device_names(device_names: Union[str, Sequence[str]]) -> List[str]:
+    """Split a comma-separated device string into device names, checking that they
+    are all known, and all of the same kind
+    """
+    if isinstance(device_names, str):
+        device_names = device_names.split(",")
+
+    names = []
+    for name in device_names:
+        kind, sep, rest = name.strip().partition(".")
+        names.append(kind.upper() + sep + rest)
+
+    kinds = {device_kind(name) for name in names}
+    if len(names) == 0 or not kinds.issubset(INFERENCE_DEVICES):
+        raise ValueError(
+            f"inference devices must be from {INFERENCE_DEVICES}, got {names}"
+        )
+    if len(kinds) > 1:
+        raise ValueError(f"inference devices must all be of one kind, got {names}")
+    return names
+
+
+INFERENCE_DEVICE = ",".join(
+    parse_device_names(os.environ.get("MS_INFERENCE_DEVICE", MYRIAD_DEVICE))
+)
+
+# Number of parallel inference jobs for the ONNX Runtime backend
+ONNX_NUM_JOBS = int(os.environ.get("MS_ONNX_NUM_JOBS", 2))
+
+# Mock backend: each request takes MOCK_LATENCY_S (+ gaussian MOCK_JITTER_S), with
+# MOCK_NUM_JOBS requests at a time. Outputs are replayed from <model class>.npy (e.g.
+# YOGO.npy) in MOCK_REPLAY_DIR if there is one, otherwise synthesized, with
+# MOCK_NUM_OBJECTS cells per YOGO frame. The same MOCK_SEED gives the same outputs.
+MOCK_LATENCY_S = float(os.environ.get("MS_MOCK_LATENCY_S", 0.05))
+MOCK_JITTER_S = float(os.environ.get("MS_MOCK_JITTER_S", 0.01))
+MOCK_NUM_JOBS = int(os.environ.get("MS_MOCK_NUM_JOBS", 4))
+MOCK_NUM_OBJECTS = int(os.environ.get("MS_MOCK_NUM_OBJECTS", 40))
+MOCK_REPLAY_DIR = os.environ.get("MS_MOCK_REPLAY_DIR", "")
+MOCK_SEED = int(os.environ.get("MS_MOCK_SEED", 0))
+
+# Compiled models are cached here by OpenVINO, so that after the first launch the
+# models are loaded instead of compiled. Cache entries are keyed on the model (including
+# its weights and preprocessing), the device, the compile config, and the OpenVINO
+# version, so a changed model never loads a stale blob. Set to "" to disable the cache.
+MODEL_CACHE_DIR = os.environ.get(
+    "MS_MODEL_CACHE_DIR", str(Path.home() / ".cache" / "ulc-malaria-scope" / "openvino")
+)
+
+
 # ================ Autofocus constants ================ #
 AF_PERIOD_S = 0.1  # (10 imgs/sec)
 AF_PERIOD_NUM = int(
     AF_PERIOD_S * ACQUISITION_FPS
 )  # Used for periodic (ie. EWMA) autofocus
 AF_BATCH_SIZE = 20  # Used for single shot autofocus
+# Set to an int to run single shot autofocus as batched inference (one InferRequest per
+# AF_SYN_BATCH_SIZE images) instead of one InferRequest per image
+AF_SYN_BATCH_SIZE: Optional[int] = None
 
 AF_THRESHOLD = 2
 AF_QSIZE = 25
+# Periodic autofocus only cares about the most recent frames
+AF_QUEUE_POLICY = QueuePolicy.DROP_OLDEST
 
 AUTOFOCUS_MODEL_NAME = "fast-cosmos-557"
 AUTOFOCUS_MODEL_DIR = str(
@@ -33,6 +114,23 @@ YOGO_PRED_THRESHOLD = 0.5
 YOGO_CONF_THRESHOLD = (
     0.95  # TODO: adaptive confidence threshold based on clinical or cultured use case
 )
+# Bound the YOGO backlog to ~30 s of frames, so the end-of-run drain time is bounded too.
+# By default every frame is inferred, so if the NCS falls behind, asyn waits for room.
+# Dropping frames instead (e.g. "keep_every_nth", to thin them out evenly) changes the
+# counts, so it has to be opted into.
+YOGO_QSIZE = int(30 * ACQUISITION_FPS)
+YOGO_QUEUE_POLICY = QueuePolicy(
+    os.environ.get("MS_YOGO_QUEUE_POLICY", QueuePolicy.BLOCK.value)
+)
+# Number of preallocated YOGO result buffers (~77 kB each). Results are held from the
+# inference callback until they've been added to the PredictionsHandler and released,
+# so this only has to cover the results waiting between two get_asyn_results calls.
+YOGO_RESULT_POOL_SIZE = 128
+# The heatmap sums each class's confidences (those above YOGO_CONF_THRESHOLD) over
+# HEATMAP_BIN_SIZE x HEATMAP_BIN_SIZE blocks of YOGO grid cells. Class k is only added
+# every HEATMAP_CLASS_STRIDES[k]th frame (0 - never)
+HEATMAP_BIN_SIZE = int(os.environ.get("MS_HEATMAP_BIN_SIZE", 1))
+HEATMAP_CLASS_STRIDES: Tuple[int, ...] = (1, 1, 1, 1, 1, 1, 1)
 YOGO_MODEL_NAME = "elated-smoke-4492"
 YOGO_MODEL_DIR = str(curr_dir / "yogo_model_files" / YOGO_MODEL_NAME / "best.xml")
 
@@ -83,4 +181,19 @@ IMG_RESIZED_DIMS = (400, 300)
 
 # ================ Prediction filtering constants ================ #
 IOU_THRESH = 0.5
+
+
+class NMSMethod(enum.Enum):
+    """How overlapping predictions are suppressed. Both keep exactly the same boxes."""
+
+    # compare each kept box against every remaining one, O(N^2)
+    GREEDY = "greedy"
+    # bucket boxes into a uniform grid and only compare neighbouring cells
+    GRID = "grid"
+
+
+NMS_METHOD = NMSMethod(os.environ.get("MS_NMS_METHOD", NMSMethod.GRID.value))
+# Smallest width of the NMS grid's cells (px), about one RBC's diameter. Cells are made
+# wider if a frame has larger boxes, since overlapping boxes must be in neighbouring cells
+NMS_GRID_CELL_PX = 40
 # add constant for min size filtering (by class?)
@@ -1,5 +1,5 @@
-import heapq as hq
-from typing import Dict, List, Tuple
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
 
 import numpy as np
 import numpy.typing as npt
@@ -9,6 +9,7 @@ import ulc_mm_package.neural_nets.utils as nn_utils
 from ulc_mm_package.neural_nets.utils import Thumbnail, get_output_layer_dims_from_xml
 from ulc_mm_package.neural_nets.NCSModel import AsyncInferenceResult
 from ulc_mm_package.neural_nets.YOGOInference import YOGO
+from ulc_mm_package.utilities.npy_append import NpyAppendFile
 from ulc_mm_package.scope_constants import CAMERA_SELECTION
 from ulc_mm_package.QtGUI.gui_constants import MAX_THUMBNAILS
 from ulc_mm_package.neural_nets.neural_network_constants import (
@@ -17,13 +18,248 @@ from ulc_mm_package.neural_nets.neural_network_constants import (
     YOGO_CROP_HEIGHT_PX,
     IOU_THRESH,
     YOGO_MODEL_DIR,
-    YOGO_CONF_THRESHOLD,
+    HEATMAP_BIN_SIZE,
+    HEATMAP_CLASS_STRIDES,
 )
 
 NUM_CLASSES = len(YOGO_CLASS_LIST)
 IMG_W, IMG_H = CAMERA_SELECTION.IMG_WIDTH, YOGO_CROP_HEIGHT_PX
 HIGH_CONF_THRESH = 0.7
-MAX_POSSIBLE_PREDICTIONS = 3_500_000
+# The prediction store grows by this many predictions (~2 MB) at a time
+PRED_STORE_CHUNK_SIZE = 65_536
+# A run's predictions on disk (see PredictionsHandler.start_spill) are at most this
+# far behind
+PRED_SPILL_FLUSH_PERIOD_S = 5.0
+
+
+def parse_yogo_prediction(img_id: int, prediction_tensor: npt.NDArray) -> npt.NDArray:
+    """Parse one raw YOGO prediction into the stored (8+NUM_CLASSES) x N format
+
+    Parameters
+    ----------
+    img_id: int
+        Img id to which these predictions belong
+    prediction_tensor: (1 * (5+NUM_CLASSES) * (Sx*Sy))
+
+    Returns
+    -------
+    npt.NDArray
+        The parsed predictions left after non-maximum suppression
+    """
+
+    # At most one prediction per grid cell
+    parsed_tensor = np.empty(
+        (8 + NUM_CLASSES, prediction_tensor.shape[-1]), dtype=nn_utils.DTYPE
+    )
+    num_preds = nn_utils.parse_prediction_tensor_into(
+        parsed_tensor, 0, img_id, prediction_tensor, img_h=IMG_H, img_w=IMG_W
+    )
+    return parsed_tensor[:, :num_preds].copy()
+
+
+class ChunkedPredictionStore:
+    """Append-only store of parsed predictions, as nn_utils.PRED_RECORD_DTYPE records,
+    that grows in chunks of `chunk_size` records as they're needed.
+
+    Each frame's predictions are kept together in one chunk, and chunks are never
+    moved. A contiguous array of everything is only made when asked for (see
+    `to_array`). If `spill` is set, every frame's records are also appended to it.
+    """
+
+    def __init__(self, chunk_size: int = PRED_STORE_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.spill: Optional[NpyAppendFile] = None
+        # a frame is parsed here (at most one prediction per grid cell) before it's
+        # packed into records, using _parse_scratch's working arrays
+        self._scratch = np.empty((8 + NUM_CLASSES, 0), dtype=nn_utils.DTYPE)
+        self._parse_scratch = nn_utils.new_parse_scratch(0)
+        self.clear()
+
+    def __len__(self) -> int:
+        return self._num_preds
+
+    def clear(self) -> None:
+        """Drop all the predictions, and the memory they were in"""
+        self._chunks: List[npt.NDArray] = []
+        self._chunk_used: List[int] = []
+        self._num_preds = 0
+
+    def _new_chunk(self, min_size: int) -> npt.NDArray:
+        chunk = np.empty(
+            max(self.chunk_size, min_size), dtype=nn_utils.PRED_RECORD_DTYPE
+        )
+        self._chunks.append(chunk)
+        self._chunk_used.append(0)
+        return chunk
+
+    def append_frame(self, img_id: int, prediction_tensor: npt.NDArray) -> npt.NDArray:
+        """Parse, non-maximum suppress and scale (by 1, i.e. to the original sized
+        images) one raw YOGO prediction, and add it to the store
+
+        Returns
+        -------
+        npt.NDArray
+            The frame's (8+NUM_CLASSES) x n parsed predictions. This is a view of the
+            store's scratch, so it's only valid until the next call; copy it to keep it
+        """
+
+        num_cells = prediction_tensor.shape[-1]
+        if self._scratch.shape[1] < num_cells:
+            self._scratch = np.empty((8 + NUM_CLASSES, num_cells), dtype=nn_utils.DTYPE)
+            self._parse_scratch = nn_utils.new_parse_scratch(num_cells)
+        num_preds = nn_utils.parse_prediction_tensor_into(
+            self._scratch,
+            0,
+            img_id,
+            prediction_tensor,
+            img_h=IMG_H,
+            img_w=IMG_W,
+            iou_thresh=IOU_THRESH,
+            scratch=self._parse_scratch,
+        )
+        parsed = self._scratch[:, :num_preds]
+
+        if len(self._chunks) == 0 or (
+            len(self._chunks[-1]) - self._chunk_used[-1] < num_preds
+        ):
+            self._new_chunk(num_preds)
+        chunk, start = self._chunks[-1], self._chunk_used[-1]
+        records = nn_utils.to_pred_records(parsed, out=chunk[start : start + num_preds])
+        if self.spill is not None:
+            self.spill.append(records)
+
+        self._chunk_used[-1] = start + num_preds
+        self._num_preds += num_preds
+        return parsed
+
+    def to_array(self) -> npt.NDArray:
+        """All the predictions, as one contiguous array of records
+
+        The chunks are replaced by that array, so memory isn't held twice; later
+        predictions go in new chunks.
+        """
+
+        if len(self._chunks) == 0:
+            return np.empty(0, dtype=nn_utils.PRED_RECORD_DTYPE)
+        if len(self._chunks) == 1:
+            return self._chunks[0][: self._chunk_used[0]]
+
+        arr = np.concatenate(
+            [chunk[:used] for chunk, used in zip(self._chunks, self._chunk_used)]
+        )
+        self._chunks, self._chunk_used = [arr], [self._num_preds]
+        return arr
+
+
+class TopKPredictions:
+    """The `k` predictions with the highest (or, if not `largest`, lowest) confidences
+    seen so far, in fixed-size arrays
+
+    Ties on confidence go to the newer image, i.e. the one with the higher id.
+    Entries are kept sorted from least to most extreme, so like a heapq heap, [0] is
+    the one that's pushed out next; it gives a SinglePredictedObject, whose `conf` is
+    negated if not `largest`.
+    """
+
+    def __init__(self, k: int, num_rows: int = 8 + NUM_CLASSES, largest: bool = True):
+        self.k = k
+        self._sign = 1 if largest else -1
+        self._keys = np.empty(0, dtype=np.float64)
+        self._preds = np.empty((num_rows, 0), dtype=nn_utils.DTYPE)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getitem__(self, i: int) -> nn_utils.SinglePredictedObject:
+        return nn_utils.SinglePredictedObject(self._preds[:, i], conf=self._keys[i])
+
+    def __iter__(self) -> Iterator[nn_utils.SinglePredictedObject]:
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def cutoff(self) -> float:
+        """The lowest confidence (negated, if not `largest`) that can still get in"""
+        return self._keys[0] if len(self) == self.k else -np.inf
+
+    def clear(self) -> None:
+        self._keys = self._keys[:0]
+        self._preds = self._preds[:, :0]
+
+    def update(self, parsed_tensor: npt.NDArray, col_ids: npt.NDArray) -> None:
+        """Consider the predictions in columns `col_ids` of a (8+NUM_CLASSES) x N
+        parsed tensor
+        """
+
+        keys = self._sign * parsed_tensor[7, col_ids].astype(np.float64)
+        # can't beat the current k-th, except by tying it from a newer image
+        keep = keys >= self.cutoff
+        col_ids, keys = col_ids[keep], keys[keep]
+        if len(keys) > self.k:
+            top = np.argpartition(keys, len(keys) - self.k)[-self.k :]
+            col_ids, keys = col_ids[top], keys[top]
+        if len(keys) == 0:
+            return
+
+        keys = np.concatenate([self._keys, keys])
+        preds = np.concatenate([self._preds, parsed_tensor[:, col_ids]], axis=1)
+        order = np.lexsort((preds[0], keys))[-self.k :]
+        self._keys, self._preds = keys[order], preds[:, order]
+
+
+class HeatmapAccumulator:
+    """Per-class sums of YOGO's confidences (those above YOGO_CONF_THRESHOLD) over the
+    output grid, binned into `bin_size` x `bin_size` blocks of grid cells
+
+    Class k is only added every `class_strides[k]`th frame (0 - never), see
+    `num_frames_for_class` to normalize.
+    """
+
+    def __init__(
+        self,
+        sy: int,
+        sx: int,
+        bin_size: int = HEATMAP_BIN_SIZE,
+        class_strides: Sequence[int] = HEATMAP_CLASS_STRIDES,
+    ):
+        self.sx = sx
+        self.bin_size = bin_size
+        self.class_strides = tuple(class_strides)
+        self._heatmap = np.zeros(
+            (NUM_CLASSES, -(-sy // bin_size), -(-sx // bin_size)), dtype=np.float32
+        )
+        self.num_frames = 0
+
+    def add(self, prediction_tensor: npt.NDArray) -> None:
+        """Add a raw YOGO prediction (which is left as it is)"""
+        nn_utils.add_to_heatmap(
+            self._heatmap,
+            prediction_tensor,
+            self.sx,
+            bin_size=self.bin_size,
+            frame_idx=self.num_frames,
+            class_strides=self.class_strides,
+        )
+        self.num_frames += 1
+
+    def reset(self) -> None:
+        self._heatmap.fill(0)
+        self.num_frames = 0
+
+    def num_frames_for_class(self, class_id: int) -> int:
+        """Number of frames that class `class_id` was added from"""
+        stride = self.class_strides[class_id]
+        return -(-self.num_frames // stride) if stride > 0 else 0
+
+    def snapshot(self, class_id: Optional[int] = None) -> npt.NDArray:
+        """Read-only view of the heatmap, or of one class's
+
+        Nothing is copied, so e.g. the live view can show it mid-run, but it keeps
+        changing as frames are added; copy it to keep it as it is.
+        """
+        view = self._heatmap if class_id is None else self._heatmap[class_id]
+        view = view.view()
+        view.flags.writeable = False
+        return view
 
 
 class PredictionsHandler:
@@ -38,68 +274,106 @@ class PredictionsHandler:
     """
 
     def __init__(self):
-        # 8+NUM_CLASSES x N, 0 - img id, 1-4 bbox, 5 objectness, 6 class label, 7 max conf, [8-M] - confs for each class
-        self.pred_tensors = np.zeros(
-            (8 + NUM_CLASSES, MAX_POSSIBLE_PREDICTIONS)
-        ).astype(nn_utils.DTYPE)
-
-        self.new_pred_pointer: int = 0
+        # N nn_utils.PRED_RECORD_DTYPE records: img id, bbox, objectness, class label, max conf, confs for each class
+        self.pred_store = ChunkedPredictionStore()
 
         class_ids = [YOGO_CLASS_IDX_MAP[x] for x in YOGO_CLASS_LIST]
         self.class_ids = class_ids
 
-        self.max_confs: Dict[int, List[nn_utils.SinglePredictedObject]] = {
-            x: [] for x in class_ids
-        }
-        self.curr_min_of_max_confs_by_class = {
-            x: HIGH_CONF_THRESH - 1e-6 for x in class_ids
-        }
+        # Counts of each class (above YOGO_CONF_THRESHOLD) in the last frame, and in
+        # all of them, kept up to date as frames are added
+        self.frame_class_counts = np.zeros(NUM_CLASSES, dtype=np.int64)
+        self.class_counts = np.zeros(NUM_CLASSES, dtype=np.int64)
 
-        self.min_confs: Dict[int, List[nn_utils.SinglePredictedObject]] = {
-            x: [] for x in class_ids
+        # MAX_THUMBNAILS highest confidence predictions of each class (at least
+        # HIGH_CONF_THRESH), and lowest (at most HIGH_CONF_THRESH)
+        self.max_confs: Dict[int, TopKPredictions] = {
+            x: TopKPredictions(MAX_THUMBNAILS) for x in class_ids
+        }
+        self.min_confs: Dict[int, TopKPredictions] = {
+            x: TopKPredictions(MAX_THUMBNAILS, largest=False) for x in class_ids
         }
-        self.curr_max_of_min_confs_by_class = {x: HIGH_CONF_THRESH for x in class_ids}
 
         # Run funcs below once on mock-data, numba compiles the function on first run (which is a little slow)
         sx, sy = get_output_layer_dims_from_xml(YOGO_MODEL_DIR)
-        mock_pre_parsed_data = np.random.rand(1, 12, sx * sy).astype(np.float32)
-        mock_parsed_data = np.random.rand(8 + NUM_CLASSES, 30).astype(np.float32)
+        mock_pre_parsed_data = np.random.rand(1, 5 + NUM_CLASSES, sx * sy).astype(
+            np.float16
+        )
+        nn_utils.parse_prediction_tensor_into(
+            np.empty((8 + NUM_CLASSES, sx * sy), dtype=nn_utils.DTYPE),
+            0,
+            0,
+            mock_pre_parsed_data,
+            IMG_H,
+            IMG_W,
+            IOU_THRESH,
+        )
+
+        self.heatmap = HeatmapAccumulator(sy, sx)
+        self.heatmap.add(mock_pre_parsed_data)
+        self.heatmap.reset()
+
+    @property
+    def pred_tensors(self) -> npt.NDArray:
+        """All the predictions, as a (8+NUM_CLASSES) x N parsed tensor"""
+        return nn_utils.from_pred_records(self.get_prediction_tensors())
+
+    def start_spill(self, path: Path) -> None:
+        """Also stream the predictions to an .npy file at `path` as they're added,
+        so they're on disk if the run never finishes (see NpyAppendFile)
 
-        nn_utils.parse_prediction_tensor(0, mock_pre_parsed_data, IMG_H, IMG_W)
-        nn_utils.nms(mock_parsed_data, IOU_THRESH)
+        If they're already being streamed to `path` (e.g. when an experiment is
+        resumed), that carries on.
+        """
+        spill = self.pred_store.spill
+        if spill is not None and spill.path == Path(path):
+            return
+        self.stop_spill()
+        self.pred_store.spill = NpyAppendFile(
+            path,
+            nn_utils.PRED_RECORD_DTYPE,
+            grow_by=PRED_STORE_CHUNK_SIZE,
+            flush_period_s=PRED_SPILL_FLUSH_PERIOD_S,
+        )
 
-        # Setup heatmap masking
-        self.heatmaps = np.zeros((len(YOGO_CLASS_LIST), sy * sx))
+    def stop_spill(self) -> Optional[Path]:
+        """Finish the .npy file from `start_spill`, if there is one, and return its path"""
+        spill = self.pred_store.spill
+        if spill is None:
+            return None
+        spill.close()
+        self.pred_store.spill = None
+        return spill.path
 
     def reset(self):
-        self.pred_tensors.fill(0)
-        self.new_pred_pointer = 0
-        self.max_confs = {x: [] for x in self.class_ids}
-        self.curr_min_of_max_confs_by_class = {
-            x: HIGH_CONF_THRESH - 1e-6 for x in self.class_ids
-        }
-        self.min_confs = {x: [] for x in self.class_ids}
-        self.curr_max_of_min_confs_by_class = {
-            x: HIGH_CONF_THRESH for x in self.class_ids
-        }
-        self.heatmaps.fill(0)
+        self.stop_spill()
+        self.pred_store.clear()
+        self.frame_class_counts.fill(0)
+        self.class_counts.fill(0)
+        for x in self.class_ids:
+            self.max_confs[x].clear()
+            self.min_confs[x].clear()
+        self.heatmap.reset()
+
+    @property
+    def heatmaps(self) -> npt.NDArray:
+        """The heatmap, as a (read-only) NUM_CLASSES x (bins in y * bins in x) view"""
+        return self.heatmap.snapshot().reshape(NUM_CLASSES, -1)
 
     def add_raw_pred_to_heatmap(self, yogo_res: AsyncInferenceResult) -> None:
-        """Add the raw YOGO prediction to the heatmap.
+        """Add the raw YOGO prediction to the heatmap (the result isn't changed).
 
         Parameters
         ----------
         yogo_res: AsyncInferenceResult
         """
 
-        class_preds = yogo_res.result[0, 5:, :]
-        class_preds[class_preds < YOGO_CONF_THRESHOLD] = 0
-        self.heatmaps += class_preds
+        self.heatmap.add(yogo_res.result)
 
     def _add_pred_tensor_to_store(
         self, img_id: int, prediction_tensor: npt.NDArray
-    ) -> Tuple[int, int]:
-        """Append the image id to the given prediction tensor and add it to the storage.
+    ) -> npt.NDArray:
+        """Parse the given prediction tensor and add it to the storage.
 
         Parameters
         ----------
@@ -109,118 +383,38 @@ class PredictionsHandler:
 
         Returns
         -------
-        Tuple[int, int]
-            The start and end column positions of the added array in the tensor store
+        npt.NDArray
+            The added (8+NUM_CLASSES) x N parsed predictions, valid until the next
+            frame is added (see ChunkedPredictionStore.append_frame)
         """
 
-        # Parse tensor to (8+NUM_CLASSES) x N format (N predictions)
-        parsed_tensor = nn_utils.parse_prediction_tensor(
-            img_id, prediction_tensor, img_h=IMG_H, img_w=IMG_W
-        )
-
-        # Non-maximum suppression
-        parsed_tensor = parsed_tensor[:, nn_utils.nms(parsed_tensor, IOU_THRESH)]
-
-        # Scale the bounding box locations so they can be used with
-        # the original sized images (note this function scales the array in-place)
-        nn_utils.scale_bbox_vals(parsed_tensor, scale_h=1, scale_w=1)
-
-        # Store the parsed tensor
-        num_preds = parsed_tensor.shape[1]
-        self.pred_tensors[
-            :, self.new_pred_pointer : self.new_pred_pointer + num_preds
-        ] = parsed_tensor
-
-        start = self.new_pred_pointer
-        self.new_pred_pointer += num_preds
-
-        return (start, self.new_pred_pointer)
+        return self.pred_store.append_frame(img_id, prediction_tensor)
 
     def _update_max_conf_min_conf_thumbnails(self, parsed_tensor: npt.NDArray):
         """
-        Update the min/max priority queues for thumbnails.
+        Update the highest/lowest confidence predictions of each class for thumbnails.
 
         Parameters
         ----------
-        prediction_tensor: (1 * (5+NUM_CLASSES) * (Sx*Sy))
+        parsed_tensor: (8+NUM_CLASSES) x N parsed predictions
         """
 
-        for x in self.class_ids:
-            max_conf_col_ids = (
-                nn_utils.get_col_ids_for_matching_class_and_above_conf_thresh(
-                    parsed_tensor, x, self.curr_min_of_max_confs_by_class[x]
-                )
-            )
-
-            # Pair up the confidences and column ids and sort them by confidences
-            # and keep only the MAX_THUMBNAILS highest
-            if len(max_conf_col_ids[0] > 0):
-                _, max_conf_col_ids = zip(
-                    *list(
-                        sorted(
-                            zip(
-                                list(parsed_tensor[7, max_conf_col_ids][0]),
-                                list(max_conf_col_ids[0]),
-                            ),
-                            key=lambda y: y[0],
-                        )
-                    )[-MAX_THUMBNAILS:]
-                )
-
-                [
-                    hq.heappushpop(self.max_confs[x], i)  # type: ignore
-                    if len(self.max_confs[x]) >= MAX_THUMBNAILS
-                    else hq.heappush(self.max_confs[x], i)  # type: ignore
-                    for i in nn_utils.get_individual_prediction_objs_from_parsed_tensor(
-                        parsed_tensor, max_conf_col_ids
-                    )
-                ]
-
-                # Update the lowest max conf threshold once we've displayed MAX_THUMBNAILS
-                # i.e we want to first display MAX_THUMBNAILS to the user before
-                # adjusting the conf threshold
-                lowest_max_conf = self.max_confs[x][0].conf
-                curr_min_of_max = self.curr_min_of_max_confs_by_class[x]
-                self.curr_min_of_max_confs_by_class[x] = (
-                    lowest_max_conf
-                    if (len(self.max_confs[0]) > MAX_THUMBNAILS)
-                    else curr_min_of_max
-                )
-
-            # Repeat the above for minimum confidences
-            min_conf_col_ids = (
-                nn_utils.get_col_ids_for_matching_class_and_below_conf_thresh(
-                    parsed_tensor, x, self.curr_max_of_min_confs_by_class[x]
-                )
-            )
-            if len(min_conf_col_ids[0] > 0):
-                _, min_conf_col_ids = zip(
-                    *list(
-                        sorted(
-                            zip(
-                                list(parsed_tensor[7, min_conf_col_ids][0]),
-                                list(min_conf_col_ids[0]),
-                            ),
-                            key=lambda y: y[0],
-                        )
-                    )[:MAX_THUMBNAILS]
-                )
-
-                [
-                    hq.heappushpop(self.min_confs[x], i)  # type: ignore
-                    if len(self.min_confs[x]) >= MAX_THUMBNAILS
-                    else hq.heappush(self.min_confs[x], i)  # type: ignore
-                    for i in nn_utils.get_individual_prediction_objs_from_parsed_tensor(
-                        parsed_tensor, min_conf_col_ids, flip_conf_sign=True
-                    )
-                ]
-                highest_min_conf = self.min_confs[x][0].conf
-                curr_max_of_min = self.curr_max_of_min_confs_by_class[x]
-                self.curr_max_of_min_confs_by_class[x] = (
-                    highest_min_conf
-                    if len(self.min_confs[x]) > MAX_THUMBNAILS
-                    else curr_max_of_min
-                )
+        labels = parsed_tensor[6, :].astype(np.intp)
+        confs = parsed_tensor[7, :].astype(np.float64)
+        for top_k, sign, bound in (
+            (self.max_confs, 1, HIGH_CONF_THRESH - 1e-6),
+            (self.min_confs, -1, HIGH_CONF_THRESH),
+        ):
+            # Once a class's top-k is full, most frames have nothing that would get
+            # in, so they're screened for all the classes at once
+            cutoffs = np.full(NUM_CLASSES, np.inf)
+            for x in self.class_ids:
+                cutoffs[x] = max(sign * bound, top_k[x].cutoff)
+            candidates = np.flatnonzero(sign * confs >= cutoffs[labels])
+
+            candidate_labels = labels[candidates]
+            for x in np.unique(candidate_labels):
+                top_k[x].update(parsed_tensor, candidates[candidate_labels == x])
 
     def add_yogo_pred(self, res: AsyncInferenceResult) -> None:
         """Store the parsed YOGO prediction tensor and update the min/max confidence objects for each class.
@@ -232,14 +426,16 @@ class PredictionsHandler:
 
         img_id = int(res.id)
         pred_tensor = res.result
-        start, end = self._add_pred_tensor_to_store(img_id, pred_tensor)
-        self.parsed_tensor = self.pred_tensors[:, start:end]
+        # (replaced, along with the store's scratch it's a view of, by the next frame)
+        self.parsed_tensor = self._add_pred_tensor_to_store(img_id, pred_tensor)
+        self.frame_class_counts = nn_utils.get_class_count_array(self.parsed_tensor)
+        self.class_counts += self.frame_class_counts
         self._update_max_conf_min_conf_thumbnails(self.parsed_tensor)
 
     def _get_thumbnails(
         self,
         zarr_store: zarr.core.Array,
-        confs: Dict[int, List[nn_utils.SinglePredictedObject]],
+        confs: Dict[int, TopKPredictions],
     ) -> Dict[int, List[Thumbnail]]:
         """Extract thumbnails from the specified confidence Dict (i.e self.min_confs or self.max_confs)
 
@@ -247,7 +443,7 @@ class PredictionsHandler:
         ----------
         zarr_store: zarr.core.Array
             Zarr store in which the original images are stored
-        confs: Dict[int, List[nn_utils.SinglePredictedObject]]
+        confs: Dict[int, TopKPredictions]
             Either self.min_confs or self.max_confs
 
         Returns
@@ -308,4 +504,5 @@ class PredictionsHandler:
         return self._get_thumbnails(zarr_store, self.min_confs)
 
     def get_prediction_tensors(self) -> npt.NDArray:
-        return self.pred_tensors[:, : self.new_pred_pointer]
+        """All the predictions, as nn_utils.PRED_RECORD_DTYPE records"""
+        return self.pred_store.to_array()
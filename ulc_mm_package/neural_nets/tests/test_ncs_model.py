@@ -0,0 +1,314 @@
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import zarr
+
+from ulc_mm_package.neural_nets.NCSModel import SubmissionQueue
+from ulc_mm_package.neural_nets.mock_backend import MockModel
+from ulc_mm_package.neural_nets.predictions_handler import parse_yogo_prediction
+from ulc_mm_package.neural_nets.YOGOInference import YOGO
+from ulc_mm_package.neural_nets.AutofocusInference import AutoFocus
+from ulc_mm_package.scope_constants import CameraOptions
+from ulc_mm_package.image_processing.zarrwriter import ZarrWriter, get_num_frames
+from ulc_mm_package.neural_nets.infer import ImageLoader, reprocess_zarr
+from ulc_mm_package.neural_nets.neural_network_constants import (
+    CPU_DEVICE,
+    MOCK_DEVICE,
+    MOCK_NUM_OBJECTS,
+    ONNX_DEVICE,
+    YOGO_CROP_HEIGHT_PX,
+    parse_device_names,
+)
+from ulc_mm_package.utilities.queue_policy import QueuePolicy
+
+YOGO_IMG_W = 1032
+AF_IMG_H, AF_IMG_W = 300, 400
+
+
+class TestNCSModelCPUBackends(unittest.TestCase):
+    """These run the real models on the CPU, so no compute stick is needed"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        cls.yogo_imgs = [
+            rng.integers(0, 256, (YOGO_CROP_HEIGHT_PX, YOGO_IMG_W), dtype=np.uint8)
+            for _ in range(4)
+        ]
+        cls.af_img = rng.integers(0, 256, (AF_IMG_H, AF_IMG_W), dtype=np.uint8)
+
+        cls.yogo_cpu = YOGO(device_name=CPU_DEVICE)
+        cls.yogo_onnx = YOGO(device_name=ONNX_DEVICE)
+
+    def test_yogo_syn_output_shape(self):
+        for model in (self.yogo_cpu, self.yogo_onnx):
+            results = model.syn(self.yogo_imgs, sort=True)
+            self.assertEqual(len(results), len(self.yogo_imgs))
+            self.assertEqual(results[0].shape[:2], (1, 12))
+            self.assertEqual(results[0].dtype, np.float16)
+
+    def test_backends_agree(self):
+        cpu_res = self.yogo_cpu.syn(self.yogo_imgs[0]).pop()
+        onnx_res = self.yogo_onnx.syn(self.yogo_imgs[0]).pop()
+        # the two runtimes do their float math slightly differently, so compare on average
+        diff = np.abs(cpu_res.astype(np.float32) - onnx_res.astype(np.float32))
+        self.assertLess(diff.mean(), 1e-3)
+
+    def test_batched_syn_matches_unbatched(self):
+        unbatched = self.yogo_cpu.syn(self.yogo_imgs, sort=True)
+        # 3 doesn't divide 4, so this also checks the partial last batch
+        batched = self.yogo_cpu.syn(self.yogo_imgs, batch_size=3)
+
+        self.assertEqual(len(batched), len(unbatched))
+        for b, u in zip(batched, unbatched):
+            self.assertEqual(b.shape, u.shape)
+            np.testing.assert_allclose(
+                b.astype(np.float32), u.astype(np.float32), atol=1e-2
+            )
+
+    def test_asyn_ids_round_trip(self):
+        for model in (self.yogo_cpu, self.yogo_onnx):
+            for i, img in enumerate(self.yogo_imgs):
+                model.asyn(img, i)
+            results = model.reset(wait_for_jobs=True)
+            self.assertEqual(
+                sorted(r.id for r in results), list(range(len(self.yogo_imgs)))
+            )
+
+    def test_asyn_input_ring(self):
+        autofocus = AutoFocus(device_name=CPU_DEVICE)
+        self.assertIsNotNone(autofocus._input_ring)
+
+        # non-contiguous views, like YOGO.crop_img gives
+        big_imgs = [np.pad(self.af_img, 10) + i for i in range(3)]
+        views = [img[10:-10, 10:-10] for img in big_imgs]
+        expected = autofocus.syn(views, sort=True)
+
+        # more frames than there are buffers, so buffers must be recycled
+        num_frames = len(autofocus._input_ring) + 5
+        results = []
+        for i in range(num_frames):
+            autofocus.asyn(views[i % 3], i)
+            results.extend(autofocus.get_asyn_results(timeout=None))
+        autofocus.wait_all()
+        stats = autofocus.queue_stats()
+        results.extend(autofocus.reset(wait_for_jobs=True))
+
+        # frames may be dropped (AF_QUEUE_POLICY), but then their buffers are recycled too
+        self.assertEqual(stats.accepted + stats.dropped, num_frames)
+        self.assertEqual(len(results), stats.accepted)
+        for r in results:
+            self.assertEqual(r.result.item(), expected[r.id % 3].item())
+        self.assertEqual(autofocus._input_ring.num_free(), len(autofocus._input_ring))
+
+    def test_yogo_result_pool(self):
+        model = self.yogo_cpu
+        pool = model._result_pool
+        expected = model.syn(self.yogo_imgs[0]).pop()
+        # other tests may have left results unreleased
+        num_free = pool.num_free()
+
+        for i in range(2):
+            model.asyn(self.yogo_imgs[0], i)
+        results = model.reset(wait_for_jobs=True)
+        self.assertEqual(pool.num_free(), num_free - 2)
+        for r in results:
+            self.assertIsNotNone(pool.index_of(r.result))
+            np.testing.assert_array_equal(r.result, expected)
+
+        model.release_results(results)
+        self.assertEqual(pool.num_free(), num_free)
+        with self.assertRaises(ValueError):
+            model.release_result(results[0])
+
+    def test_asyn_handles(self):
+        model = self.yogo_cpu
+        handles = [
+            model.asyn(img, i, return_handle=True)
+            for i, img in enumerate(self.yogo_imgs)
+        ]
+        completed = list(model.as_completed(handles, timeout=30))
+
+        self.assertEqual(sorted(h.id for h in completed), list(range(len(handles))))
+        for h in completed:
+            self.assertEqual(h.result.id, h.id)
+            self.assertTrue(h.submitted <= h.started <= h.completed)
+            self.assertGreater(h.latency, 0)
+        # handle results aren't also given out by get_asyn_results
+        self.assertEqual(model.reset(wait_for_jobs=True), [])
+        model.release_results([h.result for h in completed])
+
+    def test_wait_for_id(self):
+        model = self.yogo_cpu
+        for i, img in enumerate(self.yogo_imgs):
+            model.asyn(img, i)
+
+        res = model.wait_for_id(2, timeout=30)
+        self.assertEqual(res.id, 2)
+        # and it's taken out of the stream
+        rest = model.reset(wait_for_jobs=True)
+        self.assertEqual([r.id for r in rest], [0, 1, 3])
+        self.assertIsNone(model.wait_for_id(2, timeout=0))
+        model.release_results(rest + [res])
+
+    def test_multi_device(self):
+        # two CPU instances, standing in for two sticks
+        model = YOGO(device_name=[CPU_DEVICE, CPU_DEVICE])
+        self.assertEqual(len(model.asyn_infer_queues), 2)
+        expected = model.syn(self.yogo_imgs, sort=True)
+
+        num_frames = 3 * len(self.yogo_imgs)
+        for i in range(num_frames):
+            model.asyn(self.yogo_imgs[i % len(self.yogo_imgs)], i)
+        results = model.reset(wait_for_jobs=True)
+
+        # every job went to some device, and they come back in the order they were sent
+        self.assertTrue(all(n > 0 for n in model._jobs_per_device))
+        self.assertEqual(sum(model._jobs_per_device), num_frames)
+        self.assertEqual([r.id for r in results], list(range(num_frames)))
+        for r in results:
+            np.testing.assert_allclose(
+                r.result.astype(np.float32),
+                expected[r.id % len(self.yogo_imgs)].astype(np.float32),
+                atol=1e-2,
+            )
+        model.release_results(results)
+
+    def test_device_names(self):
+        self.assertEqual(parse_device_names("cpu, CPU"), [CPU_DEVICE, CPU_DEVICE])
+        self.assertEqual(parse_device_names("myriad.1.1-ma2480"), ["MYRIAD.1.1-ma2480"])
+        for bad in ("GPU", "CPU,ONNX", ""):
+            with self.assertRaises(ValueError):
+                parse_device_names(bad)
+
+    def test_compiled_model_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir, patch(
+            "ulc_mm_package.neural_nets.NCSModel.MODEL_CACHE_DIR", cache_dir
+        ):
+            AutoFocus(device_name=CPU_DEVICE)
+            autofocus = AutoFocus(device_name=CPU_DEVICE)
+
+        self.assertEqual(autofocus._loaded_from_cache, [True])
+        for stage in ("read", "compile", "total"):
+            self.assertIn(stage, autofocus.load_times)
+
+    def test_autofocus_onnx(self):
+        autofocus = AutoFocus(device_name=ONNX_DEVICE)
+        self.assertEqual(autofocus(self.af_img).pop().shape, (1, 1))
+
+
+class TestMockBackend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.yogo = YOGO(device_name=MOCK_DEVICE)
+        cls.img = np.zeros((YOGO_CROP_HEIGHT_PX, YOGO_IMG_W), dtype=np.uint8)
+
+    def _run(self, model, num_frames):
+        for i in range(num_frames):
+            model.asyn(self.img, i)
+        results = model.reset(wait_for_jobs=True)
+        outputs = [r.result.copy() for r in results]
+        model.release_results(results)
+        return outputs
+
+    def test_synthesized_yogo_outputs(self):
+        # fresh models, since outputs follow the order of all requests a model was given
+        outputs = self._run(YOGO(device_name=MOCK_DEVICE), 3)
+        self.assertEqual(outputs[0].shape, (1, 12, 25 * 129))
+        for out in outputs:
+            preds = parse_yogo_prediction(0, out)
+            self.assertEqual(preds.shape[1], MOCK_NUM_OBJECTS)
+
+        # the same seed gives the same outputs, in the same order
+        for a, b in zip(outputs, self._run(YOGO(device_name=MOCK_DEVICE), 3)):
+            np.testing.assert_array_equal(a, b)
+
+    def test_replay(self):
+        model = self.yogo.model
+        recording = np.random.default_rng(0).random((3, *model.output_shape[1:]))
+        replay = MockModel(model.input_shape, model.output_shape, recording=recording)
+        for i in range(5):
+            np.testing.assert_array_equal(
+                replay.output(i)[0], recording[i % 3].astype(np.float16)
+            )
+
+        with self.assertRaises(ValueError):
+            MockModel(model.input_shape, model.output_shape, recording=np.zeros(10))
+
+    def test_reprocess_multi_frame_chunks(self):
+        num_frames = 49  # 6 full chunks of 8 frames, and 1 frame in the 7th
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            zw = ZarrWriter(CameraOptions.AVT, codec="none", frames_per_chunk=8)
+            zw.createNewFile(f"{tmp_dir}/run")
+            img = np.zeros((CameraOptions.AVT.IMG_HEIGHT, YOGO_IMG_W), dtype=np.uint8)
+            for i in range(num_frames):
+                zw.threadedWriteSingleArray(img, i)
+            zw.flush()
+            zw.closeFile()
+
+            data = zarr.open(f"{tmp_dir}/run.zip", mode="r")
+            self.assertEqual(data.nchunks_initialized, 7)
+            self.assertEqual(get_num_frames(data), num_frames)
+            self.assertEqual(len(ImageLoader.load_zarr_data(f"{tmp_dir}/run.zip")), 49)
+
+            num_inferred = reprocess_zarr(
+                YOGO(device_name=MOCK_DEVICE), f"{tmp_dir}/run.zip", Path(tmp_dir)
+            )
+            self.assertEqual(num_inferred, num_frames)
+            preds = np.load(Path(tmp_dir) / "run_parsed_prediction_tensors.npy")
+            self.assertEqual(len(np.unique(preds["img_id"])), num_frames)
+
+    def test_latency(self):
+        model = self.yogo.model
+        handle = self.yogo.asyn(self.img, 0, return_handle=True)
+        handle.wait(timeout=10)
+        self.assertGreater(handle.latency, model.latency_s - 4 * model.jitter_s)
+        self.yogo.release_result(handle.result)
+
+
+class TestSubmissionQueue(unittest.TestCase):
+    def _fill(self, q: SubmissionQueue, n: int):
+        return [q.put(i) for i in range(n)]
+
+    def _drain(self, q: SubmissionQueue):
+        return [q.get() for _ in range(len(q))]
+
+    def test_drop_newest(self):
+        q = SubmissionQueue(capacity=3, policy=QueuePolicy.DROP_NEWEST)
+        dropped = self._fill(q, 5)
+        self.assertEqual(dropped, [None, None, None, 3, 4])
+        self.assertEqual(self._drain(q), [0, 1, 2])
+        self.assertEqual((q.accepted, q.dropped), (3, 2))
+
+    def test_drop_oldest(self):
+        q = SubmissionQueue(capacity=3, policy=QueuePolicy.DROP_OLDEST)
+        dropped = self._fill(q, 5)
+        self.assertEqual(dropped, [None, None, None, 0, 1])
+        self.assertEqual(self._drain(q), [2, 3, 4])
+        self.assertEqual((q.accepted, q.dropped), (3, 2))
+
+    def test_keep_every_nth(self):
+        q = SubmissionQueue(
+            capacity=2, policy=QueuePolicy.KEEP_EVERY_NTH, keep_every_n=3
+        )
+        self._fill(q, 8)
+        # 0, 1 fill the queue; then 4 and 7 are each admitted by evicting the oldest
+        self.assertEqual(self._drain(q), [4, 7])
+        self.assertEqual(q.dropped, 6)
+
+    def test_join_and_clear(self):
+        q = SubmissionQueue(capacity=4, policy=QueuePolicy.BLOCK)
+        self._fill(q, 4)
+        q.get()
+        q.task_done()
+        self.assertEqual(len(q.clear()), 3)
+        # nothing left unfinished, so this must not block
+        q.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
+import heapq
+import tempfile
 import unittest
 import time
 
+from pathlib import Path
+
 import numpy as np
 from ulc_mm_package.hardware.scope import PredictionsHandler
 from ulc_mm_package.neural_nets.NCSModel import AsyncInferenceResult
@@ -12,17 +16,31 @@ from ulc_mm_package.neural_nets.utils import (
     get_all_confs_for_all_classes,
     get_all_confs_for_specific_class,
     get_class_counts,
+    get_col_ids_for_matching_class_and_above_conf_thresh,
+    from_pred_records,
+    is_pred_records,
     nms,
+    nms_grid,
     parse_prediction_tensor,
+    parse_prediction_tensor_into,
+    parse_prediction_tensors,
+    scale_bbox_vals,
     get_specific_class_from_parsed_tensor,
     get_vals_greater_than_conf_thresh,
     get_vals_less_than_conf_thresh,
     get_individual_prediction_objs_from_parsed_tensor,
+    to_pred_records,
     DTYPE,
+    PRED_RECORD_DTYPE,
 )
 
+from ulc_mm_package.neural_nets.neural_network_constants import YOGO_CONF_THRESHOLD
 from ulc_mm_package.neural_nets.predictions_handler import (
     NUM_CLASSES,
+    ChunkedPredictionStore,
+    HeatmapAccumulator,
+    TopKPredictions,
+    parse_yogo_prediction,
 )
 
 MOCK_YOGO_IMG_H = 772
@@ -162,6 +180,12 @@ class TestYOGOTensorParsing(unittest.TestCase):
         self.assertEqual(self.parsed_predictions.shape[1], 58)
         self.assertEqual(len(keep_idxs), 47)
 
+    def test_nms_grid(self):
+        self.assertEqual(
+            list(nms_grid(self.parsed_predictions, 0.5)),
+            list(nms(self.parsed_predictions, 0.5)),
+        )
+
     def test_predictions_handler_add(self):
         predictions_handler = PredictionsHandler()
         self.assertEqual(predictions_handler.pred_tensors.shape[0], 8 + NUM_CLASSES)
@@ -179,6 +203,56 @@ class TestYOGOTensorParsing(unittest.TestCase):
             get_class_counts(predictions_handler.get_prediction_tensors()), [5, 5, 5, 5]
         )
 
+    def test_predictions_handler_class_counts(self):
+        predictions_handler = PredictionsHandler()
+        rng = np.random.default_rng(0)
+        for i in range(5):
+            res = rng.random((1, 5 + NUM_CLASSES, 500)).astype(np.float16)
+            res[0, 2:4] *= 0.2
+            predictions_handler.add_yogo_pred(AsyncInferenceResult(id=i, result=res))
+            self.assertEqual(
+                predictions_handler.frame_class_counts.tolist(),
+                get_class_counts(predictions_handler.parsed_tensor),
+            )
+
+        self.assertEqual(
+            predictions_handler.class_counts.tolist(),
+            get_class_counts(predictions_handler.pred_tensors),
+        )
+        predictions_handler.reset()
+        self.assertEqual(predictions_handler.class_counts.sum(), 0)
+
+    def test_predictions_handler_spill(self):
+        predictions_handler = PredictionsHandler()
+        rng = np.random.default_rng(0)
+        outputs = rng.random((6, 1, 5 + NUM_CLASSES, 500)).astype(np.float16)
+        outputs[:, 0, 2:4] *= 0.2
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "preds.npy"
+            predictions_handler.start_spill(path)
+            for i, out in enumerate(outputs[:3]):
+                predictions_handler.add_yogo_pred(
+                    AsyncInferenceResult(id=i, result=out)
+                )
+            predictions_handler.pred_store.spill.flush()
+            # readable mid-run
+            np.testing.assert_array_equal(
+                np.load(path), predictions_handler.get_prediction_tensors()
+            )
+
+            # e.g. resuming after a pause carries on with the same file
+            predictions_handler.start_spill(path)
+            for i, out in enumerate(outputs[3:], start=3):
+                predictions_handler.add_yogo_pred(
+                    AsyncInferenceResult(id=i, result=out)
+                )
+            self.assertEqual(predictions_handler.stop_spill(), path)
+            np.testing.assert_array_equal(
+                np.load(path), predictions_handler.get_prediction_tensors()
+            )
+            self.assertIsNone(predictions_handler.stop_spill())
+
     def test_predictions_handler_max_heap(self):
         predictions_handler = PredictionsHandler()
         mock_new_res = np.random.rand(1, 5 + NUM_CLASSES, 11)
@@ -208,5 +282,197 @@ class TestYOGOTensorParsing(unittest.TestCase):
         self.assertEqual(healthy_max_confs[0].parsed[0], 2)  # verify img id
 
 
+class TestParsingKernels(unittest.TestCase):
+    def test_matches_per_frame_parsing(self):
+        rng = np.random.default_rng(0)
+        img_ids = [7, 3, 12]
+        for dtype in (np.float16, np.float32):
+            outputs = rng.random((len(img_ids), 1, 5 + NUM_CLASSES, 500)).astype(dtype)
+            # a frame with nothing in it
+            outputs[1, 0, 4, :] = 0
+
+            expected = np.hstack(
+                [
+                    parse_prediction_tensor(i, out, MOCK_YOGO_IMG_H, MOCK_YOGO_IMG_W)
+                    for i, out in zip(img_ids, outputs)
+                ]
+            )
+            parsed = parse_prediction_tensors(
+                img_ids, list(outputs), MOCK_YOGO_IMG_H, MOCK_YOGO_IMG_W
+            )
+            self.assertGreater(parsed.shape[1], 0)
+            np.testing.assert_array_equal(parsed, expected)
+
+    def test_no_frames(self):
+        self.assertEqual(parse_prediction_tensors([], []).shape, (8 + NUM_CLASSES, 0))
+
+    def test_nms_grid_matches_greedy(self):
+        rng = np.random.default_rng(0)
+        for num_boxes in (1, 50, 1000):
+            preds = np.zeros((8 + NUM_CLASSES, num_boxes), dtype=DTYPE)
+            size = rng.uniform(10, 80, num_boxes)
+            xc = rng.uniform(0, MOCK_YOGO_IMG_W, num_boxes)
+            yc = rng.uniform(0, MOCK_YOGO_IMG_H, num_boxes)
+            preds[1], preds[3] = np.rint(xc - size / 2), np.rint(xc + size / 2)
+            preds[2], preds[4] = np.rint(yc - size / 2), np.rint(yc + size / 2)
+            # with ties
+            preds[8] = np.round(rng.random(num_boxes), 2)
+
+            for thresh in (0.0, 0.5):
+                self.assertEqual(
+                    list(nms_grid(preds, thresh)), list(nms(preds, thresh))
+                )
+            # cells narrower than the boxes are widened
+            self.assertEqual(
+                list(nms_grid(preds, 0.5, cell_px=1)), list(nms(preds, 0.5))
+            )
+
+    def test_fused_matches_parse_nms_scale(self):
+        rng = np.random.default_rng(0)
+        store = np.zeros((8 + NUM_CLASSES, 1000), dtype=DTYPE)
+        for dtype in (np.float16, np.float32):
+            output = rng.random((1, 5 + NUM_CLASSES, 500)).astype(dtype)
+            # small boxes, so that only some of them overlap
+            output[0, 2:4] *= 0.1
+
+            expected = parse_prediction_tensor(
+                3, output, MOCK_YOGO_IMG_H, MOCK_YOGO_IMG_W
+            )
+            expected = expected[:, nms(expected, 0.5)]
+            scale_bbox_vals(expected, 2, 3)
+
+            num_preds = parse_prediction_tensor_into(
+                store, 10, 3, output, MOCK_YOGO_IMG_H, MOCK_YOGO_IMG_W, 0.5, 2, 3
+            )
+            self.assertGreater(num_preds, 0)
+            np.testing.assert_array_equal(store[:, 10 : 10 + num_preds], expected)
+
+        with self.assertRaises(ValueError):
+            parse_prediction_tensor_into(
+                store, 1000 - 1, 3, output, MOCK_YOGO_IMG_H, MOCK_YOGO_IMG_W
+            )
+
+
+class TestChunkedPredictionStore(unittest.TestCase):
+    def test_append_across_chunks(self):
+        rng = np.random.default_rng(0)
+        outputs = rng.random((10, 1, 5 + NUM_CLASSES, 500)).astype(np.float16)
+        # ~100 predictions per frame
+        outputs[:, 0, 2:4] *= 0.2
+
+        store = ChunkedPredictionStore(chunk_size=200)
+        # each frame's parsed predictions are only valid until the next is appended
+        parsed = [store.append_frame(i, out).copy() for i, out in enumerate(outputs)]
+        expected = [parse_yogo_prediction(i, out) for i, out in enumerate(outputs)]
+        self.assertGreater(len(store._chunks), 1)
+
+        for p, exp in zip(parsed, expected):
+            np.testing.assert_array_equal(p, exp)
+        all_preds = store.to_array()
+        self.assertTrue(is_pred_records(all_preds))
+        self.assertEqual(len(store), len(all_preds))
+        np.testing.assert_array_equal(all_preds, to_pred_records(np.hstack(expected)))
+
+        store.append_frame(10, outputs[0])
+        self.assertEqual(len(store.to_array()), len(store))
+
+        store.clear()
+        self.assertEqual(len(store), 0)
+        self.assertEqual(len(store.to_array()), 0)
+
+    def test_records_round_trip(self):
+        rng = np.random.default_rng(0)
+        outputs = rng.random((4, 1, 5 + NUM_CLASSES, 500)).astype(np.float16)
+        outputs[:, 0, 2:4] *= 0.2
+        parsed = np.hstack(
+            [parse_yogo_prediction(i, out) for i, out in enumerate(outputs)]
+        )
+        records = to_pred_records(parsed)
+        self.assertEqual(records.dtype, PRED_RECORD_DTYPE)
+
+        # ids, boxes, labels and peak confidences are exact, the per-class
+        # confidences are kept as float16
+        round_trip = from_pred_records(records)
+        np.testing.assert_array_equal(round_trip[:5], parsed[:5])
+        np.testing.assert_array_equal(round_trip[6:8], parsed[6:8])
+        np.testing.assert_allclose(round_trip[8:], parsed[8:], atol=1e-3)
+
+        # so counts made from saved predictions match those made live
+        self.assertEqual(
+            get_class_counts(records, NUM_CLASSES),
+            get_class_counts(parsed, NUM_CLASSES),
+        )
+        np.testing.assert_array_equal(
+            get_col_ids_for_matching_class_and_above_conf_thresh(records, 0, 0.5),
+            get_col_ids_for_matching_class_and_above_conf_thresh(round_trip, 0, 0.5),
+        )
+
+
+class TestTopKPredictions(unittest.TestCase):
+    def test_matches_heapq(self):
+        rng = np.random.default_rng(0)
+        for largest in (True, False):
+            top_k = TopKPredictions(10, largest=largest)
+            heap: list = []
+            for img_id in range(20):
+                parsed = np.zeros((8 + NUM_CLASSES, 30), dtype=DTYPE)
+                parsed[0] = img_id
+                # coarse confidences, so there are plenty of ties between frames
+                parsed[7] = rng.integers(0, 10, 30) / 10
+                col_ids = np.flatnonzero(parsed[7] > 0.2)
+
+                top_k.update(parsed, col_ids)
+                for obj in get_individual_prediction_objs_from_parsed_tensor(
+                    parsed, col_ids, flip_conf_sign=not largest
+                ):
+                    if len(heap) < 10:
+                        heapq.heappush(heap, obj)
+                    else:
+                        heapq.heappushpop(heap, obj)
+
+            self.assertEqual(len(top_k), 10)
+            self.assertEqual(
+                sorted((o.conf, o.parsed[0]) for o in heap),
+                [(o.conf, o.parsed[0]) for o in top_k],
+            )
+
+
+class TestHeatmapAccumulator(unittest.TestCase):
+    def test_matches_numpy(self):
+        rng = np.random.default_rng(0)
+        sy, sx = 9, 10
+        frames = rng.random((4, 1, 5 + NUM_CLASSES, sy * sx)).astype(np.float16)
+        strides = (1, 2, 0, 1, 1, 3, 1)
+
+        heatmap = HeatmapAccumulator(sy, sx, bin_size=4, class_strides=strides)
+        expected = np.zeros((NUM_CLASSES, sy, sx))
+        for i, frame in enumerate(frames):
+            original = frame.copy()
+            heatmap.add(frame)
+            np.testing.assert_array_equal(frame, original)
+
+            confs = frame[0, 5:].astype(np.float32).reshape(NUM_CLASSES, sy, sx)
+            for k, stride in enumerate(strides):
+                if stride > 0 and i % stride == 0:
+                    expected[k] += np.where(
+                        confs[k] >= YOGO_CONF_THRESHOLD, confs[k], 0
+                    )
+
+        # 4x4 bins, and the last row/column of bins is partly outside the grid
+        expected = np.pad(expected, ((0, 0), (0, 3), (0, 2)))
+        expected = expected.reshape(NUM_CLASSES, 3, 4, 3, 4).sum(axis=(2, 4))
+        snapshot = heatmap.snapshot()
+        self.assertEqual(snapshot.dtype, np.float32)
+        self.assertFalse(snapshot.flags.writeable)
+        np.testing.assert_allclose(snapshot, expected, rtol=1e-5)
+        self.assertEqual(
+            [heatmap.num_frames_for_class(k) for k in range(NUM_CLASSES)],
+            [4, 2, 0, 4, 4, 2, 4],
+        )
+
+        heatmap.reset()
+        self.assertEqual(snapshot.sum(), 0)
+
+
 if __name__ == "__main__":
     unittest.main()
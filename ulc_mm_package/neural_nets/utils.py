@@ -1,6 +1,15 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import NamedTuple, List, Tuple, no_type_check, Dict
+from typing import (
+    NamedTuple,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    no_type_check,
+    Dict,
+)
 from typing_extensions import TypeAlias
 import xml.etree.ElementTree as ET
 
@@ -8,7 +17,8 @@ import cv2
 import zarr
 import numpy as np
 import numpy.typing as npt
-from numba import njit
+from numba import njit, types
+from numba.extending import overload
 
 from ulc_mm_package.scope_constants import MAX_THUMBNAILS_SAVED_PER_CLASS
 from ulc_mm_package.neural_nets.neural_network_constants import (
@@ -19,6 +29,10 @@ from ulc_mm_package.neural_nets.neural_network_constants import (
     YOGO_CONF_THRESHOLD,
     YOGO_AREA_FILTER,
     YOGO_CROP_HEIGHT_PX,
+    IOU_THRESH,
+    NMS_GRID_CELL_PX,
+    NMS_METHOD,
+    NMSMethod,
 )
 from ulc_mm_package.neural_nets.YOGOInference import YOGO
 
@@ -26,12 +40,53 @@ NUM_CLASSES = len(YOGO_CLASS_LIST)
 DEFAULT_W, DEFAULT_H = IMG_RESIZED_DIMS
 DTYPE: TypeAlias = np.float32
 
+# Compact record of one parsed prediction, which is how they're stored and saved.
+# Predictions are parsed into (and the functions below also take) the
+# (8+NUM_CLASSES) x N DTYPE layout; see `to_pred_records` and `from_pred_records`.
+PRED_RECORD_DTYPE = np.dtype(
+    [
+        ("img_id", np.uint32),
+        # top left x, top left y, bottom right x, bottom right y
+        ("bbox", np.uint16, (4,)),
+        ("objectness", np.float16),
+        ("label", np.uint8),
+        # peak prediction confidence, which is thresholded for the counts, so it's
+        # kept exactly (as DTYPE) for counts from disk to match those made live
+        ("conf", np.float32),
+        ("confs", np.float16, (NUM_CLASSES,)),
+    ]
+)
+# Format of saved parsed_prediction_tensors files, recorded in the experiment
+# metadata (as "prediction_tensors_format"):
+#   (none) - an (8+NUM_CLASSES) x N DTYPE parsed tensor, as saved before records
+#   "records-v1" - PRED_RECORD_DTYPE records
+PRED_TENSORS_FORMAT = "records-v1"
+
 
 class Thumbnail(NamedTuple):
     img_crop: npt.NDArray  # n x m array (different for every thumbnail)
     confidence: float  # value between [0-1]
 
 
+class ParseScratch(NamedTuple):
+    """Working arrays for `parse_prediction_tensor_into`, for frames of up to
+    `len(cells)` grid cells. Keep one to reuse rather than have them allocated for
+    every frame (see `new_parse_scratch`).
+    """
+
+    cells: npt.NDArray  # indices of the cells passing the filters
+    bboxes: npt.NDArray  # their boxes, num cells x 4
+    confs: npt.NDArray  # and the confidences NMS orders them by
+
+
+def new_parse_scratch(num_cells: int) -> ParseScratch:
+    return ParseScratch(
+        np.empty(num_cells, dtype=np.int64),
+        np.empty((num_cells, 4), dtype=np.float32),
+        np.empty(num_cells, dtype=np.float32),
+    )
+
+
 class SinglePredictedObject(NamedTuple):
     parsed: npt.NDArray  # 8+NUM_CLASSES x 1
     conf: DTYPE
@@ -52,6 +107,105 @@ class SinglePredictedObject(NamedTuple):
         return f"img_id: {self.parsed[0]} - conf: {self.conf}\n"
 
 
+def is_pred_records(preds: npt.NDArray) -> bool:
+    """Whether `preds` are PRED_RECORD_DTYPE records, rather than a parsed tensor"""
+    return preds.dtype.names is not None
+
+
+def to_pred_records(
+    parsed_prediction_tensor: npt.NDArray, out: Optional[npt.NDArray] = None
+) -> npt.NDArray:
+    """Convert a (8+NUM_CLASSES) x N parsed tensor to N PRED_RECORD_DTYPE records
+    (records are given back as they are)
+
+    Parameters
+    ----------
+    parsed_prediction_tensor: npt.NDArray
+    out: Optional[npt.NDArray]
+        N records to write to, instead of allocating them
+
+    Returns
+    -------
+    npt.NDArray
+        N records
+    """
+
+    if is_pred_records(parsed_prediction_tensor):
+        return parsed_prediction_tensor
+
+    if out is None:
+        out = np.empty(parsed_prediction_tensor.shape[1], dtype=PRED_RECORD_DTYPE)
+    out["img_id"] = parsed_prediction_tensor[0]
+    out["bbox"] = parsed_prediction_tensor[1:5].T
+    out["objectness"] = parsed_prediction_tensor[5]
+    out["label"] = parsed_prediction_tensor[6]
+    out["conf"] = parsed_prediction_tensor[7]
+    out["confs"] = parsed_prediction_tensor[8:].T
+    return out
+
+
+def from_pred_records(preds: npt.NDArray) -> npt.NDArray:
+    """Convert PRED_RECORD_DTYPE records to a (8+NUM_CLASSES) x N parsed tensor
+    (parsed tensors are given back as they are)
+    """
+
+    if not is_pred_records(preds):
+        return preds
+
+    parsed = np.empty((8 + preds["confs"].shape[1], len(preds)), dtype=DTYPE)
+    parsed[0] = preds["img_id"]
+    parsed[1:5] = preds["bbox"].T
+    parsed[5] = preds["objectness"]
+    parsed[6] = preds["label"]
+    parsed[7] = preds["conf"]
+    parsed[8:] = preds["confs"].T
+    return parsed
+
+
+# Accessors for either layout of parsed predictions (records or a parsed tensor).
+# Confidences come back as DTYPE for both, so thresholds compare the same way.
+
+
+def get_num_preds(preds: npt.NDArray) -> int:
+    return len(preds) if is_pred_records(preds) else preds.shape[1]
+
+
+def get_pred_img_ids(preds: npt.NDArray) -> npt.NDArray:
+    return preds["img_id"] if is_pred_records(preds) else preds[0, :]
+
+
+def get_pred_bboxes(preds: npt.NDArray) -> npt.NDArray:
+    """4 x N: top left x, top left y, bottom right x, bottom right y"""
+    return preds["bbox"].T if is_pred_records(preds) else preds[1:5, :]
+
+
+def get_pred_objectness(preds: npt.NDArray) -> npt.NDArray:
+    return preds["objectness"].astype(DTYPE) if is_pred_records(preds) else preds[5, :]
+
+
+def get_pred_labels(preds: npt.NDArray) -> npt.NDArray:
+    return preds["label"] if is_pred_records(preds) else preds[6, :]
+
+
+def get_pred_confs(preds: npt.NDArray) -> npt.NDArray:
+    """Peak prediction confidences"""
+    return preds["conf"].astype(DTYPE) if is_pred_records(preds) else preds[7, :]
+
+
+def get_pred_class_confs(preds: npt.NDArray, class_id: int) -> npt.NDArray:
+    """Every prediction's confidence for `class_id`"""
+    return (
+        preds["confs"][:, class_id].astype(DTYPE)
+        if is_pred_records(preds)
+        else preds[8 + class_id, :]
+    )
+
+
+def select_preds(preds: npt.NDArray, idxs: npt.NDArray) -> npt.NDArray:
+    """The predictions picked by a mask or by indices, in the same layout"""
+    return preds[idxs] if is_pred_records(preds) else preds[:, idxs]
+
+
 def get_output_layer_dims_from_xml(xml_path: Path) -> Tuple[int, int]:
     """Get the output layer dimensions from the model's xml file.
 
@@ -77,7 +231,7 @@ def get_output_layer_dims_from_xml(xml_path: Path) -> Tuple[int, int]:
     return (sx, sy)
 
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def _parse_prediction_tensor(
     img_id: int,
     prediction_tensor: np.ndarray,
@@ -214,16 +368,575 @@ def parse_prediction_tensor(
     return np.vstack(_parse_prediction_tensor(img_id, prediction_tensor, img_h, img_w))
 
 
+def _load_pred(x):
+    """A prediction tensor value as a float, see the overload below"""
+
+
+@overload(_load_pred)
+def _load_pred_impl(x):
+    # float16 tensors are given as their uint16 bits, since numba can't do float16 math
+    if x == types.uint16:  # noqa: E721
+        return lambda x: _half_to_float(x)
+    return lambda x: float(x)
+
+
+@njit(cache=True, nogil=True)
+def _half_to_float(bits: int) -> float:
+    """The value of an IEEE 754 half-precision float, given its bits"""
+    exponent = (bits >> 10) & 0x1F
+    mantissa = bits & 0x3FF
+    if exponent == 0:
+        val = mantissa * 2.0**-24
+    elif exponent == 31:
+        val = np.inf if mantissa == 0 else np.nan
+    else:
+        val = (1.0 + mantissa / 1024.0) * 2.0 ** (exponent - 15)
+    return -val if bits & 0x8000 else val
+
+
+@njit(cache=True, nogil=True)
+def _passes_area_filter(frame: npt.NDArray, j: int, img_w: int) -> bool:
+    """Whether grid cell `j` of one frame's output passes the area filter
+
+    Callers check objectness (> 0.5) first and inline, since most cells are empty and
+    calls that pass an array aren't free. The box math is done in float32, like
+    `_parse_prediction_tensor` does it, so that rounding comes out the same.
+    """
+    half_width = np.float32(_load_pred(frame[2, j])) / np.float32(2) * np.float32(img_w)
+    half_height = (
+        np.float32(_load_pred(frame[3, j]))
+        / np.float32(2)
+        * np.float32(YOGO_CROP_HEIGHT_PX)
+    )
+    return 4 * (half_height * half_width) > YOGO_AREA_FILTER
+
+
+@njit(cache=True, nogil=True)
+def _cell_bbox(
+    frame: npt.NDArray, j: int, img_h: int, img_w: int
+) -> Tuple[float, float, float, float]:
+    """Top left x, top left y, bottom right x, bottom right y of grid cell `j`'s box"""
+    h, w = np.float32(img_h), np.float32(img_w)
+    xc = np.float32(_load_pred(frame[0, j])) * w
+    yc = np.float32(_load_pred(frame[1, j])) * h
+    half_width = np.float32(_load_pred(frame[2, j])) / np.float32(2) * w
+    half_height = np.float32(_load_pred(frame[3, j])) / np.float32(2) * h
+    return (
+        min(max(np.rint(xc - half_width), 0), img_w),
+        min(max(np.rint(yc - half_height), 0), img_h),
+        min(max(np.rint(xc + half_width), 0), img_w),
+        min(max(np.rint(yc + half_height), 0), img_h),
+    )
+
+
+@njit(cache=True, nogil=True)
+def _write_parsed_col(
+    out: npt.NDArray,
+    col: int,
+    img_id: float,
+    frame: npt.NDArray,
+    j: int,
+    bbox: Tuple[float, float, float, float],
+) -> None:
+    """Write grid cell `j` of one frame's output as column `col` of a parsed tensor"""
+    num_classes = frame.shape[0] - 5
+    label = 0
+    for k in range(num_classes):
+        out[8 + k, col] = _load_pred(frame[5 + k, j])
+        if out[8 + k, col] > out[8 + label, col]:
+            label = k
+
+    out[0, col] = img_id
+    out[1, col] = bbox[0]
+    out[2, col] = bbox[1]
+    out[3, col] = bbox[2]
+    out[4, col] = bbox[3]
+    out[5, col] = _load_pred(frame[4, j])
+    out[6, col] = label
+    out[7, col] = out[8 + label, col]
+
+
+@njit(cache=True, nogil=True)
+def _parse_prediction_tensors(
+    img_ids: npt.NDArray,
+    prediction_tensors: npt.NDArray,
+    img_h: int,
+    img_w: int,
+) -> npt.NDArray:
+    """Batched `_parse_prediction_tensor`, filling one preallocated output.
+
+    The first pass finds which grid cells pass the objectness and area filters
+    (counting them, so the output can be allocated once), the second writes each of
+    those cells' column. Columns are in the same order as parsing each frame in turn
+    and hstack-ing the results.
+
+    Only the cells that are kept are read in full, so float16 outputs are read as is
+    (as uint16 bits) instead of first converting the whole tensor to float32.
+
+    Parameters
+    ----------
+    img_ids: npt.NDArray
+        B img ids, one per frame
+    prediction_tensors: npt.NDArray (float32, or float16 viewed as uint16)
+        B x (5+NUM_CLASSES) x (Sx*Sy), i.e. B YOGO outputs stacked
+    img_h: int
+    img_w: int
+
+    Returns
+    -------
+    npt.NDArray
+        (8+NUM_CLASSES) x N, see `parse_prediction_tensor`
+    """
+    num_frames, pred_dim, num_cells = prediction_tensors.shape
+
+    keep = np.zeros((num_frames, num_cells), dtype=np.bool_)
+    num_preds = 0
+    for b in range(num_frames):
+        for j in range(num_cells):
+            if _load_pred(prediction_tensors[b, 4, j]) <= 0.5:
+                continue
+            if _passes_area_filter(prediction_tensors[b], j, img_w):
+                keep[b, j] = True
+                num_preds += 1
+
+    parsed = np.empty((pred_dim + 3, num_preds), dtype=np.float32)
+    col = 0
+    for b in range(num_frames):
+        frame = prediction_tensors[b]
+        for j in range(num_cells):
+            if keep[b, j]:
+                bbox = _cell_bbox(frame, j, img_h, img_w)
+                _write_parsed_col(parsed, col, img_ids[b], frame, j, bbox)
+                col += 1
+
+    return parsed
+
+
+def _as_kernel_input(prediction_tensors: npt.NDArray) -> npt.NDArray:
+    """Prediction tensors as the kernels above take them: float16 viewed as its bits
+    (uint16), anything else as float32
+    """
+    prediction_tensors = np.ascontiguousarray(prediction_tensors)
+    if prediction_tensors.dtype == np.float16:
+        return prediction_tensors.view(np.uint16)
+    return prediction_tensors.astype(np.float32, copy=False)
+
+
+@njit(cache=True, nogil=True)
+def _accumulate_heatmap(
+    heatmap: npt.NDArray,
+    frame: npt.NDArray,
+    frame_idx: int,
+    class_strides: npt.NDArray,
+    sx: int,
+    bin_size: int,
+    conf_thresh: float,
+    conf_thresh_bits: int,
+) -> None:
+    """Add one frame's class confidences of at least `conf_thresh` to a
+    (num classes, ceil(Sy / bin_size), ceil(Sx / bin_size)) float32 heatmap
+
+    `conf_thresh_bits` are those of the smallest float16 that's at least
+    `conf_thresh`, so float16 confidences are compared without decoding them.
+    """
+    sy = frame.shape[1] // sx
+    for k in range(len(class_strides)):
+        if class_strides[k] == 0 or frame_idx % class_strides[k] != 0:
+            continue
+        for y in range(sy):
+            row = y // bin_size
+            for x in range(sx):
+                raw = frame[5 + k, y * sx + x]
+                if _is_at_least(raw, conf_thresh, conf_thresh_bits):
+                    heatmap[k, row, x // bin_size] += np.float32(_load_pred(raw))
+
+
+def _is_at_least(x, thresh, thresh_bits):
+    """Whether a prediction tensor value is at least `thresh`, see the overload below"""
+
+
+@overload(_is_at_least)
+def _is_at_least_impl(x, thresh, thresh_bits):
+    # non-negative float16s are ordered like their bits
+    if x == types.uint16:  # noqa: E721
+        return lambda x, thresh, thresh_bits: x < 0x8000 and x >= thresh_bits
+    return lambda x, thresh, thresh_bits: np.float32(x) >= np.float32(thresh)
+
+
+def add_to_heatmap(
+    heatmap: npt.NDArray,
+    prediction_tensor: npt.NDArray,
+    sx: int,
+    bin_size: int = 1,
+    frame_idx: int = 0,
+    class_strides: Optional[Sequence[int]] = None,
+    conf_thresh: float = YOGO_CONF_THRESHOLD,
+) -> None:
+    """Add a raw YOGO prediction's class confidences to `heatmap`, in place, without
+    changing the prediction
+
+    Parameters
+    ----------
+    heatmap: npt.NDArray
+        NUM_CLASSES x ceil(Sy / bin_size) x ceil(Sx / bin_size) float32 array
+    prediction_tensor: (1 * (5+NUM_CLASSES) * (Sx*Sy))
+    sx: int
+        Width of YOGO's output grid
+    bin_size: int
+        Grid cell (y, x) is added to bin (y // bin_size, x // bin_size)
+    frame_idx: int
+        The frame's index in the run, for `class_strides`
+    class_strides: Optional[Sequence[int]]
+        Class k is only added if frame_idx is a multiple of class_strides[k]
+        (0 - never). Defaults to every class, every frame
+    conf_thresh: float
+        Confidences below this aren't added
+    """
+
+    frame = _as_kernel_input(prediction_tensor)
+    frame = frame.reshape(frame.shape[-2], frame.shape[-1])
+    num_classes = frame.shape[0] - 5
+    if class_strides is None:
+        class_strides = [1] * num_classes
+    sy = frame.shape[1] // sx
+    shape = (num_classes, -(-sy // bin_size), -(-sx // bin_size))
+    if heatmap.dtype != np.float32 or heatmap.shape != shape:
+        raise ValueError(
+            f"heatmap must be a float32 array of shape {shape}, "
+            f"got {heatmap.dtype} {heatmap.shape}"
+        )
+
+    thresh_half = np.float16(conf_thresh)
+    if np.float32(thresh_half) < np.float32(conf_thresh):
+        thresh_half = np.nextafter(thresh_half, np.float16(np.inf))
+    _accumulate_heatmap(
+        heatmap,
+        frame,
+        int(frame_idx),
+        np.asarray(class_strides, dtype=np.int64),
+        int(sx),
+        int(bin_size),
+        float(conf_thresh),
+        int(thresh_half.view(np.uint16)),
+    )
+
+
+def parse_prediction_tensors(
+    img_ids: Sequence[int],
+    prediction_tensors: Union[npt.NDArray, Sequence[npt.NDArray]],
+    img_h: int = DEFAULT_H,
+    img_w: int = DEFAULT_W,
+) -> npt.NDArray:
+    """Parse several frames' prediction tensors at once, e.g. a burst of results from
+    `YOGO.get_asyn_results`.
+
+    Gives the same as hstack-ing `parse_prediction_tensor` of each frame, in one
+    compiled call, without any per-frame intermediate arrays.
+
+    Parameters
+    ----------
+    img_ids: Sequence[int]
+        Img id of each frame
+    prediction_tensors: np.ndarray or a sequence of them
+        The direct output tensors from YOGO (each 1 * (5+NUM_CLASSES) * (Sx*Sy)),
+        or an array of them stacked
+    img_h: int
+    img_w: int
+
+    Returns
+    -------
+    np.ndarray (dtype=DTYPE)
+        A (8+NUM_CLASSES) x N array, laid out as in `parse_prediction_tensor`
+    """
+
+    img_ids = np.asarray(img_ids, dtype=np.float32)
+    if len(img_ids) == 0:
+        return np.zeros((8 + NUM_CLASSES, 0), dtype=DTYPE)
+
+    stacked = _as_kernel_input(prediction_tensors)
+    stacked = stacked.reshape(len(img_ids), stacked.shape[-2], stacked.shape[-1])
+    return _parse_prediction_tensors(img_ids, stacked, img_h, img_w)
+
+
+@njit(cache=True, nogil=True)
+def _iou(
+    ax1: float,
+    ay1: float,
+    ax2: float,
+    ay2: float,
+    bx1: float,
+    by1: float,
+    bx2: float,
+    by2: float,
+) -> float:
+    """Intersection-over-union of two boxes, with the +1 pixel convention of `nms`"""
+    w = max(0.0, min(ax2, bx2) - max(ax1, bx1) + 1)
+    h = max(0.0, min(ay2, by2) - max(ay1, by1) + 1)
+    inter = w * h
+    area_a = (ax2 - ax1 + 1) * (ay2 - ay1 + 1)
+    area_b = (bx2 - bx1 + 1) * (by2 - by1 + 1)
+    return inter / (area_a + area_b - inter)
+
+
+@njit(cache=True, nogil=True)
+def _greedy_nms(bboxes: npt.NDArray, confs: npt.NDArray, thresh: float) -> npt.NDArray:
+    """`nms` on N x 4 boxes (tlx, tly, brx, bry) and their N confidences
+
+    Returns the indices of the kept boxes, in the order `nms` gives them.
+    """
+    order = confs.argsort()[::-1]
+    suppressed = np.zeros(len(order), dtype=np.bool_)
+    num_kept = 0
+    for a in range(len(order)):
+        i = order[a]
+        if suppressed[i]:
+            continue
+        # the kept boxes overwrite the start of `order`, which has been read
+        order[num_kept] = i
+        num_kept += 1
+
+        for b in range(a + 1, len(order)):
+            o = order[b]
+            if not suppressed[o] and (
+                _iou(
+                    bboxes[i, 0],
+                    bboxes[i, 1],
+                    bboxes[i, 2],
+                    bboxes[i, 3],
+                    bboxes[o, 0],
+                    bboxes[o, 1],
+                    bboxes[o, 2],
+                    bboxes[o, 3],
+                )
+                > thresh
+            ):
+                suppressed[o] = True
+
+    return order[:num_kept]
+
+
+@njit(cache=True, nogil=True)
+def _grid_nms(
+    bboxes: npt.NDArray, confs: npt.NDArray, thresh: float, cell_px: float
+) -> npt.NDArray:
+    """`_greedy_nms`, but only comparing boxes in neighbouring cells of a uniform grid
+
+    Greedy NMS keeps a box iff no box kept before it overlaps it by more than
+    `thresh`, so each box is only checked against the kept boxes in the 3x3 cells
+    around its centre. Cells are at least as wide as the widest (and tallest) box, so
+    two overlapping boxes' centres can't be more than one cell apart, and the same
+    boxes are kept as with `_greedy_nms` (for any thresh >= 0).
+    """
+    order = confs.argsort()[::-1]
+    n = len(order)
+    if n == 0:
+        return order
+
+    size = cell_px
+    min_cx, min_cy = np.inf, np.inf
+    max_cx, max_cy = -np.inf, -np.inf
+    for i in range(n):
+        size = max(
+            size, bboxes[i, 2] - bboxes[i, 0] + 1, bboxes[i, 3] - bboxes[i, 1] + 1
+        )
+        cx = (bboxes[i, 0] + bboxes[i, 2]) / 2
+        cy = (bboxes[i, 1] + bboxes[i, 3]) / 2
+        min_cx, max_cx = min(min_cx, cx), max(max_cx, cx)
+        min_cy, max_cy = min(min_cy, cy), max(max_cy, cy)
+    grid_w = int((max_cx - min_cx) // size) + 1
+    grid_h = int((max_cy - min_cy) // size) + 1
+
+    # each cell's kept boxes, as linked lists through `next_kept`
+    first_kept = np.full(grid_w * grid_h, -1, dtype=np.int64)
+    next_kept = np.empty(n, dtype=np.int64)
+    num_kept = 0
+    for a in range(n):
+        i = order[a]
+        gx = int(((bboxes[i, 0] + bboxes[i, 2]) / 2 - min_cx) // size)
+        gy = int(((bboxes[i, 1] + bboxes[i, 3]) / 2 - min_cy) // size)
+
+        suppressed = False
+        for ny in range(max(gy - 1, 0), min(gy + 2, grid_h)):
+            for nx in range(max(gx - 1, 0), min(gx + 2, grid_w)):
+                k = first_kept[ny * grid_w + nx]
+                while k >= 0 and not suppressed:
+                    suppressed = (
+                        _iou(
+                            bboxes[k, 0],
+                            bboxes[k, 1],
+                            bboxes[k, 2],
+                            bboxes[k, 3],
+                            bboxes[i, 0],
+                            bboxes[i, 1],
+                            bboxes[i, 2],
+                            bboxes[i, 3],
+                        )
+                        > thresh
+                    )
+                    k = next_kept[k]
+        if suppressed:
+            continue
+
+        next_kept[i] = first_kept[gy * grid_w + gx]
+        first_kept[gy * grid_w + gx] = i
+        # as in `_greedy_nms`, `order`'s start (already read) holds the kept boxes
+        order[num_kept] = i
+        num_kept += 1
+
+    return order[:num_kept]
+
+
+@njit(cache=True, nogil=True)
+def _parse_nms_into(
+    store: npt.NDArray,
+    start: int,
+    img_id: float,
+    frame: npt.NDArray,
+    img_h: int,
+    img_w: int,
+    iou_thresh: float,
+    scale_h: float,
+    scale_w: float,
+    nms_grid_cell_px: float,
+    cells: npt.NDArray,
+    bboxes: npt.NDArray,
+    confs: npt.NDArray,
+) -> int:
+    """`parse_prediction_tensor`, `nms` and `scale_bbox_vals` in one pass over the
+    frame, writing the kept predictions to `store[:, start:]`. `cells`, `bboxes` and
+    `confs` are a `ParseScratch` with room for all of the frame's cells.
+
+    NMS is `_grid_nms` with cells at least `nms_grid_cell_px` wide, or `_greedy_nms`
+    if that is <= 0. Either way the same predictions are kept.
+
+    Only the boxes and NMS confidences of the cells passing the filters are gathered
+    (a few dozen per frame); whole predictions are read from the frame straight into
+    their column of the store. Kept predictions are in the same order as `nms` gives.
+
+    Returns the number of predictions written, or -1 (writing nothing) if they don't
+    fit in the store.
+    """
+    num_cells = frame.shape[1]
+    num_cands = 0
+    for j in range(num_cells):
+        if _load_pred(frame[4, j]) > 0.5 and _passes_area_filter(frame, j, img_w):
+            cells[num_cands] = j
+            num_cands += 1
+
+    bboxes = bboxes[:num_cands]
+    confs = confs[:num_cands]
+    for c in range(num_cands):
+        bboxes[c] = _cell_bbox(frame, cells[c], img_h, img_w)
+        # like `nms`, suppression is ordered by the first class' confidence
+        confs[c] = _load_pred(frame[5, cells[c]])
+
+    # Boxes are integer valued, so IoUs compare the same here in float64 as they do
+    # in `nms`
+    if nms_grid_cell_px > 0:
+        kept = _grid_nms(bboxes, confs, iou_thresh, nms_grid_cell_px)
+    else:
+        kept = _greedy_nms(bboxes, confs, iou_thresh)
+
+    if start + len(kept) > store.shape[1]:
+        return -1
+
+    for c in range(len(kept)):
+        i = kept[c]
+        bbox = (
+            np.rint(bboxes[i, 0] * scale_w),
+            np.rint(bboxes[i, 1] * scale_h),
+            np.rint(bboxes[i, 2] * scale_w),
+            np.rint(bboxes[i, 3] * scale_h),
+        )
+        _write_parsed_col(store, start + c, img_id, frame, cells[i], bbox)
+
+    return len(kept)
+
+
+def parse_prediction_tensor_into(
+    store: npt.NDArray,
+    start: int,
+    img_id: int,
+    prediction_tensor: npt.NDArray,
+    img_h: int = DEFAULT_H,
+    img_w: int = DEFAULT_W,
+    iou_thresh: float = IOU_THRESH,
+    scale_h: float = 1,
+    scale_w: float = 1,
+    nms_method: NMSMethod = NMS_METHOD,
+    scratch: Optional[ParseScratch] = None,
+) -> int:
+    """Parse, non-maximum suppress and scale one frame's prediction tensor, writing the
+    result straight into `store` from column `start` on.
+
+    Gives the same columns as
+        parsed = parse_prediction_tensor(img_id, prediction_tensor, img_h, img_w)
+        parsed = parsed[:, nms(parsed, iou_thresh)]
+        scale_bbox_vals(parsed, scale_h, scale_w)
+    without any of the intermediate arrays.
+
+    Parameters
+    ----------
+    store: npt.NDArray
+        (8+NUM_CLASSES) x M float32 array to write into
+    start: int
+        First column of `store` to write to
+    img_id: int
+    prediction_tensor: np.ndarray
+        The direct output tensor from a call to the YOGO model (1 * (5+NUM_CLASSES) * (Sx*Sy))
+    img_h: int
+    img_w: int
+    iou_thresh: float
+        Intersection-over-union threshold for removal
+    scale_h: float
+    scale_w: float
+    nms_method: NMSMethod
+        Which NMS to do (they keep the same predictions)
+    scratch: Optional[ParseScratch]
+        Working arrays to use, if they're big enough; otherwise they're allocated
+
+    Returns
+    -------
+    int
+        The number of predictions written, i.e. `store[:, start:start + n]` holds them
+    """
+
+    frame = _as_kernel_input(prediction_tensor)
+    frame = frame.reshape(frame.shape[-2], frame.shape[-1])
+    if scratch is None or len(scratch.cells) < frame.shape[1]:
+        scratch = new_parse_scratch(frame.shape[1])
+    # (the scalars are cast so that there is only one compiled signature)
+    num_preds = _parse_nms_into(
+        store,
+        int(start),
+        float(img_id),
+        frame,
+        int(img_h),
+        int(img_w),
+        float(iou_thresh),
+        float(scale_h),
+        float(scale_w),
+        float(NMS_GRID_CELL_PX if nms_method == NMSMethod.GRID else 0),
+        *scratch,
+    )
+    if num_preds < 0:
+        raise ValueError(
+            f"predictions for img {img_id} don't fit in the {store.shape[1]} column "
+            f"store from column {start}"
+        )
+    return num_preds
+
+
 def _write_thumbnail_from_pred_tensor(
     zarr_store: zarr.core.Array,
     preds: np.ndarray,
     idx: int,
     save_dir: Path,
 ):
-    img_id = int(preds[0, idx])
-    class_id = int(preds[6, idx])
-    img_crop = _get_img_crop(zarr_store, preds[:, idx])
-    conf = f"{preds[7, idx]:.5f}"
+    img_id = int(get_pred_img_ids(preds)[idx])
+    class_id = int(get_pred_labels(preds)[idx])
+    img_crop = _get_img_crop(zarr_store, preds, idx)
+    conf = f"{get_pred_confs(preds)[idx]:.5f}"
     filename = f"{idx:04}_class_{class_id:02}_frame_{img_id:05}_conf_{conf}.png"
     save_loc = str(save_dir / filename)
 
@@ -238,13 +951,13 @@ def get_specific_class_from_parsed_tensor(
     Parameters
     ----------
     parsed_prediction_tensor: npt.NDArray
-        (8+NUM_CLASSES) x N array
+        (8+NUM_CLASSES) x N array (or N records)
     class_id: int
 
     Returns
     -------
     np.ndarray
-        Shape: 8+NUM_CLASSES x N (N matches).
+        Shape: 8+NUM_CLASSES x N (N matches), or N records.
         Each column (i.e arr[:, i] is one predicted object).
 
         The 8 is the same dimension as the original prediction tensor, i.e:
@@ -260,15 +973,15 @@ def get_specific_class_from_parsed_tensor(
 
     """
 
-    mask = parsed_prediction_tensor[6, :] == class_id
-    return parsed_prediction_tensor[:, mask]
+    mask = get_pred_labels(parsed_prediction_tensor) == class_id
+    return select_preds(parsed_prediction_tensor, mask)
 
 
 def _get_img_crop(
-    zarr_store: zarr.core.Array, prediction_col: npt.NDArray
+    zarr_store: zarr.core.Array, preds: npt.NDArray, idx: int
 ) -> npt.NDArray:
-    img_id = prediction_col[0].astype(np.uint32)
-    tlx, tly, brx, bry = prediction_col[1:5].astype(np.uint32)
+    img_id = get_pred_img_ids(preds)[idx].astype(np.uint32)
+    tlx, tly, brx, bry = get_pred_bboxes(preds)[:, idx].astype(np.uint32)
 
     return YOGO.crop_img(zarr_store[:, :, img_id])[tly:bry, tlx:brx]
 
@@ -295,7 +1008,7 @@ def _save_thumbnails_to_disk(
     text: str
     """
 
-    for i in range(preds.shape[1]):
+    for i in range(get_num_preds(preds)):
         _write_thumbnail_from_pred_tensor(zarr_store, preds, i, save_dir)
 
 
@@ -343,11 +1056,13 @@ def save_thumbnails_to_disk(
 
     for class_tensor, path in parasite_tensors_and_save_paths:
         # Sort by descending confidence
-        sort_by_confs = class_tensor[7, :].argsort()
-        descending_confs = class_tensor[:, sort_by_confs][:, ::-1]
+        sort_by_confs = get_pred_confs(class_tensor).argsort()
+        descending_confs = select_preds(class_tensor, sort_by_confs[::-1])
 
         # Limit the number of thumbnails saved for each class
-        descending_confs_trunc = descending_confs[:, :MAX_THUMBNAILS_SAVED_PER_CLASS]
+        descending_confs_trunc = select_preds(
+            descending_confs, slice(MAX_THUMBNAILS_SAVED_PER_CLASS)
+        )
         _save_thumbnails_to_disk(zarr_store, descending_confs_trunc, path)
 
     return class_name_to_path
@@ -401,8 +1116,8 @@ def get_col_ids_for_matching_class_and_above_conf_thresh(
     """
 
     mask = np.logical_and(
-        parsed_prediction_tensor[6, :] == class_id,
-        parsed_prediction_tensor[7, :] >= confidence_threshold,
+        get_pred_labels(parsed_prediction_tensor) == class_id,
+        get_pred_confs(parsed_prediction_tensor) >= confidence_threshold,
     )
     return np.nonzero(mask)
 
@@ -431,8 +1146,8 @@ def get_col_ids_for_matching_class_and_below_conf_thresh(
     """
 
     mask = np.logical_and(
-        parsed_prediction_tensor[6, :] == class_id,
-        parsed_prediction_tensor[7, :] <= confidence_threshold,
+        get_pred_labels(parsed_prediction_tensor) == class_id,
+        get_pred_confs(parsed_prediction_tensor) <= confidence_threshold,
     )
     return np.nonzero(mask)
 
@@ -455,8 +1170,8 @@ def get_vals_greater_than_conf_thresh(
         8+NUM_CLASSES x M (M <= N)
     """
 
-    mask = parsed_prediction_tensor[7, :] > confidence_threshold
-    return parsed_prediction_tensor[:, mask]
+    mask = get_pred_confs(parsed_prediction_tensor) > confidence_threshold
+    return select_preds(parsed_prediction_tensor, mask)
 
 
 def get_vals_less_than_conf_thresh(
@@ -477,8 +1192,8 @@ def get_vals_less_than_conf_thresh(
         8+NUM_CLASSES x M (M <= N)
     """
 
-    mask = parsed_prediction_tensor[7, :] < confidence_threshold
-    return parsed_prediction_tensor[:, mask]
+    mask = get_pred_confs(parsed_prediction_tensor) < confidence_threshold
+    return select_preds(parsed_prediction_tensor, mask)
 
 
 def get_individual_prediction_objs_from_parsed_tensor(
@@ -541,7 +1256,9 @@ def get_all_argmax_confs_for_specific_class(
         1 x N where N is however many instances of that class were predicted
     """
 
-    return prediction_tensor[7, prediction_tensor[6, :] == class_id]
+    return get_pred_confs(prediction_tensor)[
+        get_pred_labels(prediction_tensor) == class_id
+    ]
 
 
 def get_all_argmax_class_confidences_for_all_classes(
@@ -586,7 +1303,7 @@ def get_all_confs_for_specific_class(
     np.ndarray (1 x N)
     """
 
-    return prediction_tensor[8 + class_id, :]
+    return get_pred_class_confs(prediction_tensor, class_id)
 
 
 def get_all_confs_for_all_classes(
@@ -638,13 +1355,24 @@ def get_class_counts(
         The index in the list corresponds to the class id (i.e output[0] would have the counts for all the healthy cells)
     """
 
-    conf_filtered = prediction_tensor[:, prediction_tensor[7, :] > conf_thresh]
-    ids, counts = np.unique(conf_filtered[6, :], return_counts=True)
-    id_and_counts = dict(zip(ids, counts))
-    return [id_and_counts.get(i, 0) for i in range(num_classes)]
+    return get_class_count_array(prediction_tensor, num_classes, conf_thresh).tolist()
 
 
-@njit(cache=True)
+def get_class_count_array(
+    prediction_tensor: npt.NDArray,
+    num_classes: int = NUM_CLASSES,
+    conf_thresh: float = YOGO_CONF_THRESHOLD,
+) -> npt.NDArray:
+    """`get_class_counts`, as a (num_classes,) int64 array"""
+
+    labels = get_pred_labels(prediction_tensor)
+    labels = labels[get_pred_confs(prediction_tensor) > conf_thresh]
+    # (np.bincount wants integers; the float layout's labels are integer valued)
+    counts = np.bincount(labels.astype(np.intp, copy=False), minlength=num_classes)
+    return counts[:num_classes]
+
+
+@njit(cache=True, nogil=True)
 def nms(parsed_prediction_tensor: npt.NDArray, thresh: float) -> List[int]:
     """
     Fast R-CNN
@@ -695,3 +1423,31 @@ def nms(parsed_prediction_tensor: npt.NDArray, thresh: float) -> List[int]:
         order = order[inds + 1]
 
     return keep
+
+
+def nms_grid(
+    parsed_prediction_tensor: npt.NDArray,
+    thresh: float,
+    cell_px: float = NMS_GRID_CELL_PX,
+) -> npt.NDArray:
+    """Same keeps as `nms`, but boxes are bucketed into a uniform grid and each is
+    only compared with the kept boxes in the neighbouring cells. This scales with the
+    number of boxes rather than its square, for dense smears.
+
+    Parameters
+    ----------
+    parsed_prediction_tensor: npt.NDArray (8+NUM_CLASSES) x N
+        Prediction tensor for a single image
+    thresh: float
+        Intersection-over-union threshold for removal (>= 0)
+    cell_px: float
+        Smallest grid cell width, cells are widened to the largest box if need be
+
+    Returns
+    -------
+    npt.NDArray
+        Indices of which predictions to keep, in the same order as `nms`
+    """
+    bboxes = np.ascontiguousarray(parsed_prediction_tensor[1:5].T)
+    confs = np.ascontiguousarray(parsed_prediction_tensor[8])
+    return _grid_nms(bboxes, confs, float(thresh), float(cell_px))
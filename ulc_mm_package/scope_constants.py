@@ -162,6 +162,7 @@ EXPERIMENT_METADATA_KEYS = [
     "git_commit",
     "autofocus_model",
     "yogo_model",
+    "prediction_tensors_format",
     "ambient_pressure",
 ]
 
@@ -197,6 +198,9 @@ PER_IMAGE_TIMING_KEYS = [
     "img_metadata",
     "datastorage.writeData",
     "yogo_qsize",
+    "yogo_dropped",
+    "zarrwriter_dropped",
+    "yogo_latency",
     "ssaf_qsize",
 ]
 
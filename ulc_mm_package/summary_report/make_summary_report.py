@@ -13,6 +13,8 @@ import numpy as np
 import numpy.typing as npt
 import argparse
 
+import ulc_mm_package.neural_nets.utils as nn_utils
+
 from ulc_mm_package.scope_constants import CSS_FILE_NAME, DEBUG_REPORT, RBCS_PER_UL
 from ulc_mm_package.neural_nets.neural_network_constants import (
     YOGO_PRED_THRESHOLD,
@@ -126,12 +128,13 @@ def make_cell_count_plot(preds: npt.NDArray, save_loc: str) -> None:
     Parameters
     ----------
     preds: npt.NDArray
-        Parsed predictions, (5 + N classes x NUM_PREDS)
+        Parsed predictions, (5 + N classes x NUM_PREDS) or records
     save_loc: str
         Where to save the plot
     """
-    vals = np.cumsum(np.unique(preds[0, :], return_counts=True)[1])
-    num_frames = len(np.unique(preds[0, :]))
+    img_ids = nn_utils.get_pred_img_ids(preds)
+    vals = np.cumsum(np.unique(img_ids, return_counts=True)[1])
+    num_frames = len(np.unique(img_ids))
     x_vals = np.linspace(0, num_frames, num_frames)
     m, b = np.polyfit(x_vals, vals, deg=1)
 
@@ -162,6 +165,9 @@ def make_yogo_conf_plots(preds: npt.NDArray, save_loc: str) -> None:
     save_loc: Path
     """
 
+    labels = nn_utils.get_pred_labels(preds)
+    confs = nn_utils.get_pred_confs(preds).astype(np.float32)
+
     fig, _ = plt.subplots(1, 3, figsize=(12, 12))
     gs = gridspec.GridSpec(4, 4, fig)
     ax1 = plt.subplot(gs[0, 0:2])
@@ -182,49 +188,35 @@ def make_yogo_conf_plots(preds: npt.NDArray, save_loc: str) -> None:
 
     ax1.set_title("Healthy confidences")
     ax1.set_ylabel("Counts (log scale)")
-    if len(preds[7, preds[6, :] == 0] > 0):
+    if len(confs[labels == 0] > 0):
         ax1.set_yscale("log")
-    ax1.hist(
-        preds[7, preds[6, :] == 0], bins=num_bins, color=COLORS[0], edgecolor="black"
-    )
+    ax1.hist(confs[labels == 0], bins=num_bins, color=COLORS[0], edgecolor="black")
 
     ax2.set_title("Ring confidences")
     ax2.set_ylabel("Count")
-    ax2.hist(
-        preds[7, preds[6, :] == 1], bins=num_bins, color=COLORS[1], edgecolor="black"
-    )
+    ax2.hist(confs[labels == 1], bins=num_bins, color=COLORS[1], edgecolor="black")
 
     ax3.set_title("Troph confidences")
     ax3.set_ylabel("Count")
-    ax3.hist(
-        preds[7, preds[6, :] == 2], bins=num_bins, color=COLORS[2], edgecolor="black"
-    )
+    ax3.hist(confs[labels == 2], bins=num_bins, color=COLORS[2], edgecolor="black")
 
     ax4.set_title("Schizont confidences")
     ax4.set_ylabel("Count")
-    ax4.hist(
-        preds[7, preds[6, :] == 3], bins=num_bins, color=COLORS[3], edgecolor="black"
-    )
+    ax4.hist(confs[labels == 3], bins=num_bins, color=COLORS[3], edgecolor="black")
 
     ax5.set_title("Gametocyte confidences")
     ax5.set_ylabel("Count")
-    ax5.hist(
-        preds[7, preds[6, :] == 4], bins=num_bins, color=COLORS[4], edgecolor="black"
-    )
+    ax5.hist(confs[labels == 4], bins=num_bins, color=COLORS[4], edgecolor="black")
 
     ax6.set_title("WBC confidences")
     ax6.set_ylabel("Count (log scale)")
-    if len(preds[7, preds[6, :] == 5]) > 0:
+    if len(confs[labels == 5]) > 0:
         ax6.set_yscale("log")
-    ax6.hist(
-        preds[7, preds[6, :] == 5], bins=num_bins, color=COLORS[5], edgecolor="black"
-    )
+    ax6.hist(confs[labels == 5], bins=num_bins, color=COLORS[5], edgecolor="black")
 
     ax7.set_title("Misc confidences")
     ax7.set_ylabel("Count")
-    ax7.hist(
-        preds[7, preds[6, :] == 6], bins=num_bins, color=COLORS[6], edgecolor="black"
-    )
+    ax7.hist(confs[labels == 6], bins=num_bins, color=COLORS[6], edgecolor="black")
 
     plt.tight_layout()
     plt.subplots_adjust(top=0.9)
@@ -242,6 +234,9 @@ def make_yogo_objectness_plots(preds: npt.NDArray, save_loc: str) -> None:
     save_loc: Path
     """
 
+    labels = nn_utils.get_pred_labels(preds)
+    objectness = nn_utils.get_pred_objectness(preds).astype(np.float32)
+
     fig, _ = plt.subplots(1, 3, figsize=(12, 12))
     gs = gridspec.GridSpec(4, 4, fig)
     ax1 = plt.subplot(gs[0, 0:2])
@@ -262,39 +257,25 @@ def make_yogo_objectness_plots(preds: npt.NDArray, save_loc: str) -> None:
     [ax.set_ylabel("Count") for ax in axes]
 
     ax1.set_title("Healthy objectness values")
-    ax1.hist(
-        preds[5, preds[6, :] == 0], bins=num_bins, color=COLORS[0], edgecolor="black"
-    )
+    ax1.hist(objectness[labels == 0], bins=num_bins, color=COLORS[0], edgecolor="black")
 
     ax2.set_title("Ring objectness values")
-    ax2.hist(
-        preds[5, preds[6, :] == 1], bins=num_bins, color=COLORS[1], edgecolor="black"
-    )
+    ax2.hist(objectness[labels == 1], bins=num_bins, color=COLORS[1], edgecolor="black")
 
     ax3.set_title("Troph objectness values")
-    ax3.hist(
-        preds[5, preds[6, :] == 2], bins=num_bins, color=COLORS[2], edgecolor="black"
-    )
+    ax3.hist(objectness[labels == 2], bins=num_bins, color=COLORS[2], edgecolor="black")
 
     ax4.set_title("Schizont objectness values")
-    ax4.hist(
-        preds[5, preds[6, :] == 3], bins=num_bins, color=COLORS[3], edgecolor="black"
-    )
+    ax4.hist(objectness[labels == 3], bins=num_bins, color=COLORS[3], edgecolor="black")
 
     ax5.set_title("Gametocyte objectness values")
-    ax5.hist(
-        preds[5, preds[6, :] == 4], bins=num_bins, color=COLORS[4], edgecolor="black"
-    )
+    ax5.hist(objectness[labels == 4], bins=num_bins, color=COLORS[4], edgecolor="black")
 
     ax6.set_title("WBC objectness values")
-    ax6.hist(
-        preds[5, preds[6, :] == 5], bins=num_bins, color=COLORS[5], edgecolor="black"
-    )
+    ax6.hist(objectness[labels == 5], bins=num_bins, color=COLORS[5], edgecolor="black")
 
     ax7.set_title("Misc objectness values")
-    ax7.hist(
-        preds[5, preds[6, :] == 6], bins=num_bins, color=COLORS[6], edgecolor="black"
-    )
+    ax7.hist(objectness[labels == 6], bins=num_bins, color=COLORS[6], edgecolor="black")
 
     plt.tight_layout()
     plt.subplots_adjust(top=0.9)
@@ -0,0 +1,110 @@
+import sys
+import threading
+
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+
+def aligned_empty(
+    shape: Tuple[int, ...], dtype: npt.DTypeLike = np.uint8, alignment: int = 64
+) -> npt.NDArray:
+    """np.empty, but the returned (C-contiguous) array's data starts on an `alignment`-byte boundary"""
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    raw = np.empty(nbytes + alignment, dtype=np.uint8)
+    offset = (-raw.ctypes.data) % alignment
+    return raw[offset : offset + nbytes].view(dtype).reshape(shape)
+
+
+class BufferPool:
+    """A fixed set of preallocated, contiguous, aligned arrays that are lent out and returned
+
+    Buffers are handed out by index (so the caller can keep anything else it
+    associates with a buffer, e.g. an openvino Tensor wrapping it, in a list of its own),
+    in the order they were released - i.e. they are cycled through like a ring.
+
+    Leases are reference counted: `acquire` gives out a buffer with one lease on it,
+    anything else that needs the buffer to stay as it is can `retain` it, and it goes
+    back to the pool once every lease has been `release`d.
+    """
+
+    def __init__(
+        self,
+        shape: Tuple[int, ...],
+        dtype: npt.DTypeLike,
+        size: int,
+        alignment: int = 64,
+    ):
+        if size < 1:
+            raise ValueError(f"size must be at least 1, got {size}")
+
+        self.buffers: List[npt.NDArray] = [
+            aligned_empty(shape, dtype, alignment) for _ in range(size)
+        ]
+        self._free: Deque[int] = deque(range(size))
+        self._refcounts = [0] * size
+        self._index_by_id = {id(buf): i for i, buf in enumerate(self.buffers)}
+        self._cv = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.buffers)
+
+    def num_free(self) -> int:
+        with self._cv:
+            return len(self._free)
+
+    def index_of(self, arr: npt.NDArray) -> Optional[int]:
+        """Index of `arr` if it is one of this pool's buffers (the array itself, not a view of it)"""
+        return self._index_by_id.get(id(arr))
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Index of a free buffer. Waits up to `timeout` seconds for one (forever if None),
+        and returns None if there still isn't one.
+        """
+        with self._cv:
+            if not self._cv.wait_for(lambda: len(self._free) > 0, timeout=timeout):
+                return None
+            idx = self._free.popleft()
+            self._refcounts[idx] = 1
+            return idx
+
+    def retain(self, idx: int) -> None:
+        """Take another lease on buffer `idx`, which must be in use"""
+        with self._cv:
+            if self._refcounts[idx] == 0:
+                raise ValueError(f"buffer {idx} was retained but it isn't in use")
+            self._refcounts[idx] += 1
+
+    def release(self, idx: int) -> None:
+        """Give back a lease on buffer `idx`; it's free again once all of them are"""
+        with self._cv:
+            if self._refcounts[idx] == 0:
+                raise ValueError(f"buffer {idx} was released but it isn't in use")
+            self._refcounts[idx] -= 1
+            if self._refcounts[idx] == 0:
+                self._free.append(idx)
+                self._cv.notify()
+
+    def refcount(self, idx: int) -> int:
+        """Number of leases on buffer `idx` (0 if it's free)"""
+        with self._cv:
+            return self._refcounts[idx]
+
+    def is_referenced(self, idx: int) -> bool:
+        """Whether any Python object other than the pool refers to buffer `idx` or its
+        memory - e.g. a variable holding it, a view of it, or a queued Qt signal that
+        it was emitted with
+
+        This is for checking that nothing still uses a buffer whose leases have all
+        been released, e.g. in debug checks; it's no substitute for a lease. It relies
+        on CPython's reference counts. Views of a buffer refer to the array that owns its memory
+        (numpy collapses `base`), so that array is checked as well.
+        """
+        # the pool's list and getrefcount's argument; the owner is referred to by the
+        # buffer's `base` and the argument
+        if sys.getrefcount(self.buffers[idx]) > 2:
+            return True
+        return sys.getrefcount(self.buffers[idx].base) > 2
@@ -9,6 +9,7 @@ import typer
 from tqdm import tqdm
 
 from ulc_mm_package.image_processing.background_subtraction import MedianBGSubtraction
+from ulc_mm_package.image_processing.zarrwriter import get_num_frames
 
 EXTERNAL_DIR = "experiments/"
 
@@ -72,7 +73,7 @@ def get_zarr_metadata(zarr_store):
 
 
 def zarr_image_generator(zarr_store):
-    for i in range(zarr_store.initialized):
+    for i in range(get_num_frames(zarr_store)):
         yield zarr_store[:, :, i]
 
 
@@ -165,7 +166,7 @@ def main(
             continue
         try:
             csv_path = get_csv_file(folder)
-            fps = zstore.initialized / int(get_elapsed_time_from_csv(csv_path))
+            fps = get_num_frames(zstore) / int(get_elapsed_time_from_csv(csv_path))
             print(f"Video at average framerate of: {fps}")
         except Exception as e:
             print("Error parsing timestamps and setting fps. Defaulting to fps=30\n")
@@ -191,7 +192,7 @@ def main(
         # Initialize BG subtraction
         bg_sub_set = False
         if bg_sub:
-            if zstore.initialized > 200:
+            if get_num_frames(zstore) > 200:
                 h, w = get_zarr_image_size(zstore)
                 mbg = MedianBGSubtraction(h, w, 200)
                 for i in range(200):
@@ -205,7 +206,7 @@ def main(
                 )
 
         img_gen = zarr_image_generator(zstore)
-        for i, img in enumerate(tqdm(range(zstore.initialized))):
+        for i, img in enumerate(tqdm(range(get_num_frames(zstore)))):
             img = next(img_gen)
 
             ### TEMPORARY workaround for the bug in `dev_run`
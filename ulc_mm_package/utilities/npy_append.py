@@ -0,0 +1,146 @@
+import os
+import threading
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+# the header has room for a length with this many digits, so it never changes size
+_MAX_LEN_DIGITS = 15
+
+
+def _npy_header(dtype: np.dtype, length: int, size: Optional[int] = None) -> bytes:
+    """.npy (version 1.0) header of a 1-D array of `length` elements, padded to `size`
+    bytes (or, as numpy does, to a multiple of 64)
+    """
+    header = (
+        f"{{'descr': {np.lib.format.dtype_to_descr(dtype)!r}, "
+        f"'fortran_order': False, 'shape': ({length},), }}"
+    )
+    # magic string (6) + version (2) + header length (2) + header + "\n"
+    padding = -(len(header) + 11) % 64 if size is None else size - len(header) - 11
+    header_bytes = header.encode("latin1") + b" " * padding + b"\n"
+    return (
+        np.lib.format.magic(1, 0)
+        + len(header_bytes).to_bytes(2, "little")
+        + header_bytes
+    )
+
+
+class NpyAppendFile:
+    """A 1-D .npy file that is appended to through a memory map
+
+    The file is grown `grow_by` elements at a time, and its header is rewritten with
+    the number of elements appended every `flush_period_s` seconds, by a background
+    thread so `append` never waits on the disk (and on `flush` and `close`). So up to
+    the last flush, the file can be np.load-ed at any time, e.g. after a crash, while
+    it's still being written to, or once it's closed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        dtype: npt.DTypeLike,
+        grow_by: int = 65_536,
+        flush_period_s: Optional[float] = 5.0,
+    ):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.grow_by = grow_by
+        self.flush_period_s = flush_period_s
+
+        self._len = 0
+        self._header_len = len(_npy_header(self.dtype, 10**_MAX_LEN_DIGITS - 1))
+        self._file = open(self.path, "w+b")
+        self._file.write(_npy_header(self.dtype, 0, self._header_len))
+        self._map: Optional[np.memmap] = None
+        self._grow(grow_by)
+
+        # _lock guards _map and _len, and is only held briefly; _flush_lock keeps
+        # flushes (and close) from interleaving, so headers are written in order
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_flushing = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_period_s is not None:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, daemon=True
+            )
+            self._flusher.start()
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def _grow(self, min_capacity: int) -> None:
+        capacity = 0 if self._map is None else len(self._map)
+        while capacity < min_capacity:
+            capacity += self.grow_by
+        if self._map is not None:
+            self._map.flush()
+            del self._map
+        self._file.truncate(self._header_len + capacity * self.dtype.itemsize)
+        self._map = np.memmap(
+            self._file,
+            dtype=self.dtype,
+            mode="r+",
+            offset=self._header_len,
+            shape=(capacity,),
+        )
+
+    def append(self, arr: npt.NDArray) -> None:
+        """Append `arr`'s elements (it must have this file's dtype)"""
+        if arr.dtype != self.dtype:
+            raise ValueError(f"can't append {arr.dtype} to a {self.dtype} file")
+
+        arr = arr.reshape(-1)
+        with self._lock:
+            if self._map is None:
+                raise ValueError(f"{self.path} is closed")
+            end = self._len + len(arr)
+            if end > len(self._map):
+                self._grow(end)
+            self._map[self._len : end] = arr
+            self._len = end
+
+    def _flush_periodically(self) -> None:
+        while not self._stop_flushing.wait(self.flush_period_s):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write what's been appended to disk, and then the header that counts it"""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        """`flush`, with `_flush_lock` held"""
+        with self._lock:
+            if self._map is None:
+                return
+            mapped, length = self._map, self._len
+        # everything up to `length` is in `mapped` (growing only remaps the file), so
+        # appends can carry on while it's written out
+        mapped.flush()
+        fd = self._file.fileno()
+        os.pwrite(fd, _npy_header(self.dtype, length, self._header_len), 0)
+        os.fsync(fd)
+
+    def close(self) -> None:
+        """Flush, and trim the file to what's been appended"""
+        self._stop_flushing.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._flush_lock:
+            self._flush()
+            with self._lock:
+                if self._map is None:
+                    return
+                del self._map
+                self._map = None
+            self._file.truncate(self._header_len + self._len * self.dtype.itemsize)
+            self._file.close()
@@ -0,0 +1,16 @@
+import enum
+
+
+class QueuePolicy(enum.Enum):
+    """What a bounded queue (NCSModel.asyn's submission queue, ZarrWriter's write
+    queue) does with a new item when it's full
+    """
+
+    BLOCK = "block"  # wait for space (stalls the caller)
+    DROP_NEWEST = "drop_newest"  # drop the new item
+    DROP_OLDEST = "drop_oldest"  # evict the oldest queued item to make room
+    KEEP_EVERY_NTH = "keep_every_nth"  # admit every Nth new item (evicting the oldest), drop the rest
+
+
+# When full, KEEP_EVERY_NTH admits 1 out of every QUEUE_KEEP_EVERY_N new items
+QUEUE_KEEP_EVERY_N = 2
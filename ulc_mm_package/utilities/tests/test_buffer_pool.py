@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+
+from ulc_mm_package.utilities.buffer_pool import BufferPool
+
+
+class TestBufferPool(unittest.TestCase):
+    def test_leases(self):
+        pool = BufferPool((4, 4), np.uint8, size=2)
+        idx = pool.acquire()
+        pool.retain(idx)
+        self.assertEqual(pool.refcount(idx), 2)
+
+        pool.release(idx)
+        self.assertEqual(pool.num_free(), 1)
+        pool.release(idx)
+        self.assertEqual(pool.num_free(), 2)
+        with self.assertRaises(ValueError):
+            pool.release(idx)
+        with self.assertRaises(ValueError):
+            pool.retain(idx)
+
+    def test_is_referenced(self):
+        pool = BufferPool((4, 4), np.uint8, size=1)
+        idx = pool.acquire()
+        self.assertFalse(pool.is_referenced(idx))
+
+        buf = pool.buffers[idx]
+        self.assertTrue(pool.is_referenced(idx))
+        del buf
+        view = pool.buffers[idx][1:, 1:]
+        self.assertTrue(pool.is_referenced(idx))
+        del view
+        self.assertFalse(pool.is_referenced(idx))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import tempfile
+import unittest
+
+from pathlib import Path
+
+import numpy as np
+
+from ulc_mm_package.utilities.npy_append import NpyAppendFile
+
+DTYPE = np.dtype([("id", np.uint32), ("conf", np.float32)])
+
+
+def _records(start: int, end: int) -> np.ndarray:
+    arr = np.empty(end - start, dtype=DTYPE)
+    arr["id"] = np.arange(start, end)
+    arr["conf"] = np.arange(start, end) / 10
+    return arr
+
+
+class TestNpyAppendFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "preds.npy"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_append_across_growth(self):
+        f = NpyAppendFile(self.path, DTYPE, grow_by=4, flush_period_s=None)
+        f.append(_records(0, 3))
+        f.append(_records(3, 10))
+        self.assertEqual(len(f), 10)
+        f.close()
+        self.assertTrue(f.closed)
+
+        np.testing.assert_array_equal(np.load(self.path), _records(0, 10))
+        # trimmed to what was appended
+        self.assertEqual(self.path.stat().st_size, f._header_len + 10 * DTYPE.itemsize)
+
+    def test_loadable_while_open(self):
+        f = NpyAppendFile(self.path, DTYPE, grow_by=4, flush_period_s=None)
+        self.assertEqual(len(np.load(self.path)), 0)
+
+        f.append(_records(0, 5))
+        f.flush()
+        f.append(_records(5, 6))
+        # only what's been flushed is counted in the header
+        np.testing.assert_array_equal(np.load(self.path), _records(0, 5))
+
+        f.close()
+        np.testing.assert_array_equal(np.load(self.path), _records(0, 6))
+
+    def test_periodic_flush(self):
+        f = NpyAppendFile(self.path, DTYPE, flush_period_s=0.01)
+        f.append(_records(0, 5))
+        for _ in range(500):
+            if len(np.load(self.path)) == 5:
+                break
+            f._stop_flushing.wait(0.01)
+        np.testing.assert_array_equal(np.load(self.path), _records(0, 5))
+        f.close()
+
+    def test_rejects_bad_appends(self):
+        f = NpyAppendFile(self.path, DTYPE, flush_period_s=None)
+        with self.assertRaises(ValueError):
+            f.append(np.zeros(3, dtype=np.float32))
+        f.close()
+        # closing again is a no-op
+        f.close()
+        with self.assertRaises(ValueError):
+            f.append(_records(0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()